@@ -7,6 +7,9 @@ import { useAppTheme } from '../../constants/ThemeContext';
 import { useColorScheme } from '@/hooks/useColorScheme';
 
 const ROBOT_BASE_URL = 'http://raspberrypi.local:5000';
+// Keeps this device's conversation history apart from other clients on the robot;
+// a new id per app launch starts a fresh conversation
+const SESSION_ID = `app-${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`;
 
 type Message = {
   id: string;
@@ -16,6 +19,61 @@ type Message = {
   error?: boolean;
 };
 
+// POSTs to /ask in streaming mode and parses the server-sent events as they
+// arrive; fetch() in React Native cannot read a body progressively, XHR can.
+function askStreaming(text: string, onText: (soFar: string) => void): Promise<{ reply: string; spoken: boolean }> {
+  return new Promise((resolve, reject) => {
+    const xhr = new XMLHttpRequest();
+    let seen = 0;
+    let reply = '';
+    let done: any = null;
+
+    const consume = () => {
+      const body = xhr.responseText || '';
+      let end;
+      while ((end = body.indexOf('\n\n', seen)) !== -1) {
+        const block = body.slice(seen, end);
+        seen = end + 2;
+        let event = 'message';
+        let data = '';
+        for (const line of block.split('\n')) {
+          if (line.startsWith('event: ')) event = line.slice(7);
+          else if (line.startsWith('data: ')) data += line.slice(6);
+        }
+        if (!data) continue;
+        const payload = JSON.parse(data);
+        if (event === 'delta') {
+          reply += payload.text;
+          onText(reply);
+        } else if (event === 'done') {
+          done = payload;
+        } else if (event === 'error') {
+          reject(new Error(payload.error || 'Request failed'));
+        }
+      }
+    };
+
+    xhr.open('POST', `${ROBOT_BASE_URL}/ask`);
+    xhr.setRequestHeader('Content-Type', 'application/json');
+    xhr.setRequestHeader('Accept', 'text/event-stream');
+    xhr.onprogress = consume;
+    xhr.onload = () => {
+      if (xhr.status >= 400) {
+        let message = 'Request failed';
+        try {
+          message = JSON.parse(xhr.responseText)?.error || message;
+        } catch {}
+        reject(new Error(message));
+        return;
+      }
+      consume();
+      resolve({ reply: done?.reply ?? reply, spoken: done?.voice?.spoken === true });
+    };
+    xhr.onerror = () => reject(new Error('Error contacting robot'));
+    xhr.send(JSON.stringify({ text, stream: true, session: SESSION_ID }));
+  });
+}
+
 export default function ChatScreen() {
   const { theme, isDark } = useAppTheme();
   const colorScheme = useColorScheme();
@@ -35,36 +93,26 @@ export default function ChatScreen() {
     if (!text || loading) return;
 
     const userMsg: Message = { id: String(Date.now()), role: 'user', text };
+    const botId = String(Date.now() + 1);
     setMessages(prev => [...prev, userMsg]);
     setInput('');
     setLoading(true);
 
-    try {
-      const res = await fetch(`${ROBOT_BASE_URL}/ask`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ text })
+    const updateBot = (patch: Partial<Message>) =>
+      setMessages(prev => {
+        if (!prev.some(m => m.id === botId)) {
+          return [...prev, { id: botId, role: 'assistant', text: '', ...patch }];
+        }
+        return prev.map(m => (m.id === botId ? { ...m, ...patch } : m));
       });
-      const data = await res.json();
-      if (!res.ok) {
-        throw new Error(data?.error || 'Request failed');
-      }
-      const botMsg: Message = {
-        id: String(Date.now() + 1),
-        role: 'assistant',
-        text: data?.reply ?? 'No response',
-        spoken: data?.voice?.spoken === true,
-      };
-      setMessages(prev => [...prev, botMsg]);
+
+    try {
+      // Tokens render as they arrive instead of after the whole reply
+      const data = await askStreaming(text, soFar => updateBot({ text: soFar }));
+      updateBot({ text: data.reply || 'No response', spoken: data.spoken });
       setIsOnline(true); // Assume online if successful
     } catch (e: any) {
-      const errMsg: Message = {
-        id: String(Date.now() + 2),
-        role: 'assistant',
-        text: e?.message || 'Error contacting robot',
-        error: true,
-      };
-      setMessages(prev => [...prev, errMsg]);
+      updateBot({ text: e?.message || 'Error contacting robot', error: true });
       setIsOnline(false);
     } finally {
       setLoading(false);
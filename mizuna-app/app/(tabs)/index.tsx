@@ -12,7 +12,8 @@ import { useColorScheme } from '@/hooks/useColorScheme';
 // --- Configuration ---
 // IMPORTANT: Change this to your robot's actual network address.
 const ROBOT_BASE_URL = 'http://mizuna.local';
-const CAMERA_STREAM_URL = 'http://raspberrypi.local:5000/stream.mjpg';
+// Mobile links vary a lot, so let the server pick the quality profile
+const CAMERA_STREAM_URL = 'http://raspberrypi.local:5000/stream.mjpg?profile=auto';
 
 // HTML wrapper for better MJPEG handling on iOS
 const MJPEG_HTML = `
@@ -1,11 +1,15 @@
 import os
 import azure.cognitiveservices.speech as speechsdk
-from groq import Groq
 from dotenv import load_dotenv
 import time
 import subprocess
 import logging  # Added for logging MongoDB errors
-from pymongo import MongoClient  # Added for MongoDB support
+from memory_store import relevant_docs, memory_entries, MEMORY_HEADER  # Shared MongoDB client + ranked memory
+from context_classifier import classify  # Shared context-trigger keywords
+from tts import worker_from_env, prewarm_phrases  # Reusable TTS worker with a playback queue
+from llm_gateway import LLMGateway  # Shared Groq client with timeouts and retries
+from conversation import ConversationBuffer, pack_messages  # Recent turns + token-budgeted prompts
+from led_helper import LedClient  # Socket client for the persistent LED daemon
 
 # Load environment variables
 load_dotenv()
@@ -13,11 +17,27 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 AZURE_SPEECH_KEY = os.getenv("AZURE_SPEECH_KEY")
 AZURE_SPEECH_REGION = os.getenv("AZURE_SPEECH_REGION")
 AZURE_SPEECH_VOICE = os.getenv("AZURE_SPEECH_VOICE")
+# MongoDB settings (MONGODB_URI, MONGODB_DB, MONGODB_COLLECTION) are read by memory_store
 
-# Added MongoDB environment variables (set these in your .env file)
-MONGODB_URI = os.getenv("MONGODB_URI")
-MONGODB_DB = os.getenv("MONGODB_DB", "mizuna_companion")
-MONGODB_COLLECTION = os.getenv("MONGODB_COLLECTION", "mizuna_ai")
+# One Groq client for the session, with connect/read deadlines and retries
+llm = LLMGateway(
+    GROQ_API_KEY,
+    base_url=os.getenv("GROQ_BASE_URL") or None,
+    connect_timeout=float(os.getenv("LLM_CONNECT_TIMEOUT", "3")),
+    read_timeout=float(os.getenv("LLM_READ_TIMEOUT", "20")),
+    max_retries=int(os.getenv("LLM_MAX_RETRIES", "2")),
+)
+
+# Recent exchanges so follow-ups ("what about that?") keep their context
+conversation = ConversationBuffer(max_turns=int(os.getenv("CONVERSATION_TURNS", "8")),
+                                  idle_ttl=float(os.getenv("CONVERSATION_TTL", "1800")))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))
+
+# One TTS worker for the whole session instead of a new synthesizer per reply;
+# shares the on-disk audio cache (TTS_CACHE_DIR) with the Flask server
+tts = worker_from_env(os.getenv("TTS_BACKEND", "azure"), os.getenv("TTS_PLAYER", "aplay"),
+                      AZURE_SPEECH_KEY, AZURE_SPEECH_REGION, AZURE_SPEECH_VOICE or "en-US-JennyNeural",
+                      cache_mb=float(os.getenv("TTS_CACHE_MB", "64")))
 
 
 LED_COUNT = 64
@@ -35,23 +55,43 @@ COLORS = {
     'off': (0, 0, 0)               # Off
 }
 
+# One connection to `led_helper.py daemon`; per-call spawning is the fallback
+led = LedClient(os.getenv("LED_SOCKET", "/tmp/mizuna-led.sock"))
+
+def start_led_daemon():
+    """Start the LED daemon as root unless one is already listening"""
+    if led.send("ping"):
+        return
+    try:
+        subprocess.Popen(["sudo", "python3", "led_helper.py", "daemon", led.path], start_new_session=True)
+    except Exception as e:
+        print(f"LED daemon start error: {e}")
+        return
+    for _ in range(30):
+        time.sleep(0.1)
+        if led.send("ping"):
+            return
+    print("LED daemon not reachable, spawning led_helper.py per state change")
+
 def set_led_state(state):
-    """Set LED color based on current state (calls led_helper.py as root, non-blocking)"""
+    """Set LED color based on current state (LED daemon, else led_helper.py as root, non-blocking)"""
+    if led.send(f"set {state}"):
+        return
     try:
         subprocess.Popen(["sudo", "python3", "led_helper.py", "set", state], start_new_session=True)
     except Exception as e:
         print(f"LED set error: {e}")
 
 def led_pulse(color, duration=1.0, steps=20):
-    """Create a pulsing effect with given color (calls led_helper.py as root, non-blocking)"""
+    """Create a pulsing effect with given color (LED daemon, else led_helper.py as root, non-blocking)"""
+    if led.send(f"pulse {color[0]} {color[1]} {color[2]} {duration}"):
+        return
     try:
         subprocess.Popen(["sudo", "python3", "led_helper.py", "pulse", str(color[0]), str(color[1]), str(color[2])], start_new_session=True)
     except Exception as e:
         print(f"LED pulse error: {e}")
 
 def generate_groq_response(prompt):
-    client = Groq(api_key=GROQ_API_KEY)
-    
     # System prompt (unchanged)
     system_content = """You are Mizuna, a friendly robot assistant who enjoys helping humans. Your responses should be:
 - Concise and direct (typically 1-3 sentences)
@@ -64,131 +104,39 @@ Always maintain a cheerful, helpful attitude. Ask follow-up questions to better
 If you don't know something, admit it briefly and offer an alternative way to help instead of lengthy explanations about your limitations.
 """
     
-    # Keyword lists for context detection (copied from the Flask app)
-    memory_keywords = [
-        "remember", "previous", "before", "earlier", "past", "recall", 
-        "discussed", "talked about", "mentioned", "conversation", "history",
-        "last time", "you said", "we talked", "you told me", "back then",
-        "when we", "our chat", "our discussion", "what was", "what did"
-    ]
-    
-    personalized_keywords = [
-        "my", "i am", "i'm", "about me", "tell me about myself", 
-        "what do you know about", "who am i", "my project", "my work",
-        "my idea", "my plan", "my goal", "my robot", "my device",
-        "i mentioned", "i told you", "i said", "i was working",
-        "remind me", "help me with", "continue with", "follow up"
-    ]
-    
-    knowledge_seeking_keywords = [
-        "what is", "who is", "explain", "define", "how does", "why does",
-        "tell me about", "what are", "how to", "what's the difference",
-        "help me understand", "can you explain", "what was that about",
-        "details about", "more information", "elaborate on", "describe"
-    ]
-    
-    project_related_keywords = [
-        "project", "build", "building", "robot", "device", "machine",
-        "electronic", "funding", "development", "prototype", "design",
-        "technology", "engineering", "code", "programming", "software",
-        "hardware", "circuit", "component", "sensor", "motor", "battery"
-    ]
-    
-    task_continuation_keywords = [
-        "continue", "next step", "what's next", "proceed", "move forward",
-        "keep going", "carry on", "follow through", "complete", "finish",
-        "resume", "pick up where", "go back to", "return to", "status"
-    ]
-    
-    advice_seeking_keywords = [
-        "should i", "what would you", "recommend", "suggest", "advice",
-        "opinion", "think about", "feedback", "guidance", "help me decide",
-        "best approach", "how would you", "what's your take", "thoughts on"
-    ]
-    
-    problem_solving_keywords = [
-        "problem", "issue", "error", "trouble", "stuck", "difficult",
-        "challenge", "obstacle", "bug", "fix", "solve", "troubleshoot",
-        "not working", "failed", "broken", "wrong", "help"
-    ]
-    
-    comparison_keywords = [
-        "better", "worse", "compare", "comparison", "versus", "vs",
-        "difference between", "similar to", "like", "unlike", "instead",
-        "alternative", "option", "choice", "prefer", "recommend"
-    ]
-    
-    prompt_lower = prompt.lower()
-    
-    # Determine if context should be loaded
-    should_use_context = (
-        any(keyword in prompt_lower for keyword in memory_keywords) or
-        any(keyword in prompt_lower for keyword in personalized_keywords) or
-        (any(keyword in prompt_lower for keyword in knowledge_seeking_keywords) and len(prompt.split()) > 2) or
-        any(keyword in prompt_lower for keyword in project_related_keywords) or
-        any(keyword in prompt_lower for keyword in task_continuation_keywords) or
-        any(keyword in prompt_lower for keyword in advice_seeking_keywords) or
-        any(keyword in prompt_lower for keyword in problem_solving_keywords) or
-        any(keyword in prompt_lower for keyword in comparison_keywords) or
-        (("about" in prompt_lower or "regarding" in prompt_lower) and len(prompt.split()) > 3) or
-        (len(prompt.split()) <= 5 and any(word in prompt_lower for word in ["this", "that", "it", "they", "them"]))
-    )
-    
-    messages = [{"role": "system", "content": system_content}]
+    # Single-pass keyword matcher shared with the Flask app
+    should_use_context = bool(classify(prompt))
     
+    memories = []
     # Load context from MongoDB if conditions are met
     if should_use_context:
         try:
-            mongo_client = MongoClient(MONGODB_URI, serverSelectionTimeoutMS=5000)
-            coll = mongo_client[MONGODB_DB][MONGODB_COLLECTION]
-            docs = list(coll.find({}, {"_id": 0, "title": 1, "overview": 1, "content": 1}).sort("local_time", 1).limit(5))
-            
-            if docs:
-                context_parts = []
-                for doc in docs:
-                    title = doc.get("title", "")
-                    overview = doc.get("overview", "")
-                    content = doc.get("content", "")
-                    
-                    if title and overview:
-                        memory_entry = f"Previously discussed: {title}. {overview}"
-                        if content and len(content) < 300:
-                            memory_entry += f" Additional context: {content}"
-                        context_parts.append(memory_entry)
-                
-                if context_parts:
-                    memory_context = "Your conversation memory (use only if relevant to the current question):\n" + "\n".join(context_parts)
-                    messages.append({"role": "system", "content": memory_context})
+            # Memories ranked by relevance to the prompt; the index syncs incrementally
+            memories = memory_entries(relevant_docs(prompt))
         except Exception as e:
             logging.warning(f"MongoDB context loading failed: {e}")
     
-    # Add user prompt
-    messages.append({"role": "user", "content": prompt})
+    # Recent voice turns, memories and the prompt, trimmed to the token budget
+    messages = pack_messages(system_content, prompt, conversation.history("voice"), memories,
+                             budget=CONTEXT_TOKEN_BUDGET, memory_header=MEMORY_HEADER)
     
     # Generate response
-    chat_completion = client.chat.completions.create(
-        messages=messages,
-        model="openai/gpt-oss-20b",
-        temperature=1,
-        top_p=1,
-        max_tokens=None
-    )
-    return chat_completion.choices[0].message.content
+    chat_completion = llm.complete(messages, temperature=1, top_p=1, max_tokens=None)
+    reply = chat_completion.choices[0].message.content
+    conversation.add_turn("voice", prompt, reply)
+    return reply
 
 def synthesize_voice(text):
     # Set LED to speaking state
     set_led_state('speaking')
     
-    speech_config = speechsdk.SpeechConfig(subscription=AZURE_SPEECH_KEY, region=AZURE_SPEECH_REGION)
-    speech_config.speech_synthesis_voice_name = AZURE_SPEECH_VOICE
-    speech_synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config)
-    result = speech_synthesizer.speak_text_async(text).get()
-
-    if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
+    # Warm synthesizer; the next sentence is synthesized while this one plays
+    utterance = tts.say(text, interrupt=True)
+    utterance.wait()
+    if utterance.cancelled:
+        print("Speech synthesis canceled for text: [{}]".format(text))
+    else:
         print("Voice output completed for text: [{}]".format(text))
-    elif result.reason == speechsdk.ResultReason.Canceled:
-        cancellation_details = result.cancellation_details
-        print("Speech synthesis canceled: {}".format(cancellation_details.reason))
 
 def listen_for_wake_word():
     """Listen for wake words using Azure Speech Recognition"""
@@ -268,6 +216,12 @@ def conversation_mode():
 
 def main():
     print("Starting Mizuna Assistant...")
+    # Cache any configured stock phrases while the LEDs run their startup sequence
+    phrases = prewarm_phrases()
+    if phrases:
+        tts.prewarm(phrases)
+    # One long-running LED process instead of sudo + python per state change
+    start_led_daemon()
     # Initialize LEDs - turn off
     set_led_state('off')
     time.sleep(0.5)
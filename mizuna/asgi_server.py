@@ -0,0 +1,318 @@
+"""
+Asyncio server mode for mizuna.py.
+
+The same routes and the same shared state (camera, robot link, LLM gateway,
+TTS worker, caches) served from one event loop instead of an OS thread per
+connection. MJPEG viewers wait on the loop, /ask talks to Groq through the
+async client, robot commands are only queued for RobotLink's sender thread,
+and the MongoDB memory lookup runs in the default executor.
+
+    SERVER_MODE=asgi python mizuna.py
+    uvicorn asgi_server:app --host 0.0.0.0 --port 5000
+
+Needs starlette and uvicorn; without them mizuna.py falls back to Flask.
+"""
+import os, json, time, asyncio, logging
+from contextlib import asynccontextmanager
+from email.utils import formatdate
+from urllib.parse import parse_qs
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route, WebSocketRoute
+from starlette.templating import Jinja2Templates
+
+import control_channel
+from camera import PROFILES, DEFAULT_PROFILE
+from llm_gateway import GatewayBusy
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def _error(status: int, **payload) -> JSONResponse:
+    return JSONResponse(payload, status_code=status)
+
+
+def _etag_matches(header, etag: str) -> bool:
+    """Weak If-None-Match comparison: handles "*", comma-separated lists and W/ tags."""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+async def _read_json(request) -> dict:
+    try:
+        data = json.loads(await request.body() or b"{}")
+    except ValueError:
+        data = {}
+    return data if isinstance(data, dict) else {}
+
+
+async def _read_prompt(request):
+    # JSON (any content type), urlencoded form, or query string, like the Flask route
+    body = await request.body()
+    data = {}
+    try:
+        obj = json.loads(body) if body else None
+        if isinstance(obj, dict):
+            data = obj
+    except ValueError:
+        pass
+    prompt = (data.get("text") or data.get("question") or "").strip()
+    if not prompt and "application/x-www-form-urlencoded" in request.headers.get("Content-Type", ""):
+        form = parse_qs(body.decode("utf-8", "replace"))
+        prompt = ((form.get("text") or form.get("question") or [""])[0]).strip()
+    if not prompt:
+        args = request.query_params
+        prompt = (args.get("text") or args.get("question") or "").strip()
+    return prompt, data
+
+
+class _WebSocketPipe:
+    """Starlette WebSocket behind the receive()/send() shape control_channel expects."""
+
+    def __init__(self, ws):
+        self.ws = ws
+
+    async def receive(self):
+        message = await self.ws.receive()
+        if message["type"] == "websocket.disconnect":
+            return None
+        return message.get("text") if message.get("text") is not None else message.get("bytes")
+
+    async def send(self, text: str):
+        await self.ws.send_text(text)
+
+
+def create_app(core, standalone: bool = False) -> Starlette:
+    """
+    ASGI app over an already imported mizuna module (`core`). With
+    `standalone`, the app also starts the background samplers and closes
+    the camera itself, as mizuna.py's __main__ does for Flask.
+    """
+    templates = Jinja2Templates(directory=os.path.join(os.path.dirname(os.path.abspath(core.__file__)), "templates"))
+    camera = core.camera
+
+    async def index(request):
+        return templates.TemplateResponse(request, "index.html", {
+            "SPEED_DEFAULT": core.SPEED_DEFAULT, "DEADMAN_MS": core.ROBOT_DEADMAN_MS, "CONTROL_WS": True,
+        })
+
+    async def frames(profile: str):
+        async with camera.asubscribe(profile) as sub:
+            async for chunk in sub:
+                yield chunk
+
+    async def stream(request):
+        profile = request.query_params.get("profile", DEFAULT_PROFILE).lower()
+        if profile != "auto" and profile not in PROFILES:
+            return _error(400, error=f"Unknown profile '{profile}'", profiles=list(PROFILES) + ["auto"])
+        try:
+            # First use builds the camera backend, which can block
+            await asyncio.to_thread(lambda: camera.backend)
+        except Exception as e:
+            logging.warning(f"Camera unavailable: {e}")
+            return _error(503, error="camera_unavailable", detail=str(e))
+        chunks = camera.aadaptive_frames() if profile == "auto" else frames(profile)
+        return StreamingResponse(chunks, media_type="multipart/x-mixed-replace; boundary=frame")
+
+    async def snapshot(request):
+        profile = request.query_params.get("profile", DEFAULT_PROFILE).lower()
+        if profile not in PROFILES:
+            return _error(400, error=f"Unknown profile '{profile}'", profiles=list(PROFILES))
+        try:
+            wait_newer = int(request.query_params["wait_newer"])
+        except (KeyError, ValueError):
+            wait_newer = None
+        out = camera.output(profile)
+        seq, frame, ts = out.latest()
+        # Same rule as the Flask route: only fresh frames skip waking the encoder
+        cached = frame is not None and wait_newer is None and time.time() - ts <= core.SNAPSHOT_MAX_AGE
+        if not cached:
+            try:
+                await asyncio.to_thread(camera.acquire, profile)
+            except Exception as e:
+                logging.warning(f"Camera unavailable: {e}")
+                return _error(503, error="camera_unavailable", detail=str(e))
+            try:
+                if wait_newer is not None and seq <= wait_newer:
+                    await out.await_newer(wait_newer, core.SNAPSHOT_MAX_WAIT)
+                elif frame is None or time.time() - ts > core.SNAPSHOT_MAX_AGE:
+                    await out.await_newer(seq, core.SNAPSHOT_MAX_WAIT)
+                seq, frame, ts = out.latest()
+            finally:
+                camera.release(profile)
+        if frame is None:
+            return _error(503, error="no_frame")
+        etag = f'"{profile}-{seq}"'
+        headers = {
+            "ETag": etag,
+            "Last-Modified": formatdate(ts, usegmt=True),
+            "Cache-Control": "no-cache",
+            "X-Frame-Seq": str(seq),
+        }
+        if _etag_matches(request.headers.get("If-None-Match"), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(frame, media_type="image/jpeg", headers=headers)
+
+    # RobotLink.submit only queues for the sender thread, so these stay on the loop
+    async def cmd(request):
+        data = await _read_json(request)
+        ok = core.send_robot_cmd(str(data.get("cmd", "")).strip().upper())
+        return JSONResponse({"status": "ok" if ok else "robot_error"})
+
+    async def speed(request):
+        data = await _read_json(request)
+        ok = core.send_robot_speed(data.get("speed", "100"))
+        return JSONResponse({"status": "ok" if ok else "robot_error"})
+
+    async def control_ws(websocket):
+        await websocket.accept()
+        await control_channel.aserve(_WebSocketPipe(websocket), core.robot_link)
+
+    # The payloads may wait for the first metrics sample, so they are built off the loop
+    async def temperature(request):
+        return JSONResponse(await asyncio.to_thread(core._temperature_payload))
+
+    async def uptime(request):
+        return JSONResponse(core._uptime_payload())
+
+    async def performance(request):
+        return JSONResponse(await asyncio.to_thread(core._performance_payload))
+
+    async def metrics_history(request):
+        try:
+            since = float(request.query_params.get("since", 0.0))
+        except ValueError:
+            since = 0.0
+        samples = core.metrics.history(since)
+        return JSONResponse({"interval": core.metrics.interval, "count": len(samples), "samples": samples})
+
+    async def ask_events(prompt: str, session: str, messages: list, context, cached, t0: float):
+        turn = core._AskStream(prompt, context, cached, t0, session, core._cacheable(prompt))
+        try:
+            if cached:
+                yield turn.delta(cached[0])
+            else:
+                deltas = core.llm.astream(messages)
+                try:
+                    async for delta in deltas:
+                        yield turn.delta(delta)
+                finally:
+                    # Closes the Groq stream promptly when the client goes away
+                    await deltas.aclose()
+        except Exception as e:
+            yield turn.error(e)
+            return
+        finally:
+            turn.finish_speech()
+        yield turn.done()
+
+    async def ask(request):
+        prompt, data = await _read_prompt(request)
+        if not prompt:
+            logging.info("/ask received empty prompt. Headers=%s", dict(request.headers))
+            return _error(400, error="Missing 'text' or 'question' in request")
+        use_cache = core._cache_allowed(data, request.query_params, request.headers)
+        session = core._session_id(data, request.headers)
+        t0 = time.perf_counter()
+        try:
+            # The memory lookup may read MongoDB, so it runs off the loop
+            messages, context, cached = await asyncio.to_thread(core._prepare_ask, prompt, use_cache, session)
+        except Exception as e:
+            logging.exception("LLM error: %s", e)
+            return _error(500, error="LLM_unavailable", detail=str(e))
+
+        if core._wants_stream(data, request.query_params, request.headers):
+            return StreamingResponse(ask_events(prompt, session, messages, context, cached, t0),
+                                     media_type="text/event-stream", headers=SSE_HEADERS)
+
+        if cached:
+            reply, how = cached
+        else:
+            try:
+                llm_t0 = time.perf_counter()
+                reply = (await core.llm.acomplete(messages)).choices[0].message.content
+            except GatewayBusy as e:
+                logging.warning(f"LLM busy: {e}")
+                return _error(503, error="LLM_busy", detail=str(e))
+            except Exception as e:
+                logging.exception("LLM error: %s", e)
+                return _error(500, error="LLM_unavailable", detail=str(e))
+            if core._cacheable(prompt):
+                core.response_cache.put(prompt, context, reply, (time.perf_counter() - llm_t0) * 1000)
+            how = None
+        core.conversation.add_turn(session, prompt, reply)
+        llm_ms = (time.perf_counter() - t0) * 1000
+        core.ask_latency["blocking"]["ttft"].record(llm_ms)
+        core.ask_latency["blocking"]["total"].record(llm_ms)
+
+        spoken = core._speak_text_async(reply, t0)
+        return JSONResponse({"status": "ok", "reply": reply, "cached": how, "voice": {"spoken": bool(spoken)}})
+
+    async def speech_stop(request):
+        core.tts.interrupt()
+        return JSONResponse({"status": "ok", "tts": core.tts.stats()})
+
+    async def clear_context(request):
+        turns = core.conversation.clear()
+        try:
+            deleted = await asyncio.to_thread(core.clear_memories)
+            return JSONResponse({"status": "ok", "deleted_count": deleted, "cleared_turns": turns})
+        except Exception as e:
+            logging.exception("Failed to clear context: %s", e)
+            return _error(500, status="error", detail=str(e))
+
+    routes = [
+        Route("/", index),
+        Route("/stream.mjpg", stream),
+        Route("/snapshot.jpg", snapshot),
+        Route("/cmd", cmd, methods=["POST"]),
+        Route("/speed", speed, methods=["POST"]),
+        WebSocketRoute("/ws", control_ws),
+        Route("/temperature", temperature),
+        Route("/uptime", uptime),
+        Route("/performance", performance),
+        Route("/metrics/history", metrics_history),
+        Route("/ask", ask, methods=["POST"]),
+        Route("/speech/stop", speech_stop, methods=["POST"]),
+        Route("/clear_context", clear_context, methods=["POST"]),
+    ]
+
+    @asynccontextmanager
+    async def lifespan(app):
+        core.metrics.start()
+        core.robot_health.start()
+        if core.TTS_PREWARM and core._tts_available():
+            core.tts.prewarm(core.TTS_PREWARM)
+        try:
+            yield
+        finally:
+            try:
+                camera.close()
+            except Exception:
+                pass
+
+    return Starlette(routes=routes, lifespan=lifespan if standalone else None)
+
+
+def run(core, host: str = "0.0.0.0", port: int = 5000):
+    uvicorn.run(create_app(core), host=host, port=port, log_level="info")
+
+
+def __getattr__(name):
+    # `uvicorn asgi_server:app` imports mizuna as a plain module and serves it
+    if name == "app":
+        import mizuna
+        globals()["app"] = create_app(mizuna, standalone=True)
+        return globals()["app"]
+    raise AttributeError(name)
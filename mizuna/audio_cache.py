@@ -0,0 +1,136 @@
+import os, re, hashlib, logging, threading
+from collections import OrderedDict
+from typing import Optional
+
+
+def normalize_text(text: str) -> str:
+    return re.sub(r"\s+", " ", (text or "").strip())
+
+
+class AudioCache:
+    """
+    Content-addressed on-disk cache of synthesized audio.
+
+    Files are named by a hash of (voice, format, text), so the same phrase in
+    the same voice is only ever synthesized once. The total size is capped;
+    the least recently used clips are evicted first. Several processes (the
+    Flask server and the voice loop) can share one directory: a clip another
+    process evicted is simply a miss.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 64 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()   # key -> size, least recently used first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.writes = 0
+        self._load()
+
+    @staticmethod
+    def key(voice: str, fmt: str, text: str) -> str:
+        raw = "\x1f".join((voice or "", fmt or "", normalize_text(text)))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".wav")
+
+    def _load(self):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            found = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".wav"):
+                    st = entry.stat()
+                    found.append((st.st_mtime, entry.name[:-4], st.st_size))
+        except OSError as e:
+            logging.warning(f"Audio cache unavailable at {self.directory}: {e}")
+            return
+        # mtime doubles as last-use time (get() touches it), so order by it
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._bytes += size
+        self._evict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                audio = f.read()
+        except OSError:
+            with self._lock:
+                self.misses += 1
+                size = self._entries.pop(key, None)
+                if size is not None:
+                    self._bytes -= size
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            else:
+                self._entries[key] = len(audio)
+                self._bytes += len(audio)
+        return audio
+
+    def put(self, key: str, audio: bytes):
+        if not audio or len(audio) > self.max_bytes:
+            return
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(audio)
+            # Atomic so a concurrent reader never sees half a clip
+            os.replace(tmp, path)
+        except OSError as e:
+            logging.warning(f"Audio cache write failed: {e}")
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            self.writes += 1
+            self._bytes -= self._entries.pop(key, 0)
+            self._entries[key] = len(audio)
+            self._bytes += len(audio)
+        self._evict()
+
+    def contains(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def _evict(self):
+        victims = []
+        with self._lock:
+            while self._bytes > self.max_bytes and self._entries:
+                key, size = self._entries.popitem(last=False)
+                self._bytes -= size
+                self.evictions += 1
+                victims.append(key)
+        for key in victims:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "writes": self.writes,
+                "evictions": self.evictions,
+            }
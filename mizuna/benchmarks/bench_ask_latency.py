@@ -0,0 +1,81 @@
+"""
+/ask latency, blocking JSON vs streaming SSE, against a running server:
+time to first token and to the full reply as seen by the client, plus the
+server's own time-to-first-audio from /performance.
+
+    python benchmarks/bench_ask_latency.py --url http://raspberrypi.local:5000 --runs 10
+
+Needs GROQ_API_KEY on the server; first-audio numbers also need Azure TTS.
+"""
+import json, time, argparse, statistics
+import http.client
+from urllib.parse import urlsplit
+
+PROMPTS = [
+    "Tell me a fun fact about octopuses.",
+    "How do robots keep their balance?",
+    "Give me a quick tip for staying focused.",
+    "Why is the sky blue?",
+]
+
+
+def ask(url, prompt, stream):
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+    body = json.dumps({"text": prompt, "stream": stream})
+    t0 = time.perf_counter()
+    conn.request("POST", "/ask", body=body, headers={"Content-Type": "application/json"})
+    resp = conn.getresponse()
+    if resp.status != 200:
+        raise RuntimeError(f"/ask returned {resp.status}: {resp.read()[:200]!r}")
+    ttft = None
+    if stream:
+        while True:
+            line = resp.readline()
+            if not line:
+                break
+            if ttft is None and line.startswith(b"event: delta"):
+                ttft = time.perf_counter() - t0
+    else:
+        resp.read()
+        ttft = time.perf_counter() - t0
+    total = time.perf_counter() - t0
+    conn.close()
+    return ttft, total
+
+
+def summarize(samples):
+    samples = [s * 1000 for s in samples if s is not None]
+    if not samples:
+        return None
+    return {"p50_ms": round(statistics.median(samples), 1), "max_ms": round(max(samples), 1)}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--url", default="http://127.0.0.1:5000")
+    ap.add_argument("--runs", type=int, default=10)
+    ap.add_argument("--pause", type=float, default=1.0, help="seconds between requests, lets TTS finish")
+    args = ap.parse_args()
+
+    report = {}
+    for mode, stream in (("blocking", False), ("streaming", True)):
+        ttfts, totals = [], []
+        for i in range(args.runs):
+            ttft, total = ask(args.url, PROMPTS[i % len(PROMPTS)], stream)
+            ttfts.append(ttft)
+            totals.append(total)
+            time.sleep(args.pause)
+        report[mode] = {"client_ttft": summarize(ttfts), "client_total": summarize(totals)}
+
+    parts = urlsplit(args.url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=10)
+    conn.request("GET", "/performance")
+    server = json.loads(conn.getresponse().read()).get("ask", {})
+    for mode in report:
+        report[mode]["server"] = server.get(mode)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
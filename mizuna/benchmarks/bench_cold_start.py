@@ -0,0 +1,53 @@
+"""
+Cold start: time from launching `python mizuna.py` to the first 200 from `/`.
+
+Runs the server with the synthetic camera so no hardware is needed:
+
+    python benchmarks/bench_cold_start.py --runs 5
+"""
+import os, sys, json, time, argparse, statistics, subprocess
+import urllib.request
+
+HERE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def cold_start(port, camera, timeout=60.0):
+    env = dict(os.environ, PORT=str(port), CAMERA_BACKEND=camera)
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "mizuna.py"], cwd=HERE, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - t0 < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited with {proc.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as r:
+                    if r.status == 200:
+                        return time.perf_counter() - t0
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError("server did not answer in time")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--port", type=int, default=5077)
+    ap.add_argument("--camera", default="synthetic", help="camera backend to launch with")
+    args = ap.parse_args()
+
+    samples = [cold_start(args.port, args.camera) for _ in range(args.runs)]
+    print(json.dumps({
+        "camera": args.camera,
+        "runs": args.runs,
+        "median_ms": round(statistics.median(samples) * 1000, 1),
+        "min_ms": round(min(samples) * 1000, 1),
+        "max_ms": round(max(samples) * 1000, 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Context-trigger detection: the original per-call keyword list scans vs the
+compiled single-pass matcher in context_classifier.
+
+Before timing, both are run over a prompt corpus (hand-written edge cases
+plus random word salad) and any decision that differs is reported; the
+script exits non-zero on a mismatch.
+
+    python benchmarks/bench_context_classifier.py --random 20000 --iterations 20000
+"""
+import os, sys, json, time, random, argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from context_classifier import CATEGORIES, classify, matched_categories
+
+
+def legacy_should_use_context(prompt):
+    # Copy of the inline check formerly in mizuna.py and app.py
+    memory_keywords = [
+        "remember", "previous", "before", "earlier", "past", "recall",
+        "discussed", "talked about", "mentioned", "conversation", "history",
+        "last time", "you said", "we talked", "you told me", "back then",
+        "when we", "our chat", "our discussion", "what was", "what did"
+    ]
+    personalized_keywords = [
+        "my", "i am", "i'm", "about me", "tell me about myself",
+        "what do you know about", "who am i", "my project", "my work",
+        "my idea", "my plan", "my goal", "my robot", "my device",
+        "i mentioned", "i told you", "i said", "i was working",
+        "remind me", "help me with", "continue with", "follow up"
+    ]
+    knowledge_seeking_keywords = [
+        "what is", "who is", "explain", "define", "how does", "why does",
+        "tell me about", "what are", "how to", "what's the difference",
+        "help me understand", "can you explain", "what was that about",
+        "details about", "more information", "elaborate on", "describe"
+    ]
+    project_related_keywords = [
+        "project", "build", "building", "robot", "device", "machine",
+        "electronic", "funding", "development", "prototype", "design",
+        "technology", "engineering", "code", "programming", "software",
+        "hardware", "circuit", "component", "sensor", "motor", "battery"
+    ]
+    task_continuation_keywords = [
+        "continue", "next step", "what's next", "proceed", "move forward",
+        "keep going", "carry on", "follow through", "complete", "finish",
+        "resume", "pick up where", "go back to", "return to", "status"
+    ]
+    advice_seeking_keywords = [
+        "should i", "what would you", "recommend", "suggest", "advice",
+        "opinion", "think about", "feedback", "guidance", "help me decide",
+        "best approach", "how would you", "what's your take", "thoughts on"
+    ]
+    problem_solving_keywords = [
+        "problem", "issue", "error", "trouble", "stuck", "difficult",
+        "challenge", "obstacle", "bug", "fix", "solve", "troubleshoot",
+        "not working", "failed", "broken", "wrong", "help"
+    ]
+    comparison_keywords = [
+        "better", "worse", "compare", "comparison", "versus", "vs",
+        "difference between", "similar to", "like", "unlike", "instead",
+        "alternative", "option", "choice", "prefer", "recommend"
+    ]
+    prompt_lower = prompt.lower()
+    return (
+        any(keyword in prompt_lower for keyword in memory_keywords) or
+        any(keyword in prompt_lower for keyword in personalized_keywords) or
+        (any(keyword in prompt_lower for keyword in knowledge_seeking_keywords) and len(prompt.split()) > 2) or
+        any(keyword in prompt_lower for keyword in project_related_keywords) or
+        any(keyword in prompt_lower for keyword in task_continuation_keywords) or
+        any(keyword in prompt_lower for keyword in advice_seeking_keywords) or
+        any(keyword in prompt_lower for keyword in problem_solving_keywords) or
+        any(keyword in prompt_lower for keyword in comparison_keywords) or
+        (("about" in prompt_lower or "regarding" in prompt_lower) and len(prompt.split()) > 3) or
+        (len(prompt.split()) <= 5 and any(word in prompt_lower for word in ["this", "that", "it", "they", "them"]))
+    )
+
+
+EDGE_CASES = [
+    "", "   ", "Hello", "Hi there", "Good morning Mizuna", "Sing a song", "Say hello to everyone here",
+    "HELP", "help me with", "Help me with my homework", "tell me about myself",
+    "Tell me a joke", "what is", "what is love", "What is the capital of France",
+    "explain", "Explain gravity", "Explain gravity to me please", "about", "about the weather",
+    "What about the weather today", "regarding the plan", "Regarding the plan for today",
+    "this", "Is this ok", "Was that fun for you today", "Was that fun for you today right",
+    "Thank you so much", "myself", "family", "bitter", "vsync", "withstand", "sitting",
+    "The wheather is nice outdoors", "Dance for me", "What's your name", "Good night",
+    "How are you", "Who are you", "i'm hungry", "I AM BATMAN", "recommendation", "preferences",
+    "pick up where we left", "status", "Status report", "what's next", "whatsnext",
+    "Compare apples and oranges", "unlikely", "feedbacks", "Ça va bien", "naïve café résumé",
+    "😀 hello", "tell me about myselfish ways", "what was that about", "hmm",
+]
+
+
+def random_prompts(n, seed=1):
+    rng = random.Random(seed)
+    vocab = sorted({w for words in CATEGORIES.values() for kw in words for w in kw.split()})
+    vocab += ("hello hi the a weather song dance name night morning thanks joke cat dog run "
+              "fast slow left right stop go sing play game sky blue water").split()
+    prompts = []
+    for _ in range(n):
+        words = rng.choices(vocab, k=rng.randint(1, 12))
+        if rng.random() < 0.3:
+            # Glue neighbours together to exercise matches across word edges
+            i = rng.randrange(len(words))
+            words[i] = words[i] + rng.choice(vocab)
+        prompt = " ".join(words)
+        prompts.append(prompt.upper() if rng.random() < 0.1 else prompt)
+    return prompts
+
+
+def check_parity(prompts):
+    mismatches = [p for p in prompts if legacy_should_use_context(p) != bool(classify(p))]
+    # Category-level parity: every category reported must really contain a
+    # keyword that occurs in the prompt, and vice versa
+    for p in prompts:
+        low = p.lower()
+        expected = {c for c, words in CATEGORIES.items() if any(w in low for w in words)}
+        if matched_categories(p) != expected:
+            mismatches.append(p)
+    return mismatches
+
+
+def time_per_call(fn, prompts, iterations):
+    n = len(prompts)
+    t0 = time.perf_counter()
+    for i in range(iterations):
+        fn(prompts[i % n])
+    return (time.perf_counter() - t0) / iterations * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--random", type=int, default=20000, help="random prompts for the parity check")
+    ap.add_argument("--iterations", type=int, default=20000)
+    args = ap.parse_args()
+
+    prompts = EDGE_CASES + random_prompts(args.random)
+    mismatches = check_parity(prompts)
+    report = {"parity_prompts": len(prompts), "mismatches": len(mismatches)}
+    # Conversational prompts, and keyword-dense salad where legacy exits early
+    for name, corpus in (("conversational", EDGE_CASES), ("keyword_dense", random_prompts(500, seed=2))):
+        legacy_us = time_per_call(legacy_should_use_context, corpus, args.iterations)
+        compiled_us = time_per_call(classify, corpus, args.iterations)
+        report[name] = {
+            "legacy_us": round(legacy_us, 2),
+            "compiled_us": round(compiled_us, 2),
+            "speedup": round(legacy_us / compiled_us, 1),
+        }
+    print(json.dumps(report, indent=2))
+    if mismatches:
+        for p in mismatches[:20]:
+            print(f"mismatch: {p!r}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Cost of conversation.pack_messages and the prompt size it produces, against
+sending every stored turn and memory unpacked.
+
+    python benchmarks/bench_context_packing.py --turns 8 --memories 5 --budgets 600 1200 2000
+"""
+import os, sys, json, time, random, argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from conversation import ConversationBuffer, pack_messages, estimate_messages, estimate_tokens
+from memory_store import MEMORY_HEADER
+
+WORDS = ("robot camera battery volcano weather music garden python sensor motor light story friend "
+         "school dinner travel ocean planet history science game movie book").split()
+SYSTEM = "You are Mizuna, a friendly robot assistant. Keep replies concise, conversational and emoji-free."
+
+
+def sentence(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--turns", type=int, default=8)
+    ap.add_argument("--memories", type=int, default=5)
+    ap.add_argument("--budgets", type=int, nargs="+", default=[600, 1200, 2000])
+    ap.add_argument("--iterations", type=int, default=20000)
+    args = ap.parse_args()
+
+    rng = random.Random(7)
+    buf = ConversationBuffer(max_turns=args.turns)
+    for _ in range(args.turns):
+        buf.add_turn("bench", sentence(rng, 12), " ".join(sentence(rng, 15) for _ in range(3)))
+    turns = buf.history("bench")
+    memories = [f"Previously discussed: {sentence(rng, 4)} {sentence(rng, 30)} Additional context: {sentence(rng, 25)}"
+                for _ in range(args.memories)]
+    prompt = "What about that one?"
+
+    unpacked = estimate_messages(pack_messages(SYSTEM, prompt, turns, memories, budget=10 ** 9,
+                                               memory_header=MEMORY_HEADER))
+    report = {"unpacked_tokens": unpacked, "budgets": {}}
+    for budget in args.budgets:
+        messages = pack_messages(SYSTEM, prompt, turns, memories, budget=budget, memory_header=MEMORY_HEADER)
+        t0 = time.perf_counter()
+        for _ in range(args.iterations):
+            pack_messages(SYSTEM, prompt, turns, memories, budget=budget, memory_header=MEMORY_HEADER)
+        us = (time.perf_counter() - t0) / args.iterations * 1e6
+        memory_msgs = [m for m in messages[1:] if m["role"] == "system"]
+        report["budgets"][budget] = {
+            "tokens": estimate_messages(messages),
+            "turns_kept": sum(1 for m in messages if m["role"] == "assistant"),
+            "memories_kept": memory_msgs[0]["content"].count("\n") if memory_msgs else 0,
+            "pack_us": round(us, 1),
+        }
+
+    text = " ".join(sentence(rng, 20) for _ in range(50))
+    t0 = time.perf_counter()
+    for _ in range(args.iterations):
+        estimate_tokens(text)
+    report["estimate_tokens_us_per_kb"] = round((time.perf_counter() - t0) / args.iterations * 1e6 / (len(text) / 1024), 3)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Latency of drive commands over per-press HTTP POSTs vs the /ws control channel.
+
+Run against a live Mizuna server (the robot itself does not need to be up,
+both paths ack as soon as the command is queued):
+
+    python benchmarks/bench_control_channel.py --base http://raspberrypi.local:5000 -n 500
+"""
+import json, time, argparse, statistics
+
+import requests
+from simple_websocket import Client
+
+
+def percentiles(samples):
+    s = sorted(samples)
+    pick = lambda p: s[min(len(s) - 1, int(round(p * (len(s) - 1))))]
+    return {
+        "p50_ms": round(pick(0.50) * 1000, 3),
+        "p99_ms": round(pick(0.99) * 1000, 3),
+        "mean_ms": round(statistics.mean(s) * 1000, 3),
+    }
+
+
+def bench_post(base, n, keep_alive):
+    session = requests.Session() if keep_alive else requests
+    out = []
+    for i in range(n):
+        t0 = time.perf_counter()
+        session.post(f"{base}/cmd", json={"cmd": "S"}, timeout=5)
+        out.append(time.perf_counter() - t0)
+    return out
+
+
+def bench_ws(base, n, compact):
+    ws = Client.connect(base.replace("http", "ws", 1) + "/ws")
+    out = []
+    try:
+        for i in range(n):
+            frame = f"{i}:S" if compact else json.dumps({"seq": i, "cmd": "S"})
+            t0 = time.perf_counter()
+            ws.send(frame)
+            ws.receive(timeout=5)
+            out.append(time.perf_counter() - t0)
+    finally:
+        ws.close()
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--base", default="http://127.0.0.1:5000")
+    ap.add_argument("-n", type=int, default=300)
+    args = ap.parse_args()
+
+    # Only "S" is sent so a connected robot never moves during the run
+    results = {
+        "post_new_connection": percentiles(bench_post(args.base, args.n, keep_alive=False)),
+        "post_keep_alive": percentiles(bench_post(args.base, args.n, keep_alive=True)),
+        "ws_compact": percentiles(bench_ws(args.base, args.n, compact=True)),
+        "ws_json": percentiles(bench_ws(args.base, args.n, compact=False)),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
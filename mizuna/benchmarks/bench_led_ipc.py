@@ -0,0 +1,99 @@
+"""
+LED state changes: a new `led_helper.py` process per call (the old path)
+vs one command on the daemon's Unix socket.
+
+Both sides use LED_STRIP=fake, so no strip, sudo or board/neopixel import
+is involved; on the Pi those add to the spawn path only.
+
+    python benchmarks/bench_led_ipc.py --changes 40
+"""
+import os, sys, json, time, argparse, tempfile, subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+sys.path.insert(0, ROOT)
+
+from led_helper import LedClient, ANIMATED_STATES
+
+HELPER = os.path.join(ROOT, "led_helper.py")
+TICK = os.sysconf("SC_CLK_TCK")
+
+
+def _pct(values, p):
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(p * len(values)))], 2) if values else None
+
+
+def _cpu_seconds(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / TICK
+
+
+def spawn(changes: int, env: dict) -> dict:
+    latencies, cpu = [], []
+    for i in range(changes):
+        state = ANIMATED_STATES[i % len(ANIMATED_STATES)]
+        t0 = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, HELPER, "set", state], cwd=ROOT, env=env,
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        # "LED State: ..." is printed right before the first frame is drawn
+        proc.stdout.readline()
+        latencies.append((time.perf_counter() - t0) * 1000)
+        proc.kill()
+        _, _, usage = os.wait4(proc.pid, 0)
+        proc.returncode = -9
+        cpu.append((usage.ru_utime + usage.ru_stime) * 1000)
+    return {"p50_ms": _pct(latencies, 0.5), "p95_ms": _pct(latencies, 0.95),
+            "cpu_ms_per_change": round(sum(cpu) / len(cpu), 1)}
+
+
+def daemon(changes: int, env: dict, gap: float) -> dict:
+    path = os.path.join(tempfile.mkdtemp(), "led.sock")
+    proc = subprocess.Popen([sys.executable, HELPER, "daemon", path], cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    client = LedClient(path)
+    try:
+        for _ in range(50):
+            if client.send("ping"):
+                break
+            time.sleep(0.1)
+
+        # Idle strip: what one state change costs the daemon
+        client.send("set off")
+        time.sleep(0.2)
+        cpu0 = _cpu_seconds(proc.pid)
+        for _ in range(changes):
+            client.send("set off")
+        time.sleep(0.1)
+        idle_cpu = (_cpu_seconds(proc.pid) - cpu0) * 1000 / changes
+
+        # Animated states: round trip and command -> new animation started
+        latencies = []
+        for i in range(changes):
+            state = ANIMATED_STATES[i % len(ANIMATED_STATES)]
+            t0 = time.perf_counter()
+            client.send(f"set {state}")
+            latencies.append((time.perf_counter() - t0) * 1000)
+            time.sleep(gap)
+        stats = json.loads(client.request("stats"))
+        return {"p50_ms": _pct(latencies, 0.5), "p95_ms": _pct(latencies, 0.95),
+                "switch_p50_ms": stats["switch_ms"]["p50_ms"], "switch_p95_ms": stats["switch_ms"]["p95_ms"],
+                "cpu_ms_per_change": round(idle_cpu, 2)}
+    finally:
+        client.close()
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--changes", type=int, default=40)
+    ap.add_argument("--gap", type=float, default=0.1, help="seconds between daemon state changes")
+    args = ap.parse_args()
+    env = dict(os.environ, LED_STRIP="fake", PYTHONUNBUFFERED="1")
+    print(json.dumps({"spawn": spawn(args.changes, env), "daemon": daemon(args.changes, env, args.gap)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
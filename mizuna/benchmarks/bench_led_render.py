@@ -0,0 +1,70 @@
+"""
+LED animation rendering: per-pixel Python loops (the old renderer) vs the
+NumPy frames in led_render, at several strip lengths.
+
+For each animation it reports the frame rate without sleeping or sending
+(rendering plus the write into a PixelBuf-shaped byte buffer) and CPU per frame, plus the share of one core it takes at
+the animation's own frame period (its `wait` plus render time).
+
+    python benchmarks/bench_led_render.py --leds 64 256 1024 --frames 100
+"""
+import os, sys, json, time, inspect, argparse, tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+os.environ.setdefault("LED_STATE_SHM", os.path.join(tempfile.mkdtemp(), "led-state"))
+
+import led_helper
+
+ANIMATIONS = ["blue_dot", "chase", "green_pulse", "magenta_sparkle", "yellow_comet", "matrix_fall"]
+
+
+class NullPixels(led_helper.FakePixels):
+    """PixelBuf-shaped strip whose show() sends nothing, so only rendering and the buffer write are timed."""
+
+    def show(self):
+        pass
+
+
+def measure(name: str, leds: int, frames: int, vectorized: bool) -> dict:
+    fn = getattr(led_helper, name)
+    led_helper.LED_COUNT = leds
+    led_helper.USE_NUMPY = vectorized
+    led_helper.pixels = NullPixels(leds, brightness=led_helper.LED_BRIGHTNESS)
+    fn(wait=0, steps=3)     # warm up
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    fn(wait=0, steps=frames)
+    wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+    cpu_ms = cpu / frames * 1000
+    wait_ms = inspect.signature(fn).parameters["wait"].default * 1000
+    return {
+        "fps": round(frames / wall, 1),
+        "cpu_ms_per_frame": round(cpu_ms, 3),
+        "core_pct_at_speed": round(100 * cpu_ms / (wait_ms + cpu_ms), 1),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--leds", type=int, nargs="+", default=[64, 256, 1024])
+    ap.add_argument("--frames", type=int, default=100)
+    ap.add_argument("--animations", nargs="+", default=ANIMATIONS)
+    args = ap.parse_args()
+    if led_helper.led_render.np is None:
+        sys.exit("NumPy is not installed; only the Python renderer is available")
+
+    report = {}
+    for leds in args.leds:
+        report[leds] = {}
+        for name in args.animations:
+            old = measure(name, leds, args.frames, vectorized=False)
+            new = measure(name, leds, args.frames, vectorized=True)
+            report[leds][name] = {"python": old, "numpy": new,
+                                  "speedup": round(old["cpu_ms_per_frame"] / max(new["cpu_ms_per_frame"], 1e-6), 1)}
+            print(json.dumps({leds: {name: report[leds][name]}}), file=sys.stderr)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+LED frame pacing: the old render-then-sleep(wait) loop vs FrameScheduler,
+with and without load shedding, on an idle CPU and with busy processes
+competing for it.
+
+The old loop is reproduced by swapping led_helper.clock for a clock whose
+frames() sleeps `wait` after every frame. Each run plays one animation on
+a timed fake strip for --seconds and reports the achieved frame rate
+against the target, frame interval percentiles, animation speed,
+dropped frames, the shedding level reached and the LED process's CPU.
+
+    python benchmarks/bench_led_scheduler.py --animation blue_dot --renderer python --leds 1024 --load 0 2
+"""
+import os, sys, json, time, argparse, tempfile, subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+SCRATCH = tempfile.mkdtemp()
+os.environ.setdefault("LED_STATE_SHM", os.path.join(SCRATCH, "led-state"))
+os.environ.setdefault("LED_TABLE_DIR", os.path.join(SCRATCH, "tables"))
+
+import led_helper
+
+
+class SleepClock:
+    """The pre-scheduler loop: draw, then sleep `wait`."""
+
+    detail = True
+
+    def __init__(self):
+        self.steps = 0
+
+    def frames(self, steps, wait, state_name=None):
+        for step in range(steps):
+            yield step
+            self.steps += 1
+            time.sleep(wait)
+
+    def stats(self):
+        return {"steps": self.steps}
+
+
+class TimedPixels(led_helper.FakePixels):
+    def __init__(self, n):
+        super().__init__(n, brightness=led_helper.LED_BRIGHTNESS)
+        self.times = []
+
+    def show(self):
+        self.times.append(time.perf_counter())
+
+
+def _pct(values, p):
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(p * len(values)))], 2) if values else None
+
+
+def run(name, leds, seconds, clock):
+    fn = getattr(led_helper, name)
+    wait = led_helper.inspect.signature(fn).parameters["wait"].default
+    led_helper.LED_COUNT = leds
+    led_helper.clock = clock
+    led_helper.pixels = strip = TimedPixels(leds)
+    fn(steps=3)
+    strip.times.clear()
+    steps0 = clock.stats()["steps"]
+    cpu0, t0 = time.process_time(), time.perf_counter()
+    while time.perf_counter() - t0 < seconds:
+        fn()
+    cpu = time.process_time() - cpu0
+    times = strip.times
+    gaps = [(b - a) * 1000 for a, b in zip(times, times[1:])]
+    elapsed = times[-1] - times[0]
+    stats = clock.stats()
+    return {
+        "target_fps": round(1 / wait, 1),
+        "fps": round(len(gaps) / elapsed, 1),
+        "interval_p50_ms": _pct(gaps, 0.5),
+        "interval_p95_ms": _pct(gaps, 0.95),
+        # Steps advanced per second against the animation's design speed
+        "animation_speed_pct": round(100 * (stats["steps"] - steps0) * wait / elapsed, 1),
+        "dropped": stats.get("dropped", 0),
+        "level": stats.get("level", 0),
+        "sheds": stats.get("sheds", 0),
+        "render_p95_ms": stats.get("render_ms", {}).get("p95_ms"),
+        "cpu_ms_per_s": round(cpu / (time.perf_counter() - t0) * 1000, 1),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--animation", default="blue_dot")
+    ap.add_argument("--renderer", choices=["python", "numpy"], default="python")
+    ap.add_argument("--leds", type=int, default=1024)
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--load", type=int, nargs="+", default=[0, 2], help="busy processes per run")
+    args = ap.parse_args()
+    os.chdir(SCRATCH)
+    led_helper.USE_NUMPY = args.renderer == "numpy"
+
+    clocks = {
+        "sleep": SleepClock,
+        "scheduler": lambda: led_helper.FrameScheduler(shed=False),
+        "scheduler_shed": lambda: led_helper.FrameScheduler(shed=True),
+    }
+    report = {}
+    for load in args.load:
+        hogs = [subprocess.Popen([sys.executable, "-c", "while True: pass"]) for _ in range(load)]
+        try:
+            report[f"load_{load}"] = {name: run(args.animation, args.leds, args.seconds, make())
+                                      for name, make in clocks.items()}
+        finally:
+            for hog in hogs:
+                hog.kill()
+        print(json.dumps({f"load_{load}": report[f"load_{load}"]}), file=sys.stderr)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
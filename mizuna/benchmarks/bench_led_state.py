@@ -0,0 +1,102 @@
+"""
+Per-frame LED state check: re-reading .led_state (the old path) vs the
+shared-memory StateSignal. Reports the cost of one check, read syscalls
+per check (from /proc/self/io) and how long a running animation takes to
+stop after a state change, against its frame period.
+
+Runs with LED_STRIP=fake in a scratch directory.
+
+    python benchmarks/bench_led_state.py --checks 100000 --changes 30
+"""
+import os, sys, json, time, random, argparse, tempfile, threading
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+SCRATCH = tempfile.mkdtemp()
+os.environ.setdefault("LED_STRIP", "fake")
+os.environ.setdefault("LED_STATE_SHM", os.path.join(SCRATCH, "led-state"))
+
+import led_helper
+
+
+class FileState:
+    """The pre-StateSignal behaviour: file read per frame, plain sleep."""
+
+    def get(self):
+        return led_helper.read_state()
+
+    def set(self, state):
+        led_helper.write_state(state)
+
+    def sleep(self, seconds, state_name=None):
+        time.sleep(seconds)
+
+
+def _read_syscalls() -> int:
+    with open("/proc/self/io") as f:
+        for line in f:
+            if line.startswith("syscr:"):
+                return int(line.split()[1])
+    return 0
+
+
+def _pct(values, p):
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(p * len(values)))], 2) if values else None
+
+
+def check_cost(signal, checks: int) -> dict:
+    signal.set("listening")
+    signal.get()
+    r0 = _read_syscalls()
+    t0 = time.perf_counter()
+    for _ in range(checks):
+        signal.get()
+    elapsed = time.perf_counter() - t0
+    # Reading /proc/self/io itself costs one read
+    return {"check_us": round(elapsed / checks * 1e6, 3),
+            "read_syscalls_per_check": round((_read_syscalls() - r0 - 1) / checks, 3)}
+
+
+def reaction(signal, changes: int) -> dict:
+    led_helper.led_state = signal
+    led_helper.open_strip()
+    rng = random.Random(3)
+    delays = []
+    for _ in range(changes):
+        signal.set("listening")
+        done = threading.Event()
+        worker = threading.Thread(target=lambda: (led_helper.animate("listening"), done.set()))
+        worker.start()
+        time.sleep(0.05 + rng.random() * 0.05)
+        t0 = time.perf_counter()
+        signal.set("thinking")
+        done.wait()
+        delays.append((time.perf_counter() - t0) * 1000)
+        worker.join()
+    return {"stop_p50_ms": _pct(delays, 0.5), "stop_p95_ms": _pct(delays, 0.95), "stop_max_ms": _pct(delays, 1.0)}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--checks", type=int, default=100000)
+    ap.add_argument("--changes", type=int, default=30)
+    args = ap.parse_args()
+    os.chdir(SCRATCH)
+
+    # blue_dot (listening): 18 ms sleep plus rendering and show()
+    t0 = time.perf_counter()
+    led_helper.open_strip()
+    led_helper.blue_dot(steps=20)
+    frame_ms = (time.perf_counter() - t0) / 20 * 1000
+
+    shm = led_helper.StateSignal()
+    report = {"frame_ms": round(frame_ms, 2)}
+    for name, signal in (("file", FileState()), ("shm", shm)):
+        report[name] = dict(check_cost(signal, args.checks), **reaction(signal, args.changes))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
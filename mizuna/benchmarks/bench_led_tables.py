@@ -0,0 +1,132 @@
+"""
+LED frame tables: memory footprint, build and disk-load time, and cost per
+frame of table playback against live NumPy rendering and the per-pixel
+Python loops. A second pass plays each animation at its own frame rate on
+the fake strip while other processes spin on the CPU, and reports how
+steady the frame interval stays.
+
+    python benchmarks/bench_led_tables.py --leds 64 256 1024 --frames 96 --load 2
+"""
+import os, sys, json, time, shutil, inspect, argparse, tempfile, subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+SCRATCH = tempfile.mkdtemp()
+os.environ.setdefault("LED_STATE_SHM", os.path.join(SCRATCH, "led-state"))
+os.environ["LED_TABLE_DIR"] = os.path.join(SCRATCH, "tables")
+
+import led_helper, led_render
+
+ANIMATIONS = {
+    "blue_dot": led_render.BlueDot,
+    "chase": led_render.Chase,
+    "green_pulse": led_render.GreenPulse,
+    "magenta_sparkle": led_render.MagentaSparkle,
+    "yellow_comet": led_render.YellowComet,
+}
+MODES = {"python": (False, False), "numpy": (True, False), "table": (True, True)}
+
+
+class NullPixels(led_helper.FakePixels):
+    def show(self):
+        pass
+
+
+class TimedPixels(NullPixels):
+    """Records when each frame reaches the strip."""
+
+    def __init__(self, n):
+        super().__init__(n, brightness=led_helper.LED_BRIGHTNESS)
+        self.times = []
+
+    def show(self):
+        self.times.append(time.perf_counter())
+
+
+def _pct(values, p):
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(p * len(values)))], 2) if values else None
+
+
+def _steps(name):
+    return inspect.signature(getattr(led_helper, name)).parameters["steps"].default
+
+
+def _use(mode):
+    led_helper.USE_NUMPY, led_helper.USE_TABLES = MODES[mode]
+
+
+def table_cost(name, leds):
+    cls, steps = ANIMATIONS[name], _steps(name)
+    led_render._tables.clear()
+    built = led_render.frame_table(cls, leds, steps)
+    led_render._tables.clear()
+    loaded = led_render.frame_table(cls, leds, steps)
+    return {"bytes": built.frames.nbytes, "build_ms": round(built.build_ms, 1),
+            "load_ms": round(loaded.build_ms, 2), "loaded_from": loaded.source}
+
+
+def frame_cost(name, leds, frames, mode):
+    fn = getattr(led_helper, name)
+    _use(mode)
+    led_helper.LED_COUNT = leds
+    led_helper.pixels = NullPixels(leds, brightness=led_helper.LED_BRIGHTNESS)
+    fn(wait=0, steps=frames)      # warm up, and builds the table in table mode
+    cpu0 = time.process_time()
+    fn(wait=0, steps=frames)
+    return round((time.process_time() - cpu0) / frames * 1000, 3)
+
+
+def steadiness(name, leds, mode):
+    fn = getattr(led_helper, name)
+    _use(mode)
+    led_helper.LED_COUNT = leds
+    led_helper.pixels = TimedPixels(leds)
+    fn(steps=3)
+    led_helper.pixels.times.clear()
+    fn()
+    times = led_helper.pixels.times
+    gaps = [(b - a) * 1000 for a, b in zip(times, times[1:])]
+    wait_ms = inspect.signature(fn).parameters["wait"].default * 1000
+    return {"target_ms": wait_ms, "interval_p50_ms": _pct(gaps, 0.5), "interval_p95_ms": _pct(gaps, 0.95),
+            "interval_max_ms": _pct(gaps, 1.0), "fps": round(len(gaps) / (times[-1] - times[0]), 1)}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--leds", type=int, nargs="+", default=[64, 256, 1024])
+    ap.add_argument("--frames", type=int, default=96)
+    ap.add_argument("--load", type=int, default=2, help="busy processes during the steadiness pass")
+    ap.add_argument("--steady-leds", type=int, default=256)
+    args = ap.parse_args()
+    if led_render.np is None:
+        sys.exit("NumPy is not installed; frame tables need it")
+    os.chdir(SCRATCH)
+
+    report = {"cost": {}, "steady": {}}
+    try:
+        for leds in args.leds:
+            report["cost"][leds] = {}
+            for name in ANIMATIONS:
+                entry = table_cost(name, leds)
+                entry["cpu_ms_per_frame"] = {mode: frame_cost(name, leds, args.frames, mode) for mode in MODES}
+                report["cost"][leds][name] = entry
+                print(json.dumps({leds: {name: entry}}), file=sys.stderr)
+            report["cost"][leds]["total_bytes"] = sum(e["bytes"] for e in report["cost"][leds].values())
+
+        hogs = [subprocess.Popen([sys.executable, "-c", "while True: pass"]) for _ in range(args.load)]
+        try:
+            for name in ANIMATIONS:
+                report["steady"][name] = {mode: steadiness(name, args.steady_leds, mode) for mode in MODES}
+                print(json.dumps({name: report["steady"][name]}), file=sys.stderr)
+        finally:
+            for hog in hogs:
+                hog.kill()
+    finally:
+        shutil.rmtree(SCRATCH, ignore_errors=True)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
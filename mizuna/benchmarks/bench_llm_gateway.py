@@ -0,0 +1,69 @@
+"""
+LLMGateway against the local mock server: latency percentiles with and
+without hedging under a heavy tail, and retries under injected 503s.
+
+    python benchmarks/bench_llm_gateway.py --requests 200 --tail-rate 0.08 --fail-rate 0.05
+
+Needs the groq package (the gateway drives the real SDK against the mock).
+"""
+import os, sys, json, time, argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import mock_llm_server
+from llm_gateway import LLMGateway
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+def run(gateway, requests, concurrency):
+    latencies, errors = [], 0
+
+    def one(_):
+        t0 = time.perf_counter()
+        gateway.complete(MESSAGES)
+        return (time.perf_counter() - t0) * 1000
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        for fut in [pool.submit(one, i) for i in range(requests)]:
+            try:
+                latencies.append(fut.result())
+            except Exception:
+                errors += 1
+    latencies.sort()
+
+    def pct(p):
+        return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 1) if latencies else None
+
+    stats = gateway.stats()
+    return {
+        "p50_ms": pct(0.5), "p95_ms": pct(0.95), "p99_ms": pct(0.99), "errors": errors,
+        "retries": stats["retries"], "hedges": stats["hedges"], "hedge_wins": stats["hedge_wins"],
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=2)
+    ap.add_argument("--latency", type=float, default=0.1)
+    ap.add_argument("--tail", type=float, default=1.5)
+    ap.add_argument("--tail-rate", type=float, default=0.08)
+    ap.add_argument("--fail-rate", type=float, default=0.05)
+    args = ap.parse_args()
+
+    server, _ = mock_llm_server.start(latency=args.latency, tail=args.tail, tail_rate=args.tail_rate,
+                                      fail_rate=args.fail_rate)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    report = {}
+    for name, hedge in (("plain", False), ("hedged", True)):
+        gateway = LLMGateway("test", base_url=base_url, model="mock", backoff=0.05,
+                             max_in_flight=args.concurrency * 2, hedge=hedge)
+        report[name] = run(gateway, args.requests, args.concurrency)
+    print(json.dumps(report, indent=2))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Relevance-ranked memory retrieval: build time, index memory and top-k query
+latency of MemoryIndex over synthetic conversation memories.
+
+    python benchmarks/bench_memory_index.py --sizes 10000 100000 1000000
+"""
+import os, sys, json, time, random, argparse, resource
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import memory_index
+from memory_index import MemoryIndex
+
+TOPICS = ("robot motor battery camera stream weather music cooking garden travel school homework "
+          "football movie birthday doctor coffee python arduino sensor wifi router printer guitar "
+          "painting laptop phone meeting project deadline budget holiday beach mountain train "
+          "breakfast dinner recipe exercise running sleep dream book novel history science space").split()
+FILLER = ("talked discussed mentioned asked wondered decided planned remembered liked wanted "
+          "yesterday today tomorrow morning evening really quite maybe idea problem question").split()
+# Long tail of rarer words (names, places, products) drawn with a Zipf-like skew
+RARE = [f"term{i}" for i in range(20000)]
+
+
+def synthetic_doc(rng, i):
+    topic = rng.sample(TOPICS, 3)
+    rare = [RARE[min(int(rng.paretovariate(1.1)) - 1, len(RARE) - 1)] for _ in range(8)]
+    words = topic * 2 + rare + rng.choices(FILLER, k=rng.randint(20, 60))
+    rng.shuffle(words)
+    return {
+        "_id": i,
+        "title": f"{topic[0].title()} and {topic[1]}",
+        "overview": " ".join(words[:15]),
+        "content": " ".join(words[15:]),
+    }
+
+
+def percentile(samples, q):
+    s = sorted(samples)
+    return s[min(len(s) - 1, int(q * len(s)))]
+
+
+def run(size, queries, k, seed=1):
+    rng = random.Random(seed)
+    docs = [synthetic_doc(rng, i) for i in range(size)]
+    rss0 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    index = MemoryIndex()
+    t0 = time.perf_counter()
+    for doc in docs:
+        index.add(doc)
+    build_s = time.perf_counter() - t0
+    # ru_maxrss is in KiB on Linux; the source docs are already resident
+    rss_mb = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss0) / 1024
+    del docs
+
+    prompts = [" ".join(rng.sample(TOPICS, rng.randint(1, 3)) + rng.sample(RARE[:2000], 1))
+               for _ in range(queries)]
+    latencies = []
+    for p in prompts:
+        t0 = time.perf_counter()
+        index.search(p, k)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return {
+        "documents": size,
+        "backend": index.stats()["backend"],
+        "build_s": round(build_s, 2),
+        "index_rss_mb": round(rss_mb, 1),
+        "query_p50_ms": round(percentile(latencies, 0.5), 3),
+        "query_p99_ms": round(percentile(latencies, 0.99), 3),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    ap.add_argument("--queries", type=int, default=500)
+    ap.add_argument("-k", type=int, default=5)
+    ap.add_argument("--python", action="store_true", help="force the pure-Python scorer")
+    args = ap.parse_args()
+
+    if args.python:
+        memory_index.np = None
+    print(json.dumps([run(n, args.queries, args.k) for n in args.sizes], indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+MJPEG fan-out under N simulated viewers: legacy Condition/notify_all
+StreamingOutput vs the single-encode FrameBroadcaster.
+
+Each viewer "sends" its chunk into a local socket pair, and a share of the
+viewers are made slow to show how they keep up (or don't) with the camera.
+
+    python benchmarks/bench_mjpeg_fanout.py --viewers 1 10 50 --seconds 5
+"""
+import io, os, sys, json, time, socket, argparse, threading
+from threading import Condition
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from streaming import FrameBroadcaster
+
+
+class LegacyStreamingOutput(io.BytesIO):
+    # Copy of the pre-broadcaster StreamingOutput for comparison
+    def __init__(self):
+        super().__init__()
+        self.frame = None
+        self.condition = Condition()
+
+    def write(self, buf):
+        with self.condition:
+            self.frame = buf
+            self.condition.notify_all()
+
+
+def legacy_generator(output, stop):
+    while not stop.is_set():
+        with output.condition:
+            output.condition.wait(timeout=0.5)
+            frame = output.frame
+        if frame:
+            yield (b'--frame\r\nContent-Type: image/jpeg\r\nContent-Length: ' +
+                   str(len(frame)).encode() + b'\r\n\r\n' + frame + b'\r\n')
+
+
+def broadcaster_generator(output, stop):
+    with output.subscribe() as sub:
+        while not stop.is_set():
+            chunk = sub.get(timeout=0.5)
+            if chunk is not None:
+                yield chunk
+
+
+def viewer(gen, counter, idx, slow_delay):
+    a, b = socket.socketpair()
+    drain = threading.Thread(target=lambda: _drain(b), daemon=True)
+    drain.start()
+    for chunk in gen:
+        a.sendall(chunk)
+        counter[idx] += 1
+        if slow_delay:
+            time.sleep(slow_delay)
+    a.close()
+
+
+def _drain(sock):
+    while sock.recv(1 << 16):
+        pass
+
+
+def run(kind, viewers, seconds, fps, frame_size, slow_share, slow_delay):
+    output = LegacyStreamingOutput() if kind == "legacy" else FrameBroadcaster()
+    make_gen = legacy_generator if kind == "legacy" else broadcaster_generator
+    stop = threading.Event()
+    counter = [0] * viewers
+    slow = int(viewers * slow_share)
+    threads = []
+    for i in range(viewers):
+        t = threading.Thread(target=viewer, args=(make_gen(output, stop), counter, i,
+                                                  slow_delay if i < slow else 0), daemon=True)
+        t.start()
+        threads.append(t)
+    time.sleep(0.2)
+
+    frame = os.urandom(frame_size)
+    period = 1.0 / fps
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    start_counts = list(counter)
+    next_t = wall0
+    while time.perf_counter() - wall0 < seconds:
+        output.write(frame)
+        next_t += period
+        time.sleep(max(0.0, next_t - time.perf_counter()))
+    wall = time.perf_counter() - wall0
+    cpu = time.process_time() - cpu0
+    per_client = [(c - s) / wall for c, s in zip(counter, start_counts)]
+    stop.set()
+    for t in threads:
+        t.join(timeout=2)
+
+    fast = per_client[slow:] or [0.0]
+    slow_fps = per_client[:slow] or [0.0]
+    return {
+        "viewers": viewers,
+        "cpu_percent": round(100.0 * cpu / wall, 1),
+        "fps_fast_clients_min": round(min(fast), 1),
+        "fps_fast_clients_avg": round(sum(fast) / len(fast), 1),
+        "fps_slow_clients_avg": round(sum(slow_fps) / len(slow_fps), 1) if slow else None,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--viewers", type=int, nargs="+", default=[1, 10, 50])
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--fps", type=float, default=30.0)
+    ap.add_argument("--frame-kb", type=int, default=45, help="size of one JPEG")
+    ap.add_argument("--slow-share", type=float, default=0.2, help="fraction of slow viewers")
+    ap.add_argument("--slow-delay", type=float, default=0.1, help="extra seconds per frame for slow viewers")
+    args = ap.parse_args()
+
+    results = []
+    for n in args.viewers:
+        for kind in ("legacy", "broadcaster"):
+            r = run(kind, n, args.seconds, args.fps, args.frame_kb * 1024, args.slow_share, args.slow_delay)
+            r["impl"] = kind
+            results.append(r)
+            print(json.dumps(r), flush=True)
+
+
+if __name__ == "__main__":
+    main()
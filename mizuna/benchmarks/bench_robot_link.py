@@ -0,0 +1,121 @@
+"""
+Round-trip latency of robot commands against a local stand-in for the ESP8266.
+
+Compares the old one-shot requests.get() per command with the pooled
+RobotLink, both synchronously and through the queued sender thread.
+
+    python benchmarks/bench_robot_link.py -n 500
+"""
+import os, sys, json, time, argparse, threading, statistics
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import requests
+from robot_link import RobotLink
+
+received = {}
+received_cond = threading.Condition()
+
+
+class FakeRobot(BaseHTTPRequestHandler):
+    # HTTP/1.1 so the server honours keep-alive like the ESP8266WebServer does
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; avoid Nagle + delayed-ACK stalls
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        q = parse_qs(url.query)
+        if url.path == "/cmd":
+            body = {"ok": True, "cmd": q.get("c", [""])[0]}
+        elif url.path == "/speed":
+            body = {"ok": True, "speed": int(q.get("v", ["0"])[0])}
+        else:
+            body = {"ok": True}
+        seq = q.get("seq", [None])[0]
+        if seq is not None:
+            with received_cond:
+                received[seq] = time.perf_counter()
+                received_cond.notify_all()
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def percentiles(samples):
+    s = sorted(samples)
+    pick = lambda p: s[min(len(s) - 1, int(round(p * (len(s) - 1))))]
+    return {
+        "p50_ms": round(pick(0.50) * 1000, 3),
+        "p99_ms": round(pick(0.99) * 1000, 3),
+        "mean_ms": round(statistics.mean(s) * 1000, 3),
+    }
+
+
+def bench_one_shot(base, n):
+    out = []
+    for i in range(n):
+        path, params = ("/cmd", {"c": "F"}) if i % 2 == 0 else ("/speed", {"v": "512"})
+        t0 = time.perf_counter()
+        requests.get(f"{base}{path}", params=params, timeout=2)
+        out.append(time.perf_counter() - t0)
+    return out
+
+
+def bench_pooled(link, n):
+    out = []
+    for i in range(n):
+        path, params = ("/cmd", {"c": "F"}) if i % 2 == 0 else ("/speed", {"v": "512"})
+        t0 = time.perf_counter()
+        link.request(path, params)
+        out.append(time.perf_counter() - t0)
+    return out
+
+
+def bench_queued(link, n):
+    # Time from submit() returning to the stand-in seeing the request
+    enqueue, delivered = [], []
+    for i in range(n):
+        seq = str(i)
+        t0 = time.perf_counter()
+        link.submit("/cmd", {"c": "F", "seq": seq})
+        t1 = time.perf_counter()
+        enqueue.append(t1 - t0)
+        with received_cond:
+            received_cond.wait_for(lambda: seq in received, timeout=2)
+            delivered.append(received.get(seq, t1 + 2) - t0)
+    return enqueue, delivered
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("-n", type=int, default=500, help="requests per scenario")
+    args = ap.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeRobot)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://localhost:{server.server_address[1]}"
+    link = RobotLink(base, queue_size=args.n + 1)
+
+    results = {
+        "one_shot_requests_get": percentiles(bench_one_shot(base, args.n)),
+        "pooled_session": percentiles(bench_pooled(link, args.n)),
+    }
+    enqueue, delivered = bench_queued(link, args.n)
+    results["queued_submit_return"] = percentiles(enqueue)
+    results["queued_delivery"] = percentiles(delivered)
+
+    print(json.dumps(results, indent=2))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Flask (thread per connection) vs ASGI (one asyncio loop) under 1, 10 and 50
+concurrent clients: server memory, thread count and per-route p50/p99.
+
+Each run starts mizuna.py in a subprocess with the synthetic camera, fake
+TTS and benchmarks/mock_llm_server.py standing in for Groq. One client in
+five holds an MJPEG stream open; the rest loop over /performance polls,
+/cmd presses and uncached /ask calls.
+
+    python benchmarks/bench_server_concurrency.py --clients 1 10 50 --seconds 10
+"""
+import os, sys, json, time, random, socket, argparse, threading, subprocess, http.client
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+
+PROMPTS = ["hello there", "tell me a joke", "what can you do", "how fast can you drive", "say something nice"]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_up(port: int, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/uptime")
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server on :{port} did not come up")
+
+
+def _proc_status(pid: int) -> dict:
+    out = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "Threads"):
+                out[key] = int(value.split()[0])
+    return out
+
+
+def _pct(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(p * len(values)))], 1)
+
+
+def api_client(port, stop, latencies, errors):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    calls = [
+        ("performance", "GET", "/performance", None),
+        ("cmd", "POST", "/cmd", {"cmd": random.choice("FBLRS")}),
+        ("ask", "POST", "/ask", None),
+    ]
+    while not stop.is_set():
+        name, method, path, body = random.choice(calls)
+        if name == "ask":
+            body = {"text": random.choice(PROMPTS), "cache": False}
+        t0 = time.perf_counter()
+        try:
+            conn.request(method, path, body=json.dumps(body) if body else None,
+                         headers={"Content-Type": "application/json"})
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status >= 400:
+                errors[name] = errors.get(name, 0) + 1
+            latencies.setdefault(name, []).append((time.perf_counter() - t0) * 1000)
+        except OSError:
+            errors[name] = errors.get(name, 0) + 1
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        time.sleep(0.05)
+    conn.close()
+
+
+def viewer_client(port, stop, frames):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    conn.request("GET", "/stream.mjpg?profile=low")
+    resp = conn.getresponse()
+    while not stop.is_set():
+        chunk = resp.read1(65536) if hasattr(resp, "read1") else resp.read(65536)
+        if not chunk:
+            break
+        frames[0] += chunk.count(b"--frame")
+    conn.close()
+
+
+def run_level(port, pid, clients, seconds):
+    stop = threading.Event()
+    latencies, errors, frames = {}, {}, [0]
+    viewers = clients // 5
+    threads = [threading.Thread(target=viewer_client, args=(port, stop, frames), daemon=True)
+               for _ in range(viewers)]
+    threads += [threading.Thread(target=api_client, args=(port, stop, latencies, errors), daemon=True)
+                for _ in range(clients - viewers)]
+    for t in threads:
+        t.start()
+    peak = {"VmRSS": 0, "Threads": 0}
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        status = _proc_status(pid)
+        for key in peak:
+            peak[key] = max(peak[key], status.get(key, 0))
+        time.sleep(0.25)
+    stop.set()
+    for t in threads:
+        t.join(timeout=5)
+    every = [ms for values in latencies.values() for ms in values]
+    return {
+        "clients": clients,
+        "viewers": viewers,
+        "peak_rss_mb": round(peak["VmRSS"] / 1024, 1),
+        "peak_threads": peak["Threads"],
+        "requests": len(every),
+        "p50_ms": _pct(every, 0.5),
+        "p99_ms": _pct(every, 0.99),
+        "routes": {name: {"n": len(v), "p50_ms": _pct(v, 0.5), "p99_ms": _pct(v, 0.99)}
+                   for name, v in sorted(latencies.items())},
+        "errors": errors,
+        "viewer_fps": round(frames[0] / seconds / viewers, 1) if viewers else None,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--clients", type=int, nargs="+", default=[1, 10, 50])
+    ap.add_argument("--seconds", type=float, default=10.0)
+    ap.add_argument("--modes", nargs="+", default=["flask", "asgi"])
+    ap.add_argument("--llm-latency", type=float, default=0.3)
+    args = ap.parse_args()
+
+    mock_port = _free_port()
+    mock = subprocess.Popen([sys.executable, os.path.join(HERE, "mock_llm_server.py"), "--port", str(mock_port),
+                             "--latency", str(args.llm_latency)], stdout=subprocess.DEVNULL)
+    report = {}
+    try:
+        for mode in args.modes:
+            report[mode] = []
+            for clients in args.clients:
+                # Fresh server per level so peak memory is not inherited from the previous one
+                port = _free_port()
+                env = dict(os.environ, SERVER_MODE=mode, PORT=str(port), GROQ_API_KEY="test",
+                           GROQ_BASE_URL=f"http://127.0.0.1:{mock_port}", ROBOT_BASE=f"http://127.0.0.1:{mock_port}",
+                           CAMERA_BACKEND="synthetic", TTS_BACKEND="fake", TTS_PLAYER="sleep", TTS_CACHE_MB="0",
+                           LLM_MAX_IN_FLIGHT="64")
+                server = subprocess.Popen([sys.executable, "mizuna.py"], cwd=ROOT, env=env,
+                                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                try:
+                    _wait_up(port)
+                    report[mode].append(run_level(port, server.pid, clients, args.seconds))
+                finally:
+                    server.terminate()
+                    server.wait(timeout=10)
+                print(json.dumps({mode: report[mode][-1]}), file=sys.stderr)
+    finally:
+        mock.terminate()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
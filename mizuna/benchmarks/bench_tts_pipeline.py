@@ -0,0 +1,57 @@
+"""
+Speech pipelining: time to speak a multi-sentence reply when each sentence
+is synthesized then played in turn vs TTSWorker, which synthesizes the next
+sentence while the current one plays. Uses the fake backend and player, so
+`--latency` stands in for the Azure round trip.
+
+    python benchmarks/bench_tts_pipeline.py --latency 0.25 --sentences 4
+"""
+import os, sys, json, time, argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from tts import TTSWorker, FakeBackend, SleepPlayer
+
+
+def sequential(backend, player, sentences):
+    t0 = time.perf_counter()
+    first = None
+    for s in sentences:
+        audio = backend.synthesize(s)
+        if first is None:
+            first = time.perf_counter() - t0
+        player.play(audio)
+    return first, time.perf_counter() - t0
+
+
+def pipelined(worker, text):
+    t0 = time.perf_counter()
+    utt = worker.say(text)
+    utt.wait()
+    return utt.first_audio - t0, time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--latency", type=float, default=0.25, help="simulated synthesis time per sentence (s)")
+    ap.add_argument("--sentences", type=int, default=4)
+    ap.add_argument("--chars-per-second", type=float, default=60.0, help="simulated speaking rate")
+    args = ap.parse_args()
+
+    sentences = [f"This is sentence number {i + 1} of the reply." for i in range(args.sentences)]
+    backend = FakeBackend(latency=args.latency, chars_per_second=args.chars_per_second)
+    seq_first, seq_total = sequential(backend, SleepPlayer(), sentences)
+
+    worker = TTSWorker(lambda: FakeBackend(latency=args.latency, chars_per_second=args.chars_per_second),
+                       SleepPlayer())
+    pipe_first, pipe_total = pipelined(worker, " ".join(sentences))
+    print(json.dumps({
+        "sentences": args.sentences,
+        "sequential": {"first_audio_ms": round(seq_first * 1000), "total_ms": round(seq_total * 1000)},
+        "pipelined": {"first_audio_ms": round(pipe_first * 1000), "total_ms": round(pipe_total * 1000)},
+        "worker": worker.stats(),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
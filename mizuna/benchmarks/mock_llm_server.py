@@ -0,0 +1,107 @@
+"""
+Local stand-in for Groq's OpenAI-compatible chat completions endpoint, for
+exercising LLMGateway (and the /ask routes) without network or API key.
+
+Latency is drawn per request: `--latency` seconds normally and `--tail`
+seconds with probability `--tail-rate`; `--fail-rate` of requests answer
+503 so retries kick in. Streaming requests send the reply word by word,
+`--token-delay` apart.
+
+    python benchmarks/mock_llm_server.py --port 8099 --latency 0.3 --tail 2 --tail-rate 0.05
+    GROQ_BASE_URL=http://127.0.0.1:8099 GROQ_API_KEY=test python mizuna.py
+"""
+import json, time, random, argparse, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY = "Hello there! I am Mizuna, your friendly robot. How can I help you today?"
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    config = None
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        cfg = self.config
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        with cfg["lock"]:
+            cfg["requests"] += 1
+        if not self.path.endswith("/chat/completions"):
+            return self._json(404, {"error": {"message": "not found"}})
+        if random.random() < cfg["fail_rate"]:
+            return self._json(503, {"error": {"message": "overloaded"}})
+        time.sleep(cfg["tail"] if random.random() < cfg["tail_rate"] else cfg["latency"])
+        created = int(time.time())
+        model = request.get("model", "mock")
+        if not request.get("stream"):
+            return self._json(200, {
+                "id": "chatcmpl-mock", "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": REPLY}}],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 16, "total_tokens": 26},
+            })
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def send(data: str):
+            payload = f"data: {data}\n\n".encode()
+            self.wfile.write(f"{len(payload):X}\r\n".encode() + payload + b"\r\n")
+            self.wfile.flush()
+
+        words = REPLY.split(" ")
+        for i, word in enumerate(words):
+            send(json.dumps({
+                "id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": {"content": word + (" " if i < len(words) - 1 else "")},
+                             "finish_reason": None}],
+            }))
+            time.sleep(cfg["token_delay"])
+        send("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def start(port=0, latency=0.3, tail=2.0, tail_rate=0.0, fail_rate=0.0, token_delay=0.02):
+    """Starts the mock in a background thread; returns (server, config)."""
+    config = {"latency": latency, "tail": tail, "tail_rate": tail_rate, "fail_rate": fail_rate,
+              "token_delay": token_delay, "requests": 0, "lock": threading.Lock()}
+    handler = type("Handler", (MockLLMHandler,), {"config": config})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, config
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--port", type=int, default=8099)
+    ap.add_argument("--latency", type=float, default=0.3)
+    ap.add_argument("--tail", type=float, default=2.0)
+    ap.add_argument("--tail-rate", type=float, default=0.0)
+    ap.add_argument("--fail-rate", type=float, default=0.0)
+    ap.add_argument("--token-delay", type=float, default=0.02)
+    args = ap.parse_args()
+    server, _ = start(args.port, args.latency, args.tail, args.tail_rate, args.fail_rate, args.token_delay)
+    print(f"Mock LLM listening on http://127.0.0.1:{server.server_port}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
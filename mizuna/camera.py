@@ -0,0 +1,371 @@
+import io, time, base64, asyncio, logging, threading
+from contextlib import contextmanager, asynccontextmanager
+from typing import Callable, Dict, NamedTuple, Tuple
+
+from lazy import LazyValue
+from streaming import FrameBroadcaster
+
+
+class StreamProfile(NamedTuple):
+    name: str
+    stream: str              # picamera2 stream the encoder reads: "main" or "lores"
+    size: Tuple[int, int]
+    fps: float               # frame-rate cap for viewers of this profile
+    quality: int             # JPEG quality 1..100
+
+
+# Ordered best to worst; "auto" clients step along this list
+PROFILES = {
+    "high": StreamProfile("high", "main", (640, 480), 30, 85),
+    "medium": StreamProfile("medium", "main", (640, 480), 15, 60),
+    "low": StreamProfile("low", "lores", (320, 240), 8, 45),
+}
+DEFAULT_PROFILE = "high"
+
+
+class Picamera2Backend:
+    """
+    One shared Pi camera capture feeding a JPEG encoder per active profile.
+
+    The main stream carries full resolution and the ISP-scaled lores stream
+    carries the small profile, so no profile pays for a software resize.
+    """
+
+    def __init__(self, profiles: Dict[str, StreamProfile]):
+        from picamera2 import Picamera2
+        self.picam2 = Picamera2()
+        main = max((p.size for p in profiles.values() if p.stream == "main"), default=(640, 480))
+        streams = {"main": {"size": main, "format": "XRGB8888"}}
+        lores = [p.size for p in profiles.values() if p.stream == "lores"]
+        if lores:
+            streams["lores"] = {"size": max(lores), "format": "YUV420"}
+        self.camera_fps = max(p.fps for p in profiles.values())
+        config = self.picam2.create_video_configuration(
+            **streams, controls={"FrameRate": self.camera_fps})
+        self.picam2.configure(config)
+        self._encoders = {}
+        self._lock = threading.Lock()
+
+    def start(self, output, profile: StreamProfile):
+        from picamera2.encoders import JpegEncoder
+        from picamera2.outputs import FileOutput
+        with self._lock:
+            if not self._encoders:
+                self.picam2.start()
+            encoder = JpegEncoder(q=profile.quality)
+            if hasattr(encoder, "frame_skip_count"):
+                # Skip frames before they are encoded rather than after
+                encoder.frame_skip_count = max(1, round(self.camera_fps / profile.fps))
+            self.picam2.start_encoder(encoder, FileOutput(output), name=profile.stream)
+            self._encoders[profile.name] = encoder
+
+    def stop(self, profile: StreamProfile):
+        with self._lock:
+            encoder = self._encoders.pop(profile.name, None)
+            if encoder is not None:
+                self.picam2.stop_encoder(encoder)
+            if not self._encoders:
+                self.picam2.stop()
+
+    def close(self):
+        self.picam2.close()
+
+
+class FakeCameraBackend:
+    """Stand-in backend that only records start/stop calls."""
+
+    def __init__(self, *args, **kwargs):
+        self.starts = 0
+        self.stops = 0
+        self.running = set()
+
+    def start(self, output, profile: StreamProfile):
+        self.starts += 1
+        self.running.add(profile.name)
+
+    def stop(self, profile: StreamProfile):
+        self.stops += 1
+        self.running.discard(profile.name)
+
+    def close(self):
+        self.running.clear()
+
+
+# 32x24 solid-colour JPEG used by the synthetic source when Pillow is missing
+_PLACEHOLDER_JPEG = base64.b64decode(
+    "/9j/4AAQSkZJRgABAQAAAQABAAD/2wBDABQODxIPDRQSEBIXFRQYHjIhHhwcHj0sLiQySUBMS0dARkVQWnNiUFVtVkVGZIhlbXd7"
+    "gYKBTmCNl4x9lnN+gXz/2wBDARUXFx4aHjshITt8U0ZTfHx8fHx8fHx8fHx8fHx8fHx8fHx8fHx8fHx8fHx8fHx8fHx8fHx8fHx8"
+    "fHx8fHx8fHz/wAARCAAYACADASIAAhEBAxEB/8QAHwAAAQUBAQEBAQEAAAAAAAAAAAECAwQFBgcICQoL/8QAtRAAAgEDAwIEAwUF"
+    "BAQAAAF9AQIDAAQRBRIhMUEGE1FhByJxFDKBkaEII0KxwRVS0fAkM2JyggkKFhcYGRolJicoKSo0NTY3ODk6Q0RFRkdISUpTVFVW"
+    "V1hZWmNkZWZnaGlqc3R1dnd4eXqDhIWGh4iJipKTlJWWl5iZmqKjpKWmp6ipqrKztLW2t7i5usLDxMXGx8jJytLT1NXW19jZ2uHi"
+    "4+Tl5ufo6erx8vP09fb3+Pn6/8QAHwEAAwEBAQEBAQEBAQAAAAAAAAECAwQFBgcICQoL/8QAtREAAgECBAQDBAcFBAQAAQJ3AAEC"
+    "AxEEBSExBhJBUQdhcRMiMoEIFEKRobHBCSMzUvAVYnLRChYkNOEl8RcYGRomJygpKjU2Nzg5OkNERUZHSElKU1RVVldYWVpjZGVm"
+    "Z2hpanN0dXZ3eHl6goOEhYaHiImKkpOUlZaXmJmaoqOkpaanqKmqsrO0tba3uLm6wsPExcbHyMnK0tPU1dbX2Nna4uPk5ebn6Onq"
+    "8vP09fb3+Pn6/9oADAMBAAIRAxEAPwDLooorpOUKKKKACiiigAooooA//9k="
+)
+
+
+class SyntheticCameraBackend:
+    """
+    Frame source for running without a camera: one thread per active profile
+    writes JPEGs at the profile's frame rate. Uses Pillow for a moving test
+    pattern at the profile's size when available, else a fixed placeholder.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._threads = {}
+        self._lock = threading.Lock()
+        try:
+            from PIL import Image, ImageDraw
+            self._pil = (Image, ImageDraw)
+        except Exception:
+            self._pil = None
+
+    def _render(self, profile: StreamProfile, n: int) -> bytes:
+        if self._pil is None:
+            return _PLACEHOLDER_JPEG
+        Image, ImageDraw = self._pil
+        w, h = profile.size
+        im = Image.new("RGB", (w, h), (20, 30, 40))
+        x = (n * 8) % w
+        ImageDraw.Draw(im).rectangle((x, 0, x + w // 10, h), fill=(0, 200, 255))
+        buf = io.BytesIO()
+        im.save(buf, "JPEG", quality=profile.quality)
+        return buf.getvalue()
+
+    def _run(self, output, profile: StreamProfile, stop: threading.Event):
+        period = 1.0 / profile.fps
+        n = 0
+        while not stop.wait(period):
+            output.write(self._render(profile, n))
+            n += 1
+
+    def start(self, output, profile: StreamProfile):
+        stop = threading.Event()
+        t = threading.Thread(target=self._run, args=(output, profile, stop),
+                             name=f"synthetic-{profile.name}", daemon=True)
+        with self._lock:
+            self._threads[profile.name] = stop
+        t.start()
+
+    def stop(self, profile: StreamProfile):
+        with self._lock:
+            stop = self._threads.pop(profile.name, None)
+        if stop is not None:
+            stop.set()
+
+    def close(self):
+        with self._lock:
+            for stop in self._threads.values():
+                stop.set()
+            self._threads.clear()
+
+
+BACKENDS = {
+    "picamera2": Picamera2Backend,
+    "synthetic": SyntheticCameraBackend,
+    "fake": FakeCameraBackend,
+}
+
+
+def backend_factory(kind: str, profiles: Dict[str, StreamProfile] = PROFILES) -> Callable:
+    """Returns a callable that builds the named backend; nothing is imported until it runs."""
+    if kind not in BACKENDS:
+        raise ValueError(f"Unknown camera backend '{kind}', expected one of {list(BACKENDS)}")
+    return lambda: BACKENDS[kind](profiles)
+
+
+class _AdaptiveLevel:
+    """Profile choice for an "auto" viewer, re-evaluated every `window` seconds."""
+
+    def __init__(self, order, window: float, step_down: float, step_up_after: float):
+        self.order = order
+        self.window = window
+        self.step_down = step_down
+        self.step_up_after = step_up_after
+        self.level = 0
+
+    @property
+    def name(self) -> str:
+        return self.order[self.level]
+
+    def begin(self, sub):
+        self.window_start = self.calm_since = time.monotonic()
+        self.base_delivered, self.base_skipped = sub.delivered, sub.skipped
+
+    def changed(self, sub) -> bool:
+        """True when the viewer should re-subscribe at the new level."""
+        now = time.monotonic()
+        if now - self.window_start < self.window:
+            return False
+        delivered = sub.delivered - self.base_delivered
+        skipped = sub.skipped - self.base_skipped
+        self.window_start, self.base_delivered, self.base_skipped = now, sub.delivered, sub.skipped
+        if skipped:
+            self.calm_since = now
+        if skipped / max(1, delivered + skipped) > self.step_down and self.level < len(self.order) - 1:
+            self.level += 1
+            logging.info(f"Auto stream stepping down to '{self.name}'")
+            return True
+        if not skipped and now - self.calm_since >= self.step_up_after and self.level > 0:
+            self.level -= 1
+            logging.info(f"Auto stream stepping up to '{self.name}'")
+            return True
+        return False
+
+
+class _ProfileState:
+    def __init__(self, profile: StreamProfile):
+        self.profile = profile
+        self.output = FrameBroadcaster(max_fps=profile.fps)
+        self.refs = 0
+        self.running = False
+        self.starts = 0
+        self.stop_timer = None
+        self.started_at = None
+        self.active_total = 0.0
+
+
+class CameraManager:
+    """
+    Reference-counted owner of the camera encoders.
+
+    Each profile's encoder starts when its first viewer subscribes and stops
+    once its last one has been gone for `grace` seconds, so nobody watching
+    means no JPEG encoding. The backend itself is only built on first use.
+    """
+
+    def __init__(self, backend_factory: Callable, profiles: Dict[str, StreamProfile] = PROFILES, grace: float = 10.0):
+        self._backend = LazyValue(backend_factory)
+        self.profiles = profiles
+        self.grace = grace
+        self._states = {name: _ProfileState(p) for name, p in profiles.items()}
+        self._lock = threading.Lock()
+        self._created = time.monotonic()
+
+    @property
+    def backend(self):
+        return self._backend.get()
+
+    def output(self, profile: str = DEFAULT_PROFILE) -> FrameBroadcaster:
+        return self._states[profile].output
+
+    def acquire(self, profile: str = DEFAULT_PROFILE):
+        with self._lock:
+            st = self._states[profile]
+            if st.stop_timer is not None:
+                st.stop_timer.cancel()
+                st.stop_timer = None
+            if not st.running:
+                # Raises if the camera is missing or busy; the viewer is not counted then
+                self.backend.start(st.output, st.profile)
+                st.running = True
+                st.starts += 1
+                st.started_at = time.monotonic()
+                logging.info(f"Camera encoder '{profile}' started")
+            st.refs += 1
+
+    def release(self, profile: str = DEFAULT_PROFILE):
+        with self._lock:
+            st = self._states[profile]
+            st.refs = max(0, st.refs - 1)
+            if st.refs == 0 and st.running and st.stop_timer is None:
+                st.stop_timer = threading.Timer(self.grace, self._stop_if_idle, args=(st,))
+                st.stop_timer.daemon = True
+                st.stop_timer.start()
+
+    def _stop_if_idle(self, st: _ProfileState):
+        with self._lock:
+            st.stop_timer = None
+            if st.refs == 0 and st.running:
+                self._stop_locked(st)
+
+    def _stop_locked(self, st: _ProfileState):
+        try:
+            self.backend.stop(st.profile)
+        except Exception as e:
+            logging.warning(f"Camera stop failed: {e}")
+        st.running = False
+        st.active_total += time.monotonic() - st.started_at
+        st.started_at = None
+        logging.info(f"Camera encoder '{st.profile.name}' stopped (idle)")
+
+    @contextmanager
+    def subscribe(self, profile: str = DEFAULT_PROFILE):
+        """Viewer subscription that keeps the profile's encoder running while open."""
+        self.acquire(profile)
+        try:
+            with self._states[profile].output.subscribe() as sub:
+                yield sub
+        finally:
+            self.release(profile)
+
+    @asynccontextmanager
+    async def asubscribe(self, profile: str = DEFAULT_PROFILE):
+        """subscribe() for asyncio viewers: frames wake the event loop, no thread per viewer."""
+        # Starting an encoder can block on the camera, so it happens off the loop
+        await asyncio.to_thread(self.acquire, profile)
+        try:
+            with self._states[profile].output.subscribe(asyncio.get_running_loop()) as sub:
+                yield sub
+        finally:
+            self.release(profile)
+
+    def adaptive_frames(self, order=("high", "medium", "low"), window: float = 3.0,
+                        step_down: float = 0.3, step_up_after: float = 15.0):
+        """
+        Stream chunks for an "auto" viewer. Steps down a profile when more than
+        `step_down` of the frames offered in a window were skipped because the
+        client's send path backed up, and back up after `step_up_after` calm seconds.
+        """
+        adaptive = _AdaptiveLevel(order, window, step_down, step_up_after)
+        while True:
+            with self.subscribe(adaptive.name) as sub:
+                adaptive.begin(sub)
+                for chunk in sub:
+                    yield chunk
+                    if adaptive.changed(sub):
+                        break
+
+    async def aadaptive_frames(self, order=("high", "medium", "low"), window: float = 3.0,
+                               step_down: float = 0.3, step_up_after: float = 15.0):
+        """adaptive_frames() as an async generator for the ASGI server."""
+        adaptive = _AdaptiveLevel(order, window, step_down, step_up_after)
+        while True:
+            async with self.asubscribe(adaptive.name) as sub:
+                adaptive.begin(sub)
+                async for chunk in sub:
+                    yield chunk
+                    if adaptive.changed(sub):
+                        break
+
+    def duty_cycle(self, profile: str = DEFAULT_PROFILE) -> float:
+        with self._lock:
+            st = self._states[profile]
+            active = st.active_total
+            if st.started_at is not None:
+                active += time.monotonic() - st.started_at
+        return active / max(1e-6, time.monotonic() - self._created)
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                "running": st.running,
+                "subscribers": st.refs,
+                "encoder_starts": st.starts,
+                "duty_cycle": round(self.duty_cycle(name), 3),
+                "stream": st.output.stats(),
+            }
+            for name, st in self._states.items()
+        }
+
+    def close(self):
+        with self._lock:
+            for st in self._states.values():
+                if st.stop_timer is not None:
+                    st.stop_timer.cancel()
+                    st.stop_timer = None
+                if st.running:
+                    self._stop_locked(st)
+        if self._backend.built:
+            self.backend.close()
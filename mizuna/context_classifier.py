@@ -0,0 +1,165 @@
+import re, threading
+from collections import Counter
+from typing import Dict, List, Set
+
+# ---- Trigger keywords ----
+# Matched as plain substrings of the lowercased prompt, like the original
+# `keyword in prompt_lower` checks ("my" also fires on "myself").
+
+CATEGORIES: Dict[str, tuple] = {
+    "memory": (
+        "remember", "previous", "before", "earlier", "past", "recall",
+        "discussed", "talked about", "mentioned", "conversation", "history",
+        "last time", "you said", "we talked", "you told me", "back then",
+        "when we", "our chat", "our discussion", "what was", "what did",
+    ),
+    "personalized": (
+        "my", "i am", "i'm", "about me", "tell me about myself",
+        "what do you know about", "who am i", "my project", "my work",
+        "my idea", "my plan", "my goal", "my robot", "my device",
+        "i mentioned", "i told you", "i said", "i was working",
+        "remind me", "help me with", "continue with", "follow up",
+    ),
+    "knowledge_seeking": (
+        "what is", "who is", "explain", "define", "how does", "why does",
+        "tell me about", "what are", "how to", "what's the difference",
+        "help me understand", "can you explain", "what was that about",
+        "details about", "more information", "elaborate on", "describe",
+    ),
+    "project_related": (
+        "project", "build", "building", "robot", "device", "machine",
+        "electronic", "funding", "development", "prototype", "design",
+        "technology", "engineering", "code", "programming", "software",
+        "hardware", "circuit", "component", "sensor", "motor", "battery",
+    ),
+    "task_continuation": (
+        "continue", "next step", "what's next", "proceed", "move forward",
+        "keep going", "carry on", "follow through", "complete", "finish",
+        "resume", "pick up where", "go back to", "return to", "status",
+    ),
+    "advice_seeking": (
+        "should i", "what would you", "recommend", "suggest", "advice",
+        "opinion", "think about", "feedback", "guidance", "help me decide",
+        "best approach", "how would you", "what's your take", "thoughts on",
+    ),
+    "problem_solving": (
+        "problem", "issue", "error", "trouble", "stuck", "difficult",
+        "challenge", "obstacle", "bug", "fix", "solve", "troubleshoot",
+        "not working", "failed", "broken", "wrong", "help",
+    ),
+    "comparison": (
+        "better", "worse", "compare", "comparison", "versus", "vs",
+        "difference between", "similar to", "like", "unlike", "instead",
+        "alternative", "option", "choice", "prefer", "recommend",
+    ),
+    # Only count together with the prompt length rules in classify()
+    "topic": ("about", "regarding"),
+    "follow_up": ("this", "that", "it", "they", "them"),
+}
+
+
+# ---- Matcher ----
+
+def _trie_pattern(words) -> str:
+    """Regex alternation factored by common prefix, longest alternative first."""
+    trie = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node) -> str:
+        end = "" in node
+        alts = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        # Greedy optional keeps the longer keyword when both match here
+        return f"(?:{body})?" if end else body
+
+    return build(trie)
+
+
+def _closure(keywords: Dict[str, Set[str]]) -> Dict[str, frozenset]:
+    # A longer match hides shorter keywords starting at the same position
+    # ("help me with" also means "help"), so each keyword carries the
+    # categories of all its keyword prefixes.
+    return {
+        kw: frozenset().union(*(cats for other, cats in keywords.items() if kw.startswith(other)))
+        for kw in keywords
+    }
+
+
+_keywords: Dict[str, Set[str]] = {}
+for _category, _words in CATEGORIES.items():
+    for _w in _words:
+        _keywords.setdefault(_w, set()).add(_category)
+
+_CATEGORIES_FOR = _closure(_keywords)
+_MATCHER = re.compile(_trie_pattern(_keywords))
+
+_counts = Counter()
+_counts_lock = threading.Lock()
+
+
+def matched_categories(prompt: str) -> Set[str]:
+    """Every category with at least one keyword in the prompt, before length rules."""
+    text = prompt.lower()
+    search = _MATCHER.search
+    found = set()
+    pos = 0
+    while True:
+        m = search(text, pos)
+        if m is None:
+            return found
+        found |= _CATEGORIES_FOR[m.group()]
+        # Resume one character in, not after the match, so keywords that
+        # start inside it still count ("pastatus" has "past" and "status")
+        pos = m.start() + 1
+
+
+def _fired(prompt: str) -> List[str]:
+    found = matched_categories(prompt)
+    n_words = len(prompt.split())
+    if n_words <= 2:
+        found.discard("knowledge_seeking")
+    if n_words <= 3:
+        found.discard("topic")
+    if n_words > 5:
+        found.discard("follow_up")
+    return [c for c in CATEGORIES if c in found]
+
+
+def classify(prompt: str) -> List[str]:
+    """Categories that make the prompt worth loading memory context for."""
+    fired = _fired(prompt)
+    with _counts_lock:
+        _counts["prompts"] += 1
+        _counts.update(fired)
+    return fired
+
+
+# Categories whose prompts lean on the turns before them ("what about that?",
+# "you said earlier", "keep going"); their replies must not be shared
+HISTORY_CATEGORIES = ("memory", "task_continuation")
+_PRONOUN = re.compile(r"\b(?:%s)\b" % "|".join(CATEGORIES["follow_up"]))
+
+
+def refers_to_history(prompt: str) -> bool:
+    """True when the prompt reads as a follow-up to the conversation so far. Not counted in stats()."""
+    fired = _fired(prompt)
+    if any(c in fired for c in HISTORY_CATEGORIES):
+        return True
+    # follow_up matches substrings ("it" in "write"), so only whole pronouns count here
+    return "follow_up" in fired and _PRONOUN.search(prompt.lower()) is not None
+
+
+def should_use_context(prompt: str) -> bool:
+    return bool(classify(prompt))
+
+
+def stats() -> dict:
+    """How often each category fired, out of all classified prompts."""
+    with _counts_lock:
+        return dict(_counts)
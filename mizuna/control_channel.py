@@ -0,0 +1,109 @@
+"""
+Long-lived control channel for teleop clients.
+
+One WebSocket carries every drive press instead of a full HTTP request per
+button. Frames are short text, either compact or JSON:
+
+    compact   "<seq>:<op>"   e.g. "12:F", "13:V512", "14:P"  (seq optional)
+    JSON      {"seq": 12, "cmd": "F"} / {"seq": 13, "speed": 512}
+
+op is one of F/B/L/R/S (drive), V<1..1023> (speed) or P (ping).
+Every frame is acked in the same format it arrived in:
+
+    compact   "12:ok" / "12:err"
+    JSON      {"seq": 12, "status": "ok"}
+"""
+import json, logging
+from typing import Optional, Tuple
+
+DRIVE_OPS = ("F", "B", "L", "R", "S")
+
+
+def parse_frame(text: str) -> Tuple[Optional[str], str, Optional[str], bool]:
+    """Returns (seq, op, value, is_json); op is "cmd", "speed", "ping" or "bad"."""
+    text = (text or "").strip()
+    if text.startswith("{"):
+        try:
+            obj = json.loads(text)
+        except ValueError:
+            return None, "bad", None, True
+        seq = obj.get("seq")
+        if "cmd" in obj:
+            return seq, "cmd", str(obj["cmd"]).strip().upper(), True
+        if "speed" in obj:
+            return seq, "speed", str(obj["speed"]).strip(), True
+        if obj.get("ping"):
+            return seq, "ping", None, True
+        return seq, "bad", None, True
+
+    seq, _, op = text.rpartition(":")
+    seq = seq or None
+    op = op.strip().upper()
+    if op in DRIVE_OPS:
+        return seq, "cmd", op, False
+    if op.startswith("V") and op[1:].isdigit():
+        return seq, "speed", op[1:], False
+    if op == "P":
+        return seq, "ping", None, False
+    return seq, "bad", None, False
+
+
+def format_ack(seq: Optional[str], ok: bool, is_json: bool) -> str:
+    status = "ok" if ok else "err"
+    if is_json:
+        return json.dumps({"seq": seq, "status": status}, separators=(",", ":"))
+    return f"{seq}:{status}" if seq is not None else status
+
+
+def dispatch(link, op: str, value: Optional[str]) -> bool:
+    if op == "cmd" and value in DRIVE_OPS:
+        return link.send_cmd(value)
+    if op == "speed" and value.isdigit() and 1 <= int(value) <= 1023:
+        return link.send_speed(value)
+    return op == "ping"
+
+
+def serve(ws, link):
+    """Pump frames from one WebSocket until it closes."""
+    moved = False
+    try:
+        while True:
+            text = ws.receive()
+            if text is None:
+                break
+            if isinstance(text, bytes):
+                text = text.decode("utf-8", "replace")
+            seq, op, value, is_json = parse_frame(text)
+            ok = dispatch(link, op, value)
+            if op == "cmd":
+                moved = value != "S"
+            ws.send(format_ack(seq, ok, is_json))
+    except Exception as e:
+        logging.info(f"Control channel closed: {e}")
+    finally:
+        # A dropped controller must never leave the robot driving
+        if moved:
+            link.send_cmd("S")
+
+
+async def aserve(ws, link):
+    """serve() for the ASGI server; `ws` has async receive() (None once closed) and send()."""
+    moved = False
+    try:
+        while True:
+            text = await ws.receive()
+            if text is None:
+                break
+            if isinstance(text, bytes):
+                text = text.decode("utf-8", "replace")
+            seq, op, value, is_json = parse_frame(text)
+            # RobotLink only queues the request, so this never blocks the loop
+            ok = dispatch(link, op, value)
+            if op == "cmd":
+                moved = value != "S"
+            await ws.send(format_ack(seq, ok, is_json))
+    except Exception as e:
+        logging.info(f"Control channel closed: {e}")
+    finally:
+        if moved:
+            link.send_cmd("S")
@@ -0,0 +1,154 @@
+import time, threading
+from collections import OrderedDict, deque
+from typing import List, NamedTuple, Optional, Sequence
+
+# Role name and separators the chat format adds around every message
+MESSAGE_OVERHEAD = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Token count without a tokenizer: the larger of ~4/3 tokens per word and
+    ~4 characters per token, which stays on the high side for English.
+    """
+    if not text:
+        return 0
+    words = text.count(" ") + 1
+    return max((words * 4 + 2) // 3, (len(text) + 3) // 4)
+
+
+def estimate_messages(messages: Sequence[dict]) -> int:
+    return sum(estimate_tokens(m["content"]) + MESSAGE_OVERHEAD for m in messages)
+
+
+class Turn(NamedTuple):
+    prompt: str
+    reply: str
+    tokens: int     # estimate for both messages, counted once when stored
+
+
+class _Session:
+    __slots__ = ("turns", "last_used")
+
+    def __init__(self, max_turns: int):
+        self.turns = deque(maxlen=max_turns)
+        self.last_used = time.monotonic()
+
+
+class ConversationBuffer:
+    """
+    Recent exchanges per session, kept in memory only, so follow-ups such
+    as "what about that?" reach the model with the turns they refer to.
+
+    Each session holds its last `max_turns` exchanges and is forgotten after
+    `idle_ttl` seconds of silence; beyond `max_sessions` the least recently
+    used session is dropped.
+    """
+
+    def __init__(self, max_turns: int = 8, idle_ttl: float = 1800.0, max_sessions: int = 64):
+        self.max_turns = max_turns
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()   # session id -> _Session, least recently used first
+        self._lock = threading.Lock()
+        self.turns_added = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def history(self, session: str) -> List[Turn]:
+        """Turns of `session`, oldest first; empty once the session went idle."""
+        with self._lock:
+            st = self._sessions.get(session)
+            if st is None:
+                return []
+            if time.monotonic() - st.last_used > self.idle_ttl:
+                del self._sessions[session]
+                self.expired += 1
+                return []
+            return list(st.turns)
+
+    def add_turn(self, session: str, prompt: str, reply: str):
+        if not reply:
+            return
+        tokens = estimate_tokens(prompt) + estimate_tokens(reply) + 2 * MESSAGE_OVERHEAD
+        with self._lock:
+            st = self._sessions.get(session)
+            if st is None or time.monotonic() - st.last_used > self.idle_ttl:
+                st = self._sessions[session] = _Session(self.max_turns)
+            st.turns.append(Turn(prompt, reply, tokens))
+            st.last_used = time.monotonic()
+            self._sessions.move_to_end(session)
+            self.turns_added += 1
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+
+    def clear(self, session: Optional[str] = None) -> int:
+        """Forget one session (or all of them); returns the number of turns dropped."""
+        with self._lock:
+            if session is not None:
+                st = self._sessions.pop(session, None)
+                return len(st.turns) if st else 0
+            dropped = sum(len(st.turns) for st in self._sessions.values())
+            self._sessions.clear()
+            return dropped
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "turns": sum(len(st.turns) for st in self._sessions.values()),
+                "max_turns": self.max_turns,
+                "turns_added": self.turns_added,
+                "expired": self.expired,
+                "evicted": self.evicted,
+            }
+
+
+def pack_messages(system: str, prompt: str, turns: Sequence[Turn] = (), memories: Sequence[str] = (),
+                  budget: int = 1200, memory_header: str = "", history_share: float = 0.6) -> List[dict]:
+    """
+    Chat messages that fit `budget` estimated tokens.
+
+    The system prompt and the current prompt always go in. Recent turns get
+    up to `history_share` of the rest, newest first and whole exchanges only;
+    ranked memories (one string each) fill what remains, skipping any that do
+    not fit; older turns then take whatever the memories left over.
+    """
+    left = budget - estimate_tokens(system) - estimate_tokens(prompt) - 2 * MESSAGE_OVERHEAD
+
+    kept = 0        # turns taken, counted from the newest
+    used = 0
+    for turn in reversed(turns):
+        if used + turn.tokens > left * history_share:
+            break
+        used += turn.tokens
+        kept += 1
+    left -= used
+
+    memory_lines = []
+    if memories:
+        cost = estimate_tokens(memory_header) + MESSAGE_OVERHEAD
+        for entry in memories:
+            tokens = estimate_tokens(entry) + 1
+            if cost + tokens <= left:
+                memory_lines.append(entry)
+                cost += tokens
+        if memory_lines:
+            left -= cost
+
+    for turn in reversed(turns[:len(turns) - kept]):
+        if turn.tokens > left:
+            break
+        left -= turn.tokens
+        kept += 1
+
+    messages = [{"role": "system", "content": system}]
+    if memory_lines:
+        header = [memory_header] if memory_header else []
+        messages.append({"role": "system", "content": "\n".join(header + memory_lines)})
+    for turn in turns[len(turns) - kept:]:
+        messages.append({"role": "user", "content": turn.prompt})
+        messages.append({"role": "assistant", "content": turn.reply})
+    messages.append({"role": "user", "content": prompt})
+    return messages
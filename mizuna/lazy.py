@@ -0,0 +1,63 @@
+import logging, importlib, threading
+from typing import Callable
+
+
+class LazyModule:
+    """
+    Optional dependency that is only imported on first use.
+
+    Truthiness says whether the module is installed, so the usual
+    `if psutil:` checks keep working without paying for the import at startup.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+        self._tried = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        if not self._tried:
+            with self._lock:
+                if not self._tried:
+                    try:
+                        self._module = importlib.import_module(self._name)
+                    except Exception as e:
+                        logging.info(f"Optional module {self._name} unavailable: {e}")
+                    self._tried = True
+        return self._module
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def __bool__(self):
+        return self.load() is not None
+
+    def __getattr__(self, attr):
+        module = self.load()
+        if module is None:
+            raise AttributeError(f"{self._name} is not installed")
+        return getattr(module, attr)
+
+
+class LazyValue:
+    """Builds a value from `factory` the first time get() is called."""
+
+    def __init__(self, factory: Callable):
+        self._factory = factory
+        self._value = None
+        self._built = False
+        self._lock = threading.Lock()
+
+    def get(self):
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self._value = self._factory()
+                    self._built = True
+        return self._value
+
+    @property
+    def built(self) -> bool:
+        return self._built
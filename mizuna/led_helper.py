@@ -1,13 +1,112 @@
 import sys
 import time
-import board
-import neopixel
 import os
+import json
 import random
 import math
-
-LED_COUNT = 64
-pixels = neopixel.NeoPixel(board.D21, LED_COUNT, brightness=0.45, auto_write=False)
+import inspect
+import mmap
+import struct
+import signal
+import socket
+import threading
+import socketserver
+from typing import Optional
+
+from lazy import LazyModule
+from metrics import LatencyStats
+
+# Hardware libraries load when the strip is opened, so LedClient works without them
+board = LazyModule("board")
+neopixel = LazyModule("neopixel")
+# Whole-strip NumPy frames; loaded on the first animation, not by LedClient users
+led_render = LazyModule("led_render")
+
+LED_COUNT = int(os.getenv("LED_COUNT", "64"))
+LED_BRIGHTNESS = 0.45
+# "neopixel" drives the real strip; "fake" runs everything without hardware
+LED_STRIP = os.getenv("LED_STRIP", "neopixel")
+SOCKET_PATH = os.getenv("LED_SOCKET", "/tmp/mizuna-led.sock")
+# Vectorized frames when NumPy is available; LED_RENDERER=python forces the per-pixel loops
+USE_NUMPY = os.getenv("LED_RENDERER", "numpy") != "python"
+# Precomputed base frames for the vectorized path; LED_TABLES=0 renders them live
+USE_TABLES = os.getenv("LED_TABLES", "1") != "0"
+pixels = None
+
+
+class FakePixels:
+    """
+    Strip stand-in shaped like adafruit_pixelbuf: a GRB byte buffer behind
+    per-pixel Python get/set, with brightness applied on write. show() takes
+    about as long as a real WS2812 write.
+    """
+
+    byteorder = "GRB"
+
+    def __init__(self, n, brightness=1.0, **kwargs):
+        self._pixels = n
+        self._offset = 0
+        self._brightness = brightness
+        self._post_brightness_buffer = bytearray(3 * n)
+        self._pre_brightness_buffer = bytearray(3 * n) if brightness < 1.0 else None
+        self.shows = 0
+
+    @property
+    def brightness(self):
+        return self._brightness
+
+    def __len__(self):
+        return self._pixels
+
+    def _index(self, i):
+        if i < 0:
+            i += self._pixels
+        if not 0 <= i < self._pixels:
+            raise IndexError(i)
+        return i
+
+    def _set(self, i, color):
+        r, g, b = color
+        o = 3 * i
+        if self._pre_brightness_buffer is not None:
+            self._pre_brightness_buffer[o:o + 3] = bytes((g, r, b))
+        k = self._brightness
+        self._post_brightness_buffer[o:o + 3] = bytes((int(g * k), int(r * k), int(b * k)))
+
+    def _get(self, i):
+        buf = self._post_brightness_buffer if self._pre_brightness_buffer is None else self._pre_brightness_buffer
+        g, r, b = buf[3 * i:3 * i + 3]
+        return (r, g, b)
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            for i, color in zip(range(*index.indices(self._pixels)), value):
+                self._set(i, color)
+        else:
+            self._set(self._index(index), value)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._get(i) for i in range(*index.indices(self._pixels))]
+        return self._get(self._index(index))
+
+    def fill(self, color):
+        for i in range(self._pixels):
+            self._set(i, color)
+
+    def show(self):
+        self.shows += 1
+        time.sleep(self._pixels * 30e-6 + 50e-6)
+
+
+def open_strip():
+    global pixels
+    if pixels is None:
+        if LED_STRIP == "fake":
+            pixels = FakePixels(LED_COUNT, brightness=LED_BRIGHTNESS)
+        else:
+            pixels = neopixel.NeoPixel(board.D21, LED_COUNT, brightness=LED_BRIGHTNESS, auto_write=False)
+    return pixels
 
 COLORS = {
     'listening': (0, 100, 255),     # Kept for reference, not directly used by new animations
@@ -64,13 +163,254 @@ def fade(c, f):
 def add(c1, c2):
     return (clamp(c1[0] + c2[0]), clamp(c1[1] + c2[1]), clamp(c1[2] + c2[2]))
 
+# ---- State signalling ----
+
+# Kept for tools and older helpers that still look at the file
+STATE_FILE = ".led_state"
+# Shared-memory copy of the state, readable without a syscall
+STATE_SHM = os.getenv("LED_STATE_SHM", "/dev/shm/mizuna-led-state")
+
+def write_state(state):
+    with open(STATE_FILE, "w") as f:
+        f.write(state)
+
+def read_state():
+    try:
+        with open(STATE_FILE, "r") as f:
+            return f.read().strip()
+    except Exception:
+        return None
+
+
+class StateSignal:
+    """
+    The LED state that animations check on every frame.
+
+    The state lives in a 64-byte mmap'd file on tmpfs: a sequence number
+    followed by the state name. Each frame reads the sequence number from
+    mapped memory and decodes the name only after it changes, so frames
+    make no syscalls and nothing touches the SD card. The sequence is odd
+    while a write is in progress, which lets readers skip a torn name and
+    pick up the change on the next frame. Several helper processes can
+    share the map, so a stray one-shot helper still stops when the daemon
+    moves on.
+
+    Within a process, set() also wakes an animation sleeping between
+    frames, so the change shows up without waiting out the frame. Without
+    /dev/shm the per-frame check reads .led_state as before.
+    """
+
+    _SEQ = struct.Struct("<IB")     # sequence number, name length
+    SIZE = 64
+
+    def __init__(self, path: str = STATE_SHM):
+        self.path = path
+        self._map = None
+        self._failed = False
+        self._seq = None
+        self._value = None
+        self._cond = threading.Condition()
+
+    def _mapped(self):
+        if self._map is None and not self._failed:
+            try:
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+                try:
+                    if os.fstat(fd).st_size < self.SIZE:
+                        os.ftruncate(fd, self.SIZE)
+                    self._map = mmap.mmap(fd, self.SIZE)
+                finally:
+                    os.close(fd)
+            except OSError as e:
+                print(f"LED state shm unavailable ({e}), using {STATE_FILE}")
+                self._failed = True
+        return self._map
+
+    def get(self) -> Optional[str]:
+        mm = self._mapped()
+        if mm is None:
+            return read_state()
+        seq, n = self._SEQ.unpack_from(mm, 0)
+        if seq != self._seq and not seq & 1:
+            name = mm[self._SEQ.size:self._SEQ.size + n].decode("utf-8", "replace")
+            # Sequence unchanged, so the name was not rewritten mid-read
+            if self._SEQ.unpack_from(mm, 0)[0] == seq:
+                self._seq, self._value = seq, name
+        return self._value
+
+    def set(self, state: str):
+        data = state.encode()[:self.SIZE - self._SEQ.size]
+        mm = self._mapped()
+        with self._cond:
+            if mm is not None:
+                seq = self._SEQ.unpack_from(mm, 0)[0] & ~1
+                self._SEQ.pack_into(mm, 0, (seq + 1) & 0xFFFFFFFF, len(data))
+                mm[self._SEQ.size:self._SEQ.size + len(data)] = data
+                self._SEQ.pack_into(mm, 0, (seq + 2) & 0xFFFFFFFF, len(data))
+            self._value = state
+            self._cond.notify_all()
+        write_state(state)
+
+    def sleep(self, seconds: float, state_name: Optional[str] = None):
+        """Sleep between frames; returns early when this process changes the state."""
+        if state_name is None:
+            time.sleep(seconds)
+            return
+        with self._cond:
+            self._cond.wait_for(lambda: self._value not in (None, state_name), seconds)
+
+
+led_state = StateSignal()
+
+# ---- Frame scheduling ----
+
+class FrameScheduler:
+    """
+    Fixed-timestep clock shared by every animation.
+
+    frames() yields the step to draw next. Frame k of a pass is due at
+    start + k * wait, so render time and late wakeups never add up to
+    drift. A frame that would start more than one period late is dropped
+    instead, and the step count jumps ahead to keep the animation's speed.
+
+    Once a second the scheduler checks the last window. Under pressure it
+    sheds load one level at a time:
+        1  every other step (half the frame rate, same animation speed)
+        2  half rate and no sparkle overlay (detail is False; MatrixFall keeps its trails)
+    Pressure means rendering took over `busy_share` of the wall time, or
+    over `late_share` of frames woke late or were dropped (camera encoding
+    or TTS competing for the core, say). After `calm_windows` quiet windows
+    it steps back up one level.
+    """
+
+    MAX_LEVEL = 2
+
+    def __init__(self, shed: bool = True, window: float = 1.0, busy_share: float = 0.5,
+                 late_share: float = 0.2, calm_windows: int = 5):
+        self.shed = shed
+        self.window = window
+        self.busy_share = busy_share
+        self.late_share = late_share
+        self.calm_windows = calm_windows
+        self.level = 0
+        self.frames_drawn = 0
+        self.steps = 0                      # animation steps covered, drawn or skipped
+        self.dropped = 0
+        self.sheds = 0
+        self.fps = None
+        self.target_fps = None
+        self.render_ms = LatencyStats()     # drawing plus show(), per frame
+        self.late_ms = LatencyStats()       # wakeup past the frame's due time
+        self._calm = 0
+        self._window_start = None
+        self._window_frames = 0
+        self._window_late = 0
+        self._window_busy = 0.0
+        self._last_frame = 0.0
+
+    @property
+    def detail(self) -> bool:
+        return self.level < 2
+
+    def frames(self, steps: int, wait: float, state_name=None):
+        start = time.monotonic()
+        if start - self._last_frame > self.window:
+            # Idle since the last animation: begin a fresh window
+            self._window_start = start
+            self._window_frames = self._window_late = 0
+            self._window_busy = 0.0
+        self.target_fps = 1.0 / wait if wait > 0 else None
+        step = 0
+        while step < steps:
+            if state_name and led_state.get() != state_name:
+                return
+            t0 = time.monotonic()
+            yield step
+            now = time.monotonic()
+            self.render_ms.record((now - t0) * 1000)
+            self.frames_drawn += 1
+            self._last_frame = now
+            self._window_frames += 1
+            self._window_busy += now - t0
+
+            stride = 2 if self.level >= 1 else 1
+            due = start + (step + stride) * wait
+            if wait > 0 and now > due + wait:
+                skipped = int((now - due) / wait)
+                stride += skipped
+                due += skipped * wait
+                self.dropped += skipped
+                self._window_late += skipped
+            step += stride
+            self.steps += stride
+            led_state.sleep(max(0.0, due - now), state_name)
+            late = time.monotonic() - due
+            if wait > 0 and step < steps:
+                self.late_ms.record(max(0.0, late) * 1000)
+                if late > wait * 0.5:
+                    self._window_late += 1
+            self._end_window()
+
+    def _end_window(self):
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        if elapsed < self.window:
+            return
+        self.fps = round(self._window_frames / elapsed, 1)
+        pressured = (self._window_busy / elapsed > self.busy_share or
+                     self._window_late > self.late_share * max(1, self._window_frames))
+        if self.shed:
+            if pressured and self.level < self.MAX_LEVEL:
+                self.level += 1
+                self.sheds += 1
+                self._calm = 0
+                print(f"LED frames under load, shedding to level {self.level}")
+            elif not pressured and self.level > 0:
+                self._calm += 1
+                if self._calm >= self.calm_windows:
+                    self.level -= 1
+                    self._calm = 0
+            else:
+                self._calm = 0
+        self._window_start = now
+        self._window_frames = self._window_late = 0
+        self._window_busy = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "fps": self.fps,
+            "target_fps": round(self.target_fps, 1) if self.target_fps else None,
+            "level": self.level,
+            "frames": self.frames_drawn,
+            "steps": self.steps,
+            "dropped": self.dropped,
+            "sheds": self.sheds,
+            "render_ms": self.render_ms.summary(),
+            "late_ms": self.late_ms.summary(),
+        }
+
+
+# LED_SHED=0 keeps full rate and detail however busy the CPU is
+clock = FrameScheduler(shed=os.getenv("LED_SHED", "1") != "0")
+
 # ---- Animations ----
 
+def vectorized() -> bool:
+    return USE_NUMPY and led_render.np is not None
+
+def play(renderer, wait, steps, state_name=None):
+    """Vectorized path: one led_render frame per step, copied into the strip's byte buffer."""
+    if USE_TABLES:
+        renderer.compile(steps)
+    for step in clock.frames(steps, wait, state_name):
+        led_render.write_frame(pixels, renderer.frame(step, detail=clock.detail))
+        pixels.show()
+
 # Listening: enhanced aurora with multi-color waves and denser sparkles
 def blue_dot(wait=0.018, steps=96, state_name=None):
-    for j in range(steps):
-        if state_name and read_state() != state_name:
-            return
+    if vectorized():
+        return play(led_render.BlueDot(LED_COUNT), wait, steps, state_name)
+    for j in clock.frames(steps, wait, state_name):
         t = j * 0.06
         for i in range(LED_COUNT):
             # Multi-hue cool range with layered waves
@@ -81,22 +421,21 @@ def blue_dot(wait=0.018, steps=96, state_name=None):
             pixels[i] = gamma(col)
 
         # Denser sparkles with varied colors
-        for _ in range(max(2, LED_COUNT // 15)):
-            idx = random.randint(0, LED_COUNT - 1)
-            sparkle_hue = (0.55 + 0.20 * random.random()) % 1.0
-            tw = hsv_to_rgb(sparkle_hue, 0.20, 1.0)
-            pixels[idx] = add(pixels[idx], gamma(fade(tw, 0.30 + random.random() * 0.40)))
+        if clock.detail:
+            for _ in range(max(2, LED_COUNT // 15)):
+                idx = random.randint(0, LED_COUNT - 1)
+                sparkle_hue = (0.55 + 0.20 * random.random()) % 1.0
+                tw = hsv_to_rgb(sparkle_hue, 0.20, 1.0)
+                pixels[idx] = add(pixels[idx], gamma(fade(tw, 0.30 + random.random() * 0.40)))
 
         pixels.show()
-        time.sleep(wait)
 
 # Wake detected: vibrant warm vortex with expanding rings and confetti
 def chase(color1=None, color2=(0,0,0), wait=0.020, steps=72, state_name=None):
+    if vectorized():
+        return play(led_render.Chase(LED_COUNT), wait, steps, state_name)
     tail = max(12, LED_COUNT // 3)
-    for c in range(steps):
-        if state_name and read_state() != state_name:
-            return
-
+    for c in clock.frames(steps, wait, state_name):
         # Warm base with hue shifts
         phi = c * 0.30
         for i in range(LED_COUNT):
@@ -115,20 +454,20 @@ def chase(color1=None, color2=(0,0,0), wait=0.020, steps=72, state_name=None):
             pixels[pos] = add(pixels[pos], gamma(col))
 
         # More confetti with varied hues
-        for _ in range(max(3, LED_COUNT // 6)):
-            idx = random.randint(0, LED_COUNT - 1)
-            sparkle_h = 0.05 + 0.15 * random.random()
-            sparkle = hsv_to_rgb(sparkle_h, 0.5 + 0.5 * random.random(), 0.8 + 0.2 * random.random())
-            pixels[idx] = add(pixels[idx], gamma(sparkle))
+        if clock.detail:
+            for _ in range(max(3, LED_COUNT // 6)):
+                idx = random.randint(0, LED_COUNT - 1)
+                sparkle_h = 0.05 + 0.15 * random.random()
+                sparkle = hsv_to_rgb(sparkle_h, 0.5 + 0.5 * random.random(), 0.8 + 0.2 * random.random())
+                pixels[idx] = add(pixels[idx], gamma(sparkle))
 
         pixels.show()
-        time.sleep(wait)
 
 # Conversation: lush multi-green waves with floating highlights and twinkles
 def green_pulse(wait=0.014, steps=96, state_name=None):
-    for step in range(steps):
-        if state_name and read_state() != state_name:
-            return
+    if vectorized():
+        return play(led_render.GreenPulse(LED_COUNT), wait, steps, state_name)
+    for step in clock.frames(steps, wait, state_name):
         off = step * 0.12
         for i in range(LED_COUNT):
             hue = (0.32 + 0.12 * math.sin(i * 0.07 + off) + 0.06 * math.sin(i * 0.16 - off * 0.8) + 0.03 * math.sin(i * 0.25 + off * 0.6)) % 1.0
@@ -147,16 +486,18 @@ def green_pulse(wait=0.014, steps=96, state_name=None):
                 pixels[i] = add(pixels[i], gamma(col))
 
         # More twinkles
-        for _ in range(max(2, LED_COUNT // 12)):
-            idx = random.randint(0, LED_COUNT - 1)
-            tw = hsv_to_rgb(0.20, 0.20, 1.0)
-            pixels[idx] = add(pixels[idx], gamma(fade(tw, 0.30 + random.random() * 0.30)))
+        if clock.detail:
+            for _ in range(max(2, LED_COUNT // 12)):
+                idx = random.randint(0, LED_COUNT - 1)
+                tw = hsv_to_rgb(0.20, 0.20, 1.0)
+                pixels[idx] = add(pixels[idx], gamma(fade(tw, 0.30 + random.random() * 0.30)))
 
         pixels.show()
-        time.sleep(wait)
 
 # Speaking: dynamic magenta nebula with cascading sparks
 def magenta_sparkle(wait=0.018, steps=96, state_name=None):
+    if vectorized():
+        return play(led_render.MagentaSparkle(LED_COUNT), wait, steps, state_name)
     palette = [
         (255, 0, 255), (230, 0, 255), (200, 0, 255),
         (255, 40, 200), (255, 80, 230), (190, 20, 210),
@@ -165,47 +506,44 @@ def magenta_sparkle(wait=0.018, steps=96, state_name=None):
     buf = [0.0] * LED_COUNT
     colors = [random.choice(palette) for _ in range(LED_COUNT)]
 
-    for t in range(steps):
-        if state_name and read_state() != state_name:
-            return
-
+    for t in clock.frames(steps, wait, state_name):
         for i in range(LED_COUNT):
             hue = (0.83 + 0.06 * math.sin(i * 0.10 + t * 0.14) + 0.03 * math.sin(i * 0.18 - t * 0.25)) % 1.0
             v = 0.25 + 0.30 * (0.5 * (1 + math.sin(i * 0.18 + t * 0.28))) + 0.20 * (0.5 * (1 + math.sin(i * 0.12 - t * 0.22)))
             s = 0.75 + 0.20 * (0.5 * (1 + math.sin(i * 0.15 + t * 0.18)))
             pixels[i] = gamma(hsv_to_rgb(hue, s, v))
 
-        for i in range(LED_COUNT):
-            buf[i] *= 0.85
-
-        sparks = max(2, LED_COUNT // 6)
-        for _ in range(sparks):
-            i = random.randint(0, LED_COUNT - 1)
-            buf[i] = min(1.0, buf[i] + 0.8 + random.random() * 0.4)
-            colors[i] = random.choice(palette)
-
-        blurred = [0.0] * LED_COUNT
-        for i in range(LED_COUNT):
-            blurred[i] = (
-                0.50 * buf[i] +
-                0.25 * buf[(i - 1) % LED_COUNT] +
-                0.25 * buf[(i + 1) % LED_COUNT]
-            )
-
-        for i in range(LED_COUNT):
-            spark = fade(colors[i], min(1.0, blurred[i]))
-            pixels[i] = add(pixels[i], gamma(spark))
+        # Sparks are detail; skipped while shedding load
+        if clock.detail:
+            for i in range(LED_COUNT):
+                buf[i] *= 0.85
+
+            sparks = max(2, LED_COUNT // 6)
+            for _ in range(sparks):
+                i = random.randint(0, LED_COUNT - 1)
+                buf[i] = min(1.0, buf[i] + 0.8 + random.random() * 0.4)
+                colors[i] = random.choice(palette)
+
+            blurred = [0.0] * LED_COUNT
+            for i in range(LED_COUNT):
+                blurred[i] = (
+                    0.50 * buf[i] +
+                    0.25 * buf[(i - 1) % LED_COUNT] +
+                    0.25 * buf[(i + 1) % LED_COUNT]
+                )
+
+            for i in range(LED_COUNT):
+                spark = fade(colors[i], min(1.0, blurred[i]))
+                pixels[i] = add(pixels[i], gamma(spark))
 
         pixels.show()
-        time.sleep(wait)
 
 # Thinking: full rainbow cascade with comets and glitter
 def yellow_comet(wait=0.012, steps=120, state_name=None):
+    if vectorized():
+        return play(led_render.YellowComet(LED_COUNT), wait, steps, state_name)
     tail = max(15, LED_COUNT // 3)
-    for c in range(steps):
-        if state_name and read_state() != state_name:
-            return
-
+    for c in clock.frames(steps, wait, state_name):
         base_shift = (c * 5) % 256
         for i in range(LED_COUNT):
             col = wheel((base_shift + i * 4) % 256)
@@ -223,21 +561,21 @@ def yellow_comet(wait=0.012, steps=120, state_name=None):
             pixels[pos1] = add(pixels[pos1], gamma(fade(col1, 0.5 + 0.9 * f)))
             pixels[pos2] = add(pixels[pos2], gamma(fade(col2, 0.5 + 0.9 * f)))
 
-        for _ in range(max(3, LED_COUNT // 8)):
-            idx = random.randint(0, LED_COUNT - 1)
-            glitter = (240, 240, 240)
-            pixels[idx] = add(pixels[idx], gamma(fade(glitter, 0.40 + random.random() * 0.40)))
+        if clock.detail:
+            for _ in range(max(3, LED_COUNT // 8)):
+                idx = random.randint(0, LED_COUNT - 1)
+                glitter = (240, 240, 240)
+                pixels[idx] = add(pixels[idx], gamma(fade(glitter, 0.40 + random.random() * 0.40)))
 
         pixels.show()
-        time.sleep(wait)
 
 # Matrix-style: falling green characters simulation with trails
 def matrix_fall(wait=0.015, steps=100, state_name=None):
+    if vectorized():
+        return play(led_render.MatrixFall(LED_COUNT), wait, steps, state_name)
     trails = [0] * LED_COUNT
     speeds = [random.uniform(0.5, 2.0) for _ in range(LED_COUNT)]
-    for step in range(steps):
-        if state_name and read_state() != state_name:
-            return
+    for step in clock.frames(steps, wait, state_name):
         for i in range(LED_COUNT):
             trails[i] *= 0.92  # Decay
             if random.random() < 0.05:  # Chance to start new trail
@@ -250,22 +588,26 @@ def matrix_fall(wait=0.015, steps=100, state_name=None):
             else:
                 pixels[i] = (0, 0, 0)
         pixels.show()
-        time.sleep(wait)
 
-def write_state(state):
-    with open(".led_state", "w") as f:
-        f.write(state)
+ANIMATED_STATES = ('listening', 'wake_detected', 'conversation', 'speaking', 'thinking')
 
-def read_state():
-    try:
-        with open(".led_state", "r") as f:
-            return f.read().strip()
-    except Exception:
-        return None
+def precompile():
+    """Load or build the frame tables of every state's animation, so no switch waits on one."""
+    if not (USE_TABLES and vectorized()):
+        return
+    for fn, cls in ((blue_dot, led_render.BlueDot), (chase, led_render.Chase),
+                    (green_pulse, led_render.GreenPulse), (magenta_sparkle, led_render.MagentaSparkle),
+                    (yellow_comet, led_render.YellowComet)):
+        steps = inspect.signature(fn).parameters["steps"].default
+        led_render.frame_table(cls, LED_COUNT, steps)
 
 def set_led_state(state):
     print(f"LED State: {state}")
-    write_state(state)
+    led_state.set(state)
+    animate(state)
+
+def animate(state):
+    """One pass of the state's animation; returns early once led_state changes."""
     if state == 'listening':
         blue_dot(state_name=state)
     elif state == 'wake_detected':
@@ -280,25 +622,239 @@ def set_led_state(state):
         pixels.fill(COLORS['off'])
         pixels.show()
 
-def led_pulse(color, duration=1.0, steps=20):
+def led_pulse(color, duration=1.0, steps=20, state_name=None):
     r, g, b = color
-    for i in range(steps):
+    for i in clock.frames(steps, duration / steps, state_name):
         # Smooth triangle wave brightness
         phase = (i / steps) * 2 * math.pi
         brightness = 0.15 + 0.85 * (0.5 * (1 - math.cos(phase)))
         pulse_color = (int(r * brightness), int(g * brightness), int(b * brightness))
         pixels.fill(gamma(pulse_color))
         pixels.show()
-        time.sleep(duration / steps)
+
+# ---- Daemon ----
+
+class LedDaemon:
+    """
+    Long-running owner of the strip, so a state change costs a socket write
+    instead of sudo, an interpreter, the board/neopixel imports and a new
+    NeoPixel object, and no two processes ever drive the strip at once.
+
+    Commands are text lines on a Unix socket, each answered with one line:
+        set <state>                      -> ok
+        pulse <r> <g> <b> [seconds]      -> ok
+        ping                             -> ok
+        stats                            -> JSON
+    The current state's animation repeats until the next command. Changes
+    go through led_state, which wakes the running animation straight away
+    and stops any one-shot helper still running from before.
+    """
+
+    def __init__(self, path: str = SOCKET_PATH):
+        self.path = path
+        self.state = 'off'
+        self.pulse = None
+        self.commands = 0
+        self.switches = 0
+        self.switch_ms = LatencyStats()     # command received -> new animation started
+        self._changed_at = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._server = None
+
+    def handle(self, line: str) -> str:
+        parts = line.split()
+        if not parts:
+            return "err empty command"
+        self.commands += 1
+        cmd = parts[0]
+        try:
+            if cmd == "set" and len(parts) == 2:
+                self.set_state(parts[1])
+                return "ok"
+            if cmd == "pulse" and len(parts) in (4, 5):
+                color = tuple(int(v) for v in parts[1:4])
+                self.start_pulse(color, float(parts[4]) if len(parts) == 5 else 1.0)
+                return "ok"
+        except ValueError as e:
+            return f"err {e}"
+        if cmd == "ping":
+            return "ok"
+        if cmd == "stats":
+            return json.dumps(self.stats())
+        return "err unknown command"
+
+    def set_state(self, state: str):
+        with self._lock:
+            self.state = state
+            self.pulse = None
+            self._changed_at = time.monotonic()
+            led_state.set(state)
+        self._wake.set()
+
+    def start_pulse(self, color, duration: float):
+        with self._lock:
+            self.pulse = (color, duration)
+            self._changed_at = time.monotonic()
+            # Interrupts the running animation; the state resumes afterwards
+            led_state.set("pulse")
+        self._wake.set()
+
+    def run(self):
+        """Render loop; runs on the calling thread until the process is stopped."""
+        open_strip()
+        while True:
+            self._wake.clear()
+            with self._lock:
+                pulse, self.pulse = self.pulse, None
+                state = self.state
+                changed_at, self._changed_at = self._changed_at, None
+            if changed_at is not None:
+                self.switches += 1
+                self.switch_ms.record((time.monotonic() - changed_at) * 1000)
+            if pulse:
+                led_pulse(pulse[0], pulse[1], state_name="pulse")
+                with self._lock:
+                    if self.pulse is None and led_state.get() == "pulse":
+                        led_state.set(self.state)
+                continue
+            animate(state)
+            with self._lock:
+                if self._changed_at is None and led_state.get() != self.state:
+                    # Another helper wrote the state; the daemon owns the strip
+                    led_state.set(self.state)
+            if state not in ANIMATED_STATES:
+                # Blank strip: nothing to draw until the next command
+                self._wake.wait()
+
+    def serve(self):
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for raw in self.rfile:
+                    reply = daemon.handle(raw.decode("utf-8", "replace"))
+                    self.wfile.write((reply + "\n").encode())
+
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self._server = socketserver.ThreadingUnixStreamServer(self.path, Handler)
+        self._server.daemon_threads = True
+        # The daemon runs as root; the voice loop connecting to it does not
+        os.chmod(self.path, 0o666)
+        threading.Thread(target=self._server.serve_forever, name="led-socket", daemon=True).start()
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+        if pixels is not None:
+            pixels.fill(COLORS['off'])
+            pixels.show()
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "commands": self.commands,
+            "switches": self.switches,
+            "switch_ms": self.switch_ms.summary(),
+            "frame_tables": led_render.table_stats() if vectorized() else None,
+            "frames": clock.stats(),
+        }
+
+
+def run_daemon(path: str = SOCKET_PATH):
+    daemon = LedDaemon(path)
+    # SIGTERM (e.g. from systemd) should blank the strip like Ctrl-C does
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    # Before serving, so the first state change never waits on a table build
+    precompile()
+    daemon.serve()
+    print(f"LED daemon listening on {path}")
+    try:
+        daemon.run()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        daemon.close()
+
+
+class LedClient:
+    """
+    Connection to a running LED daemon. request() returns the reply line,
+    or None when no daemon is reachable so callers can fall back.
+    """
+
+    def __init__(self, path: str = SOCKET_PATH, timeout: float = 0.5):
+        self.path = path
+        self.timeout = timeout
+        self._sock = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.path)
+        self._sock = sock
+        self._reader = sock.makefile("rb")
+
+    def request(self, line: str) -> Optional[str]:
+        with self._lock:
+            # Second attempt covers a daemon restart behind a stale connection
+            for _ in range(2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    self._sock.sendall((line + "\n").encode())
+                    reply = self._reader.readline()
+                    if reply:
+                        return reply.decode().strip()
+                except OSError:
+                    pass
+                self._close_locked()
+            return None
+
+    def send(self, line: str) -> bool:
+        return self.request(line) == "ok"
+
+    def _close_locked(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._reader = None
+
+    def close(self):
+        with self._lock:
+            self._close_locked()
+
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: sudo python led_helper.py <set|pulse> ...")
+        print("Usage: sudo python led_helper.py <set|pulse|daemon|stats> ...")
         sys.exit(1)
     cmd = sys.argv[1]
-    if cmd == "set" and len(sys.argv) == 3:
+    if cmd == "daemon" and len(sys.argv) in (2, 3):
+        run_daemon(sys.argv[2] if len(sys.argv) == 3 else SOCKET_PATH)
+    elif cmd == "stats" and len(sys.argv) in (2, 3):
+        # Frame rate, drops, render time and switch latency of the running daemon
+        reply = LedClient(sys.argv[2] if len(sys.argv) == 3 else SOCKET_PATH).request("stats")
+        if reply is None:
+            print("LED daemon not reachable")
+            sys.exit(1)
+        print(json.dumps(json.loads(reply), indent=2))
+    elif cmd == "set" and len(sys.argv) == 3:
+        open_strip()
         set_led_state(sys.argv[2])
     elif cmd == "pulse" and len(sys.argv) == 5:
+        open_strip()
         color = (int(sys.argv[2]), int(sys.argv[3]), int(sys.argv[4]))
         led_pulse(color)
     else:
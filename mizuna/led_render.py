@@ -0,0 +1,401 @@
+"""
+Whole-strip frame rendering for the led_helper animations.
+
+Each renderer computes one frame as an (n, 3) integer array: hue,
+saturation and value fields for every pixel at once, HSV to RGB, the gamma
+table lookup and saturating adds, all as NumPy operations. The deterministic
+layers (base waves, arcs, bands) come from base(step) and the random ones
+(sparkles, confetti) are added by overlay(), so the two can be cached or
+timed separately. The formulas match the per-pixel code in led_helper, and
+the strip length is just the array length.
+
+Because base(step) is deterministic, compile() swaps it for a frame table:
+every base frame of a pass pre-rendered into one (steps, n, 3) uint8
+array, built on first use and cached on disk, so playback is a table row
+plus the random overlay.
+
+led_helper falls back to its per-pixel loops when NumPy is not installed.
+"""
+import os, time, logging, threading
+from typing import List, NamedTuple, Tuple
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+
+def _wheel(pos):
+    pos = pos % 256
+    if pos < 85:
+        return (int(pos * 3), int(255 - pos * 3), 0)
+    elif pos < 170:
+        pos -= 85
+        return (int(255 - pos * 3), 0, int(pos * 3))
+    pos -= 170
+    return (0, int(pos * 3), int(255 - pos * 3))
+
+
+if np is not None:
+    GAMMA = np.array([int(((i / 255.0) ** 2.2) * 255 + 0.5) for i in range(256)], dtype=np.int64)
+    WHEEL = np.array([_wheel(i) for i in range(256)], dtype=np.int64)
+    # Which of (v, t, p, q) feeds R, G and B in each of the six hue sectors
+    _SECTORS = np.array([[0, 1, 2], [3, 0, 2], [2, 0, 1], [2, 3, 0], [1, 2, 0], [0, 2, 3]])
+
+
+# ---- Vector color helpers ----
+
+def hsv_to_rgb(h, s, v):
+    """HSV arrays (or scalars) in [0, 1] -> (n, 3) int array, same rounding as led_helper.hsv_to_rgb."""
+    h, s, v = np.broadcast_arrays(*(np.atleast_1d(np.asarray(x, dtype=np.float64)) for x in (h, s, v)))
+    h6 = h * 6.0
+    i = h6.astype(np.int64)
+    f = h6 - i
+    p = (255 * v * (1.0 - s)).astype(np.int64)
+    q = (255 * v * (1.0 - f * s)).astype(np.int64)
+    t = (255 * v * (1.0 - (1.0 - f) * s)).astype(np.int64)
+    comps = np.stack(((255 * v).astype(np.int64), t, p, q))
+    return comps[_SECTORS[i % 6], np.arange(h.size)[:, None]]
+
+
+def gamma(rgb):
+    return GAMMA[np.clip(rgb, 0, 255)]
+
+
+def fade(rgb, f):
+    return (rgb * np.asarray(f, dtype=np.float64)[..., None]).astype(np.int64)
+
+
+def add_at(frame, idx, rgb):
+    """Saturating add of rgb rows at idx; repeated indices add up like sequential add() calls."""
+    np.add.at(frame, idx, rgb)
+    np.minimum(frame, 255, out=frame)
+
+
+def _wave(x, scale=1.0):
+    # scale * 0.5 * (1 + sin(x)), the brightness term every animation uses
+    return scale * (0.5 * (1 + np.sin(x)))
+
+
+# ---- Renderers ----
+
+class Renderer:
+    """One animation for an n-pixel strip; frame(step) is base(step) plus overlay()."""
+
+    # False when base() is not worth a table (MatrixFall's is all black)
+    tabulate = True
+    # False when the overlay is the animation itself, so shedding must not drop it
+    overlay_is_detail = True
+
+    def __init__(self, n: int, rng=None):
+        self.n = n
+        self.i = np.arange(n, dtype=np.float64)
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.table = None
+
+    def compile(self, steps: int, directory: str = None):
+        """Take base frames 0..steps-1 from a frame table instead of computing them."""
+        if self.tabulate:
+            self.table = frame_table(type(self), self.n, steps, directory).frames
+        return self
+
+    def base(self, step: int):
+        raise NotImplementedError
+
+    def overlay(self, frame, step: int):
+        return frame
+
+    def frame(self, step: int, detail: bool = True):
+        """Frame for `step`; without detail the random overlay is left out to save CPU."""
+        detail = detail or not self.overlay_is_detail
+        if self.table is not None and step < len(self.table):
+            base = self.table[step]
+            return self.overlay(base.astype(np.int64), step) if detail else base
+        base = self.base(step)
+        return self.overlay(base.copy(), step) if detail else base
+
+
+class BlueDot(Renderer):
+    """Listening: aurora waves with cool sparkles."""
+
+    def base(self, step):
+        i, t = self.i, step * 0.06
+        hue = (0.52 + 0.12 * np.sin(i * 0.08 - t) + 0.06 * np.sin(i * 0.20 + t * 0.8) + 0.03 * np.sin(i * 0.30 - t * 0.5)) % 1.0
+        v = 0.30 + _wave(i * 0.25 + t, 0.40) + _wave(i * 0.12 - t * 0.7, 0.20) + _wave(i * 0.18 + t * 0.4, 0.10)
+        s = 0.70 + _wave(i * 0.15 - t * 0.9, 0.25)
+        return gamma(hsv_to_rgb(hue, np.minimum(1.0, s), np.minimum(1.0, v)))
+
+    def overlay(self, frame, step):
+        k = max(2, self.n // 15)
+        idx = self.rng.integers(0, self.n, k)
+        tw = hsv_to_rgb((0.55 + 0.20 * self.rng.random(k)) % 1.0, 0.20, 1.0)
+        add_at(frame, idx, gamma(fade(tw, 0.30 + self.rng.random(k) * 0.40)))
+        return frame
+
+
+class Chase(Renderer):
+    """Wake detected: warm vortex with a bright arc and confetti."""
+
+    def __init__(self, n, rng=None):
+        super().__init__(n, rng)
+        self.tail = max(12, n // 3)
+        k = np.arange(self.tail, dtype=np.float64)
+        f = np.exp(-(k * k) / (2.0 * (self.tail * 0.35) ** 2))
+        self.k = k.astype(np.int64)
+        self.arc = gamma(hsv_to_rgb((0.10 - 0.03 * (k / self.tail)) % 1.0, 1.0, np.minimum(1.0, 0.5 + 0.9 * f)))
+
+    def base(self, step):
+        i, phi = self.i, step * 0.30
+        hue = (0.08 + 0.08 * np.sin(i * 0.08 + phi) + 0.04 * np.sin(i * 0.15 - phi * 0.6)) % 1.0
+        v = 0.20 + _wave(i * 0.20 - phi * 1.5, 0.30) + _wave(i * 0.10 + phi * 0.8, 0.15)
+        s = 0.80 + _wave(i * 0.12 + phi * 0.5, 0.15)
+        frame = gamma(hsv_to_rgb(hue, s, v))
+        add_at(frame, (step * 4 - self.k) % self.n, self.arc)
+        return frame
+
+    def overlay(self, frame, step):
+        k = max(3, self.n // 6)
+        idx = self.rng.integers(0, self.n, k)
+        sparkle = hsv_to_rgb(0.05 + 0.15 * self.rng.random(k), 0.5 + 0.5 * self.rng.random(k),
+                             0.8 + 0.2 * self.rng.random(k))
+        add_at(frame, idx, gamma(sparkle))
+        return frame
+
+
+class GreenPulse(Renderer):
+    """Conversation: green waves, a moving highlight band and twinkles."""
+
+    def __init__(self, n, rng=None):
+        super().__init__(n, rng)
+        self.sigma = max(4.0, n * 0.10)
+        self.twinkle = hsv_to_rgb(0.20, 0.20, 1.0)[0]
+
+    def base(self, step):
+        i, off = self.i, step * 0.12
+        hue = (0.32 + 0.12 * np.sin(i * 0.07 + off) + 0.06 * np.sin(i * 0.16 - off * 0.8) + 0.03 * np.sin(i * 0.25 + off * 0.6)) % 1.0
+        v = 0.25 + _wave(i * 0.23 + off, 0.40) + _wave(i * 0.09 - off * 1.3, 0.25) + _wave(i * 0.14 + off * 0.5, 0.10)
+        s = 0.60 + _wave(i * 0.12 - off * 1.0, 0.35)
+        frame = gamma(hsv_to_rgb(hue, np.minimum(1.0, s), np.minimum(1.0, v)))
+
+        center = (step * 3) % self.n
+        pos = np.arange(self.n)
+        dx = np.minimum((pos - center) % self.n, (center - pos) % self.n)
+        f = np.exp(-(dx * dx) / (2.0 * self.sigma * self.sigma)) * 0.7
+        band = np.nonzero(f > 0.02)[0]
+        add_at(frame, band, gamma(hsv_to_rgb(0.45, 0.30, np.minimum(1.0, 0.6 + f[band]))))
+        return frame
+
+    def overlay(self, frame, step):
+        k = max(2, self.n // 12)
+        idx = self.rng.integers(0, self.n, k)
+        add_at(frame, idx, gamma(fade(np.broadcast_to(self.twinkle, (k, 3)), 0.30 + self.rng.random(k) * 0.30)))
+        return frame
+
+
+class MagentaSparkle(Renderer):
+    """Speaking: magenta nebula with blurred, decaying sparks."""
+
+    PALETTE = [
+        (255, 0, 255), (230, 0, 255), (200, 0, 255),
+        (255, 40, 200), (255, 80, 230), (190, 20, 210),
+        (255, 100, 255), (220, 50, 255)
+    ]
+
+    def __init__(self, n, rng=None):
+        super().__init__(n, rng)
+        self.palette = np.array(self.PALETTE, dtype=np.int64)
+        self.buf = np.zeros(n)
+        self.colors = self.palette[self.rng.integers(0, len(self.palette), n)]
+
+    def base(self, step):
+        i, t = self.i, step
+        hue = (0.83 + 0.06 * np.sin(i * 0.10 + t * 0.14) + 0.03 * np.sin(i * 0.18 - t * 0.25)) % 1.0
+        v = 0.25 + _wave(i * 0.18 + t * 0.28, 0.30) + _wave(i * 0.12 - t * 0.22, 0.20)
+        s = 0.75 + _wave(i * 0.15 + t * 0.18, 0.20)
+        return gamma(hsv_to_rgb(hue, s, v))
+
+    def overlay(self, frame, step):
+        buf = self.buf
+        buf *= 0.85
+        k = max(2, self.n // 6)
+        idx = self.rng.integers(0, self.n, k)
+        np.add.at(buf, idx, 0.8 + self.rng.random(k) * 0.4)
+        np.minimum(buf, 1.0, out=buf)
+        self.colors[idx] = self.palette[self.rng.integers(0, len(self.palette), k)]
+
+        blurred = 0.50 * buf + 0.25 * np.roll(buf, 1) + 0.25 * np.roll(buf, -1)
+        frame += gamma(fade(self.colors, np.minimum(1.0, blurred)))
+        np.minimum(frame, 255, out=frame)
+        return frame
+
+
+class YellowComet(Renderer):
+    """Thinking: rainbow cascade, two counter-rotating comets and glitter."""
+
+    def __init__(self, n, rng=None):
+        super().__init__(n, rng)
+        self.tail = max(15, n // 3)
+        k = np.arange(self.tail, dtype=np.float64)
+        self.k = k.astype(np.int64)
+        self.hue_k = k * 256 / self.tail
+        self.tail_v = 0.5 + 0.9 * np.exp(-(k * k) / (2.0 * (self.tail * 0.35) ** 2))
+        self.pos = np.arange(self.n, dtype=np.int64)
+
+    def base(self, step):
+        i, c = self.i, step
+        col = WHEEL[((c * 5) % 256 + self.pos * 4) % 256]
+        v = 0.20 + _wave(i * 0.16 - c * 0.14, 0.25) + _wave(i * 0.08 + c * 0.10, 0.15)
+        frame = gamma(fade(col, v))
+        for head, shift in (((c * 3) % self.n, c * 8), ((-c * 3) % self.n, -c * 8)):
+            col = WHEEL[(self.hue_k + shift).astype(np.int64) % 256]
+            add_at(frame, (head - self.k) % self.n, gamma(fade(col, self.tail_v)))
+        return frame
+
+    def overlay(self, frame, step):
+        k = max(3, self.n // 8)
+        idx = self.rng.integers(0, self.n, k)
+        glitter = np.broadcast_to(np.array([240, 240, 240]), (k, 3))
+        add_at(frame, idx, gamma(fade(glitter, 0.40 + self.rng.random(k) * 0.40)))
+        return frame
+
+
+class MatrixFall(Renderer):
+    """Falling green trails; every layer is random, so base() is black."""
+
+    tabulate = False
+    overlay_is_detail = False
+
+    def __init__(self, n, rng=None):
+        super().__init__(n, rng)
+        self.trails = np.zeros(n)
+        self.black = np.zeros((n, 3), dtype=np.int64)
+
+    def base(self, step):
+        return self.black
+
+    def overlay(self, frame, step):
+        trails = self.trails
+        trails *= 0.92
+        trails[self.rng.random(self.n) < 0.05] = 1.0
+        lit = np.nonzero(trails > 0.01)[0]
+        frame[lit] = gamma(hsv_to_rgb(0.35 + 0.05 * self.rng.random(lit.size), 0.8, trails[lit]))
+        return frame
+
+
+RENDERERS = {
+    'listening': BlueDot,
+    'wake_detected': Chase,
+    'conversation': GreenPulse,
+    'speaking': MagentaSparkle,
+    'thinking': YellowComet,
+    'matrix': MatrixFall,
+}
+
+
+def to_pixels(frame) -> List[Tuple[int, int, int]]:
+    """Frame array -> list of RGB tuples, for one slice assignment to the strip."""
+    return list(map(tuple, frame.tolist()))
+
+
+def write_frame(strip, frame):
+    """
+    Copies a frame straight into a PixelBuf-style strip's byte buffer, in its
+    byte order and with its brightness applied, as the per-pixel setter would.
+    Strips without an RGB byte buffer get the slice assignment. Call show() after.
+    """
+    order = getattr(strip, "byteorder", None)
+    buf = getattr(strip, "_post_brightness_buffer", None)
+    if buf is None:
+        buf = getattr(strip, "buf", None)   # CircuitPython's native pixelbuf
+    if buf is None or not isinstance(order, str) or sorted(order) != ["B", "G", "R"]:
+        strip[:] = to_pixels(frame)
+        return
+    n = len(frame)
+    offset = getattr(strip, "_offset", 0)
+    columns = [order.index(c) for c in "RGB"]
+    rgb = frame.astype(np.uint8, copy=False)
+    pre = getattr(strip, "_pre_brightness_buffer", None)
+    if pre is not None:
+        # Kept in step so reads and later brightness changes see this frame
+        np.frombuffer(pre, np.uint8, 3 * n, offset).reshape(n, 3)[:, columns] = rgb
+    brightness = strip.brightness
+    if brightness < 1.0:
+        rgb = (rgb * brightness).astype(np.uint8)   # truncates like int(r * brightness)
+    np.frombuffer(buf, np.uint8, 3 * n, offset).reshape(n, 3)[:, columns] = rgb
+
+
+# ---- Frame tables ----
+
+# Bump when a base() formula changes so tables cached on disk are rebuilt
+TABLE_VERSION = 1
+TABLE_DIR = os.getenv("LED_TABLE_DIR") or os.path.expanduser("~/.cache/mizuna/led")
+
+
+class FrameTable(NamedTuple):
+    frames: "np.ndarray"    # (steps, n, 3) uint8, read-only
+    source: str             # "built" or "disk"
+    build_ms: float         # time to build or load
+
+
+_tables = {}                # (renderer name, n, steps) -> FrameTable
+_tables_lock = threading.Lock()
+
+
+def _build(cls, n: int, steps: int):
+    renderer = cls(n)
+    frames = np.empty((steps, n, 3), dtype=np.uint8)
+    for step in range(steps):
+        frames[step] = renderer.base(step)
+    frames.flags.writeable = False
+    return frames
+
+
+def _save(path: str, frames):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp, "wb") as f:
+            np.save(f, frames)
+        # Atomic so a helper starting alongside never loads half a table
+        os.replace(tmp, path)
+    except OSError as e:
+        logging.warning(f"LED frame table not cached at {path}: {e}")
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def frame_table(cls, n: int, steps: int, directory: str = None) -> FrameTable:
+    """Base frames of `cls` for one pass of `steps`, from memory, disk or a fresh build."""
+    key = (cls.__name__, n, steps)
+    with _tables_lock:
+        table = _tables.get(key)
+        if table is not None:
+            return table
+        path = os.path.join(directory or TABLE_DIR, f"{cls.__name__.lower()}-v{TABLE_VERSION}-{n}x{steps}.npy")
+        t0 = time.perf_counter()
+        try:
+            # Memory-mapped, so helpers running at the same time share the pages
+            frames = np.load(path, mmap_mode="r")
+            if frames.shape != (steps, n, 3) or frames.dtype != np.uint8:
+                raise ValueError(f"unexpected table shape {frames.shape}")
+            source = "disk"
+        except (OSError, ValueError):
+            frames = _build(cls, n, steps)
+            _save(path, frames)
+            source = "built"
+        table = _tables[key] = FrameTable(frames, source, (time.perf_counter() - t0) * 1000)
+        return table
+
+
+def table_stats() -> dict:
+    with _tables_lock:
+        tables = dict(_tables)
+    return {
+        "tables": len(tables),
+        "bytes": sum(t.frames.nbytes for t in tables.values()),
+        "entries": {f"{name}/{n}x{steps}": {"bytes": t.frames.nbytes, "source": t.source,
+                                            "build_ms": round(t.build_ms, 2)}
+                    for (name, n, steps), t in tables.items()},
+    }
@@ -0,0 +1,379 @@
+import time, random, asyncio, logging, threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import AsyncIterator, Iterator, Optional
+
+from lazy import LazyModule
+from metrics import LatencyStats
+
+groq = LazyModule("groq")
+
+# Histogram bucket upper bounds in ms; the last bucket is open-ended
+BUCKETS_MS = (100, 200, 350, 500, 750, 1000, 1500, 2000, 3000, 5000, 8000, 12000, 20000)
+
+
+class GatewayBusy(RuntimeError):
+    """Raised when no completion slot frees up within the acquire timeout."""
+
+
+def _retryable(exc: Exception) -> bool:
+    status = getattr(exc, "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    # groq.APIConnectionError / APITimeoutError, or plain socket trouble
+    return type(exc).__name__ in ("APIConnectionError", "APITimeoutError") or \
+        isinstance(exc, (TimeoutError, ConnectionError))
+
+
+class LLMGateway:
+    """
+    One shared Groq client for every completion in the process.
+
+    - explicit connect/read deadlines instead of the SDK's long default
+    - retries on connection errors, timeouts, 429 and 5xx with full-jitter
+      exponential backoff (the SDK's own retries are turned off)
+    - at most `max_in_flight` completions at once; callers wait up to
+      `acquire_timeout` for a slot and then get GatewayBusy
+    - optional hedging: when a blocking completion is still running after
+      the observed p95, a second identical request is sent and whichever
+      answers first wins
+    - latency histograms for whole completions and time to first token
+
+    `acomplete()` / `astream()` are the asyncio equivalents over AsyncGroq for
+    the ASGI server; they share the same slots, retries and statistics.
+
+    `base_url` points the client at another OpenAI-compatible server, such as
+    benchmarks/mock_llm_server.py.
+    """
+
+    def __init__(self, api_key: Optional[str], base_url: Optional[str] = None,
+                 model: str = "openai/gpt-oss-20b", connect_timeout: float = 3.0,
+                 read_timeout: float = 20.0, max_retries: int = 2, backoff: float = 0.25,
+                 max_in_flight: int = 4, acquire_timeout: float = 10.0,
+                 hedge: bool = False, hedge_min_samples: int = 20, **defaults):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.model = model
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_in_flight = max_in_flight
+        self.acquire_timeout = acquire_timeout
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.defaults = defaults
+        self._client = None
+        self._aclient = None
+        self._aclient_loop = None
+        self._client_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._pool = None
+        self.in_flight = 0
+        self.completions = 0
+        self.retries = 0
+        self.failures = 0
+        self.rejected = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.latency = LatencyStats(500, BUCKETS_MS)
+        self.ttft = LatencyStats(500, BUCKETS_MS)
+
+    @property
+    def available(self) -> bool:
+        return bool(self.api_key) and bool(groq)
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    import httpx
+                    timeout = httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+                    self._client = groq.Groq(api_key=self.api_key, base_url=self.base_url,
+                                             timeout=timeout, max_retries=0)
+        return self._client
+
+    @property
+    def aclient(self):
+        # One per event loop: httpx's async connection pool is bound to the loop that opened it
+        loop = asyncio.get_running_loop()
+        if self._aclient is None or self._aclient_loop is not loop:
+            import httpx
+            timeout = httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+            self._aclient = groq.AsyncGroq(api_key=self.api_key, base_url=self.base_url,
+                                           timeout=timeout, max_retries=0)
+            self._aclient_loop = loop
+        return self._aclient
+
+    # Slots
+
+    def _acquire(self, blocking: bool = True) -> bool:
+        ok = self._slots.acquire(timeout=self.acquire_timeout) if blocking else self._slots.acquire(blocking=False)
+        if ok:
+            with self._client_lock:
+                self.in_flight += 1
+        return ok
+
+    async def _aacquire(self):
+        # Polls the shared slots so waiting coroutines never park an executor thread
+        deadline = time.monotonic() + self.acquire_timeout
+        delay = 0.005
+        while not self._acquire(blocking=False):
+            if time.monotonic() >= deadline:
+                self.rejected += 1
+                raise GatewayBusy(f"{self.max_in_flight} LLM requests already in flight")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.1)
+
+    def _release(self):
+        with self._client_lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    # Requests
+
+    def _params(self, messages: list, overrides: dict) -> dict:
+        params = dict(self.defaults, model=self.model, messages=messages)
+        params.update(overrides)
+        return params
+
+    def _retry_delay(self, attempt: int, exc: Exception) -> float:
+        """Backoff before retry number `attempt` + 1; re-raises when out of retries."""
+        if attempt >= self.max_retries or not _retryable(exc):
+            self.failures += 1
+            raise exc
+        # Full jitter keeps concurrent callers from retrying in lockstep
+        delay = random.uniform(0, self.backoff * (2 ** attempt))
+        self.retries += 1
+        logging.warning(f"LLM request failed ({exc}); retry {attempt + 1} in {delay:.2f}s")
+        return delay
+
+    def _with_retries(self, call):
+        attempt = 0
+        while True:
+            try:
+                return call()
+            except Exception as e:
+                time.sleep(self._retry_delay(attempt, e))
+                attempt += 1
+
+    async def _awith_retries(self, call):
+        attempt = 0
+        while True:
+            try:
+                return await call()
+            except Exception as e:
+                await asyncio.sleep(self._retry_delay(attempt, e))
+                attempt += 1
+
+    def _create(self, params: dict):
+        return self.client.chat.completions.create(**params)
+
+    def complete(self, messages: list, **overrides):
+        """Blocking chat completion with deadlines, retries and optional hedging."""
+        if not self._acquire():
+            self.rejected += 1
+            raise GatewayBusy(f"{self.max_in_flight} LLM requests already in flight")
+        t0 = time.perf_counter()
+        try:
+            params = self._params(messages, overrides)
+            hedge_after = self._hedge_delay()
+            if hedge_after is None:
+                result = self._with_retries(lambda: self._create(params))
+            else:
+                result = self._hedged(params, hedge_after)
+        finally:
+            self._release()
+        ms = (time.perf_counter() - t0) * 1000
+        self.latency.record(ms)
+        self.ttft.record(ms)
+        self.completions += 1
+        return result
+
+    def _hedge_delay(self) -> Optional[float]:
+        if not self.hedge or len(self.latency) < self.hedge_min_samples:
+            return None
+        return self.latency.percentile(0.95) / 1000.0
+
+    def _hedged(self, params: dict, delay: float):
+        if self._pool is None:
+            with self._client_lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_in_flight * 2,
+                                                    thread_name_prefix="llm-hedge")
+        primary = self._pool.submit(self._with_retries, lambda: self._create(params))
+        done, _ = wait([primary], timeout=delay)
+        # Only hedge when a spare slot exists; the extra request must not starve others
+        if done or not self._acquire(blocking=False):
+            return primary.result()
+        # The slower request is not cancelled (the SDK cannot abort it), so the
+        # extra slot stays taken until both requests have finished
+        self.hedges += 1
+        try:
+            backup = self._pool.submit(self._with_retries, lambda: self._create(params))
+        except Exception:
+            self._release()
+            raise
+        self._release_when_done([primary, backup])
+        pending = {primary, backup}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                if fut.exception() is None:
+                    if fut is backup:
+                        self.hedge_wins += 1
+                    return fut.result()
+                error = fut.exception()
+        raise error
+
+    def _release_when_done(self, futures):
+        """Hands back one slot once every future has finished."""
+        left = [len(futures)]
+        lock = threading.Lock()
+
+        def settle(_):
+            with lock:
+                left[0] -= 1
+                last = left[0] == 0
+            if last:
+                self._release()
+
+        for fut in futures:
+            fut.add_done_callback(settle)
+
+    def stream(self, messages: list, **overrides) -> Iterator[str]:
+        """
+        Yields reply text deltas. Retries only happen before the first chunk;
+        once text has been handed out, a failure propagates to the caller.
+        """
+        if not self._acquire():
+            self.rejected += 1
+            raise GatewayBusy(f"{self.max_in_flight} LLM requests already in flight")
+        t0 = time.perf_counter()
+        try:
+            params = self._params(messages, dict(overrides, stream=True))
+
+            def first_chunk():
+                chunks = iter(self._create(params))
+                return chunks, next(chunks, None)
+
+            chunks, chunk = self._with_retries(first_chunk)
+            first = True
+            try:
+                while chunk is not None:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        if first:
+                            self.ttft.record((time.perf_counter() - t0) * 1000)
+                            first = False
+                        yield delta
+                    chunk = next(chunks, None)
+            except GeneratorExit:
+                raise
+            except Exception:
+                self.failures += 1
+                raise
+            self.latency.record((time.perf_counter() - t0) * 1000)
+            self.completions += 1
+        finally:
+            self._release()
+
+    # Asyncio
+
+    async def acomplete(self, messages: list, **overrides):
+        """complete() without blocking the event loop. A losing hedge is cancelled outright."""
+        await self._aacquire()
+        t0 = time.perf_counter()
+        try:
+            params = self._params(messages, overrides)
+            call = lambda: self.aclient.chat.completions.create(**params)
+            hedge_after = self._hedge_delay()
+            if hedge_after is None:
+                result = await self._awith_retries(call)
+            else:
+                result = await self._ahedged(call, hedge_after)
+        finally:
+            self._release()
+        ms = (time.perf_counter() - t0) * 1000
+        self.latency.record(ms)
+        self.ttft.record(ms)
+        self.completions += 1
+        return result
+
+    async def _ahedged(self, call, delay: float):
+        primary = asyncio.ensure_future(self._awith_retries(call))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done or not self._acquire(blocking=False):
+            return await primary
+        self.hedges += 1
+        backup = asyncio.ensure_future(self._awith_retries(call))
+        try:
+            pending = {primary, backup}
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for fut in done:
+                    if fut.exception() is None:
+                        if fut is backup:
+                            self.hedge_wins += 1
+                        return fut.result()
+                    error = fut.exception()
+            raise error
+        finally:
+            primary.cancel()
+            backup.cancel()
+            self._release()
+
+    async def astream(self, messages: list, **overrides) -> AsyncIterator[str]:
+        """stream() as an async generator; same retry rule (only before the first chunk)."""
+        await self._aacquire()
+        t0 = time.perf_counter()
+        try:
+            params = self._params(messages, dict(overrides, stream=True))
+
+            async def next_chunk(chunks):
+                # anext() is 3.10+, and the Pi's Python is 3.9
+                try:
+                    return await chunks.__anext__()
+                except StopAsyncIteration:
+                    return None
+
+            async def first_chunk():
+                chunks = (await self.aclient.chat.completions.create(**params)).__aiter__()
+                return chunks, await next_chunk(chunks)
+
+            chunks, chunk = await self._awith_retries(first_chunk)
+            first = True
+            try:
+                while chunk is not None:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        if first:
+                            self.ttft.record((time.perf_counter() - t0) * 1000)
+                            first = False
+                        yield delta
+                    chunk = await next_chunk(chunks)
+            except (GeneratorExit, asyncio.CancelledError):
+                raise
+            except Exception:
+                self.failures += 1
+                raise
+            self.latency.record((time.perf_counter() - t0) * 1000)
+            self.completions += 1
+        finally:
+            self._release()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "completions": self.completions,
+            "retries": self.retries,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "latency": self.latency.summary(),
+            "ttft": self.ttft.summary(),
+        }
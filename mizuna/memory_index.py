@@ -0,0 +1,163 @@
+import re, math, heapq, threading
+from array import array
+from typing import List, Tuple
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+STOPWORDS = frozenset("""
+a an and are as at be been but by can could did do does for from had has have he her him his how i if in
+into is it its just me more my no not of on or our she so than that the their them then there these they
+this to too us was we were what when where which who why will with would you your about tell please
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if t not in STOPWORDS and len(t) > 1]
+
+
+def doc_text(doc: dict) -> str:
+    # Title is counted twice as a cheap field boost
+    return " ".join(str(doc.get(f) or "") for f in ("title", "title", "overview", "content"))
+
+
+class MemoryIndex:
+    """
+    In-process BM25 index over memory documents (title, overview, content).
+
+    Documents are appended incrementally; postings are compact typed arrays,
+    and scoring is vectorised with NumPy when it is installed.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, max_df_ratio: float = 0.5):
+        self.k1 = k1
+        self.b = b
+        self.max_df_ratio = max_df_ratio
+        self.docs = []
+        self.last_id = None
+        self._postings = {}          # term -> (array('I') doc numbers, array('H') term freqs)
+        self._lengths = array("H")
+        self._total_len = 0
+        self._impact_cache = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, doc: dict):
+        tokens = tokenize(doc_text(doc))
+        counts = {}
+        for t in tokens:
+            counts[t] = counts.get(t, 0) + 1
+        with self._lock:
+            n = len(self.docs)
+            self.docs.append({k: doc.get(k) for k in ("title", "overview", "content", "local_time")})
+            for term, tf in counts.items():
+                ids, tfs = self._postings.get(term) or self._postings.setdefault(term, (array("I"), array("H")))
+                ids.append(n)
+                tfs.append(min(tf, 65535))
+            self._lengths.append(min(len(tokens), 65535))
+            self._total_len += len(tokens)
+            if "_id" in doc:
+                self.last_id = doc["_id"]
+
+    def _query_terms(self, query: str):
+        n = len(self.docs)
+        terms = []
+        for term in set(tokenize(query)):
+            posting = self._postings.get(term)
+            if not posting:
+                continue
+            df = len(posting[0])
+            # Terms in most documents barely move BM25 but dominate the cost
+            if n > 20 and df > self.max_df_ratio * n:
+                continue
+            idf = math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+            terms.append((idf, term, posting))
+        return terms
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[dict, float]]:
+        """Top-k (doc, score) by BM25; empty when no query term is indexed."""
+        with self._lock:
+            if not self.docs:
+                return []
+            terms = self._query_terms(query)
+            if not terms:
+                return []
+            avgdl = self._total_len / len(self.docs) or 1.0
+            if np is not None:
+                ranked = self._score_numpy(terms, avgdl, k)
+            else:
+                ranked = self._score_python(terms, avgdl, k)
+            return [(self.docs[i], s) for i, s in ranked]
+
+    def _score_python(self, terms, avgdl: float, k: int):
+        k1, b, lengths = self.k1, self.b, self._lengths
+        scores = {}
+        for idf, _, (ids, tfs) in terms:
+            for i, tf in zip(ids, tfs):
+                norm = k1 * (1.0 - b + b * lengths[i] / avgdl)
+                scores[i] = scores.get(i, 0.0) + idf * tf * (k1 + 1.0) / (tf + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda kv: kv[1])
+
+    def _impacts(self, term: str, ids, tfs, avgdl: float):
+        """Per-posting BM25 tf weights for `term`, cached and extended as documents arrive."""
+        cached = self._impact_cache.get(term)
+        if cached is not None and abs(cached[0] - avgdl) <= 0.02 * avgdl:
+            _, impacts = cached
+            start = len(impacts)
+        else:
+            impacts, start = np.empty(0, dtype=np.float32), 0
+        if start < len(ids):
+            k1, b = self.k1, self.b
+            new_ids = np.frombuffer(ids, dtype=np.uint32)[start:]
+            new_tfs = np.frombuffer(tfs, dtype=np.uint16)[start:].astype(np.float32)
+            lengths = np.frombuffer(self._lengths, dtype=np.uint16)[new_ids]
+            norm = k1 * (1.0 - b + b * lengths / avgdl)
+            tail = (new_tfs * (k1 + 1.0) / (new_tfs + norm)).astype(np.float32)
+            impacts = np.concatenate((impacts, tail)) if start else tail
+            self._impact_cache[term] = (avgdl if not start else cached[0], impacts)
+        return impacts
+
+    def _score_numpy(self, terms, avgdl: float, k: int):
+        all_ids, all_scores = [], []
+        for idf, term, (ids, tfs) in terms:
+            all_ids.append(np.frombuffer(ids, dtype=np.uint32))
+            all_scores.append(idf * self._impacts(term, ids, tfs, avgdl))
+        ids = np.concatenate(all_ids) if len(all_ids) > 1 else all_ids[0]
+        contrib = np.concatenate(all_scores) if len(all_scores) > 1 else all_scores[0]
+        # Scatter-add into a dense accumulator, then select among the postings
+        # only, which avoids scanning the whole corpus for non-zero scores
+        totals = np.bincount(ids, weights=contrib, minlength=len(self.docs))
+        cand_scores = totals[ids]
+        limit = k * len(terms)
+        if len(ids) > limit:
+            part = np.argpartition(-cand_scores, limit - 1)[:limit]
+        else:
+            part = np.arange(len(ids))
+        part = part[np.argsort(-cand_scores[part], kind="stable")]
+        ranked, seen = [], set()
+        for j in part:
+            i = int(ids[j])
+            if i not in seen:
+                seen.add(i)
+                ranked.append((i, float(cand_scores[j])))
+                if len(ranked) == k:
+                    break
+        return ranked
+
+    def recent(self, k: int = 5) -> List[dict]:
+        """Newest k documents, for prompts with no indexed terms ("what about that?")."""
+        with self._lock:
+            return self.docs[-k:][::-1]
+
+    def stats(self) -> dict:
+        return {
+            "documents": len(self.docs),
+            "terms": len(self._postings),
+            "backend": "numpy" if np is not None else "python",
+        }
@@ -0,0 +1,177 @@
+import os, time, threading
+from typing import Callable, List, Optional
+
+from memory_index import MemoryIndex
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Process-wide pooled MongoClient, created on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from pymongo import MongoClient
+                uri = os.getenv("MONGODB_URI")
+                if not uri:
+                    raise RuntimeError("MONGODB_URI not set")
+                _client = MongoClient(uri, serverSelectionTimeoutMS=5000, maxPoolSize=10)
+    return _client
+
+
+def get_collection():
+    db = os.getenv("MONGODB_DB", "mizuna_companion")
+    collection = os.getenv("MONGODB_COLLECTION", "mizuna_ai")
+    return get_client()[db][collection]
+
+
+def load_new_docs(after_id=None) -> List[dict]:
+    """Documents inserted after `after_id` (all of them when None), oldest first."""
+    query = {"_id": {"$gt": after_id}} if after_id is not None else {}
+    fields = {"_id": 1, "title": 1, "overview": 1, "content": 1, "local_time": 1}
+    return list(get_collection().find(query, fields).sort("_id", 1))
+
+
+def sync_index(index: Optional[MemoryIndex]) -> MemoryIndex:
+    """Bring the retrieval index up to date, fetching only new documents."""
+    if index is not None:
+        new_docs = load_new_docs(index.last_id)
+        # Any other count means something was deleted, even if inserts made up for it
+        if get_collection().estimated_document_count() == len(index) + len(new_docs):
+            for doc in new_docs:
+                index.add(doc)
+            return index
+    # First load, or documents were deleted: rebuild from scratch
+    index = MemoryIndex()
+    for doc in load_new_docs():
+        index.add(doc)
+    return index
+
+
+def collection_version():
+    """Cheap change marker: document count plus the newest _id."""
+    coll = get_collection()
+    newest = coll.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+    return coll.estimated_document_count(), newest["_id"] if newest else None
+
+
+MEMORY_HEADER = "Your conversation memory (use only if relevant to the current question):"
+
+
+def memory_entry(doc: dict) -> Optional[str]:
+    """One context line for a memory document, or None when it has no title/overview."""
+    title = doc.get("title", "")
+    overview = doc.get("overview", "")
+    content = doc.get("content", "")
+    if not (title and overview):
+        return None
+    entry = f"Previously discussed: {title}. {overview}"
+    if content and len(content) < 300:
+        entry += f" Additional context: {content}"
+    return entry
+
+
+def memory_entries(docs: List[dict]) -> List[str]:
+    """Context lines in rank order, ready for conversation.pack_messages."""
+    return [entry for entry in map(memory_entry, docs) if entry]
+
+
+class ContextCache:
+    """
+    Caches the memory documents used as LLM context.
+
+    Within `ttl` seconds a lookup is served from memory. After that a cheap
+    version probe runs and the loader only runs when it changed; it gets the
+    previous value so it can update incrementally. invalidate() forces a
+    full reload, e.g. after the collection was cleared.
+    """
+
+    def __init__(self, loader: Callable[[object], object] = sync_index,
+                 version: Callable[[], object] = collection_version, ttl: float = 30.0):
+        self.loader = loader
+        self.version = version
+        self.ttl = ttl
+        self._docs = None
+        self._version = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.probes = 0
+        self._load_ms_total = 0.0
+        self._hit_ms_total = 0.0
+
+    def get(self):
+        t0 = time.perf_counter()
+        with self._lock:
+            now = time.monotonic()
+            hit = self._docs is not None
+            current = None
+            if hit and now - self._checked >= self.ttl:
+                self.probes += 1
+                current = self.version()
+                hit = current == self._version
+                if hit:
+                    self._checked = now
+            if hit:
+                self.hits += 1
+                self._hit_ms_total += (time.perf_counter() - t0) * 1000
+                return self._docs
+            # A failed probe already fetched the new version; only a cold load needs one
+            version = current if current is not None else self.version()
+            self._docs = self.loader(self._docs)
+            self._version = version
+            self._checked = time.monotonic()
+            self.misses += 1
+            self._load_ms_total += (time.perf_counter() - t0) * 1000
+            return self._docs
+
+    def invalidate(self):
+        with self._lock:
+            self._docs = None
+            self._version = None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        avg_load = self._load_ms_total / self.misses if self.misses else None
+        avg_hit = self._hit_ms_total / self.hits if self.hits else None
+        saved = (avg_load - avg_hit) if avg_load is not None and avg_hit is not None else None
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "version_probes": self.probes,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "avg_load_ms": None if avg_load is None else round(avg_load, 2),
+            "avg_hit_ms": None if avg_hit is None else round(avg_hit, 3),
+            # Latency a cached /ask avoids compared with reading Mongo each time
+            "saved_ms_per_hit": None if saved is None else round(saved, 2),
+            "saved_ms_total": None if saved is None else round(saved * self.hits, 1),
+        }
+
+
+context_cache = ContextCache(ttl=float(os.getenv("CONTEXT_CACHE_TTL", "30")))
+
+
+def relevant_docs(prompt: str, k: int = 5) -> List[dict]:
+    """Top-k memories for the prompt by BM25, or the newest k when nothing matches."""
+    index = context_cache.get()
+    hits = index.search(prompt, k)
+    if hits:
+        return [doc for doc, _ in hits]
+    return index.recent(k)
+
+
+def index_stats() -> dict:
+    stats = context_cache.stats()
+    index = context_cache._docs
+    if index is not None:
+        stats["index"] = index.stats()
+    return stats
+
+
+def clear_memories() -> int:
+    result = get_collection().delete_many({})
+    context_cache.invalidate()
+    return result.deleted_count
@@ -0,0 +1,139 @@
+import time, bisect, logging, threading
+from collections import deque
+from typing import Callable, List, Optional
+
+
+class RingBuffer:
+    """Fixed-size, thread-safe time series of dict samples keyed by "ts"."""
+
+    def __init__(self, size: int):
+        self._items = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def append(self, sample: dict):
+        with self._lock:
+            self._items.append(sample)
+
+    def latest(self) -> Optional[dict]:
+        with self._lock:
+            return self._items[-1] if self._items else None
+
+    def since(self, ts: float = 0.0) -> List[dict]:
+        with self._lock:
+            items = list(self._items)
+        # Samples are appended in time order, so walk back from the newest
+        i = len(items)
+        while i > 0 and items[i - 1]["ts"] > ts:
+            i -= 1
+        return items[i:]
+
+    def __len__(self):
+        return len(self._items)
+
+
+class MetricsSampler:
+    """
+    Calls `collect()` every `interval` seconds on a background thread and keeps
+    the results in a ring buffer, so request handlers only read memory.
+    """
+
+    def __init__(self, collect: Callable[[], dict], interval: float = 2.0, size: int = 900):
+        self.collect = collect
+        self.interval = interval
+        self.buffer = RingBuffer(size)
+        self.errors = 0
+        self.last_duration = 0.0
+        self._thread = None
+        self._lock = threading.Lock()
+        self._first = threading.Event()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="metrics-sampler", daemon=True)
+                self._thread.start()
+
+    def _sample_once(self):
+        t0 = time.monotonic()
+        try:
+            sample = self.collect()
+            sample["ts"] = round(time.time(), 3)
+            self.buffer.append(sample)
+        except Exception as e:
+            self.errors += 1
+            logging.warning(f"Metrics sample failed: {e}")
+        self.last_duration = time.monotonic() - t0
+        self._first.set()
+
+    def _run(self):
+        next_t = time.monotonic()
+        while True:
+            self._sample_once()
+            next_t += self.interval
+            delay = next_t - time.monotonic()
+            if delay < 0:
+                # Sampling overran; realign rather than bursting to catch up
+                next_t = time.monotonic()
+                delay = 0
+            time.sleep(delay)
+
+    def latest(self, wait: float = 2.0) -> dict:
+        """Most recent sample; starts the sampler and waits for the first one if needed."""
+        self.start()
+        self._first.wait(wait)
+        return self.buffer.latest() or {}
+
+    def history(self, since: float = 0.0) -> List[dict]:
+        self.start()
+        return self.buffer.since(since)
+
+
+class LatencyStats:
+    """
+    Rolling window of latency samples (ms) with percentile summaries, and a
+    histogram when bucket upper bounds are given: cumulative since start, or
+    over the same window as the percentiles with cumulative=False.
+    """
+
+    def __init__(self, size: int = 200, buckets_ms: Optional[tuple] = None, cumulative: bool = True):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.buckets_ms = buckets_ms
+        self._histogram = [0] * (len(buckets_ms) + 1) if buckets_ms and cumulative else None
+
+    def record(self, ms: float):
+        with self._lock:
+            self._samples.append(ms)
+            self.count += 1
+            if self._histogram is not None:
+                self._histogram[bisect.bisect_left(self.buckets_ms, ms)] += 1
+
+    def percentile(self, p: float) -> Optional[float]:
+        with self._lock:
+            ordered = sorted(self._samples)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+    def __len__(self):
+        return len(self._samples)
+
+    def summary(self) -> dict:
+        with self._lock:
+            ordered = sorted(self._samples)
+            histogram = list(self._histogram) if self._histogram is not None else None
+        if not ordered:
+            out = {"count": self.count, "p50_ms": None, "p95_ms": None, "p99_ms": None}
+        else:
+            def pct(p):
+                return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 1)
+
+            out = {"count": self.count, "p50_ms": pct(0.5), "p95_ms": pct(0.95), "p99_ms": pct(0.99)}
+        if histogram is None and self.buckets_ms:
+            histogram = [0] * (len(self.buckets_ms) + 1)
+            for ms in ordered:
+                histogram[bisect.bisect_left(self.buckets_ms, ms)] += 1
+        if histogram is not None:
+            out["histogram"] = {"bounds_ms": list(self.buckets_ms), "counts": histogram}
+        return out
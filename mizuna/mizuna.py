@@ -1,38 +1,55 @@
-import os, io, time, logging, requests, subprocess, re, json
-from threading import Condition
+import os, sys, time, logging, subprocess, re, json
 from flask import Flask, Response, render_template, request, jsonify
-from picamera2 import Picamera2
-from picamera2.encoders import JpegEncoder
-from picamera2.outputs import FileOutput
 from typing import Union
-from datetime import datetime
+from datetime import datetime, timezone
+from robot_link import RobotLink, RobotHealthMonitor
+import control_channel
+from camera import CameraManager, backend_factory, PROFILES, DEFAULT_PROFILE
+from lazy import LazyModule
+from metrics import MetricsSampler, LatencyStats
+from tts import worker_from_env, prewarm_phrases
+from memory_store import relevant_docs, index_stats, memory_entries, clear_memories, MEMORY_HEADER
+import context_classifier
+from response_cache import ResponseCache
+from llm_gateway import LLMGateway, GatewayBusy
+from conversation import ConversationBuffer, pack_messages
+
+# Heavy optional SDKs load on first use; they are falsy when not installed
+psutil = LazyModule("psutil")
+speechsdk = LazyModule("azure.cognitiveservices.speech")
 
 try:
-    import psutil  
+    from flask_sock import Sock
 except Exception:
-    psutil = None
+    Sock = None
 
 try:
     from dotenv import load_dotenv
     load_dotenv()
 except Exception:
     pass
-try:
-    from groq import Groq
-except Exception:
-    Groq = None
-try:
-    import azure.cognitiveservices.speech as speechsdk
-except Exception:
-    speechsdk = None
 
 # ---- Config ----
 ROBOT_BASE = os.getenv("ROBOT_BASE", "http://mizuna.local") 
+ROBOT_QUEUE_SIZE = int(os.getenv("ROBOT_QUEUE_SIZE", "32"))
+ROBOT_DNS_TTL = float(os.getenv("ROBOT_DNS_TTL", "60"))
+ROBOT_COALESCE = os.getenv("ROBOT_COALESCE", "1") == "1"   # latest-wins for pending moves
+ROBOT_DEADMAN_MS = int(os.getenv("ROBOT_DEADMAN_MS", "0"))  # auto-stop after this much silence, 0 = off
+ROBOT_PROBE_INTERVAL = float(os.getenv("ROBOT_PROBE_INTERVAL", "2"))        # health probe period while online
+ROBOT_PROBE_MAX_INTERVAL = float(os.getenv("ROBOT_PROBE_MAX_INTERVAL", "30"))  # backoff ceiling while offline
 SPEED_DEFAULT = 100
-CAM_RES = (640, 480)
-PORT = 5000
+CAMERA_BACKEND = os.getenv("CAMERA_BACKEND", "picamera2")  # "synthetic" or "fake" run without camera hardware
+CAMERA_IDLE_GRACE = float(os.getenv("CAMERA_IDLE_GRACE", "10"))  # seconds to keep encoding after last viewer
+SNAPSHOT_MAX_AGE = 1.0   # older cached frames are treated as stale (camera was idle)
+SNAPSHOT_MAX_WAIT = 15.0  # cap for ?wait_newer long-polls
+PORT = int(os.getenv("PORT", "5000"))
+# "flask" (thread per connection) or "asgi" (one asyncio loop, see asgi_server.py)
+SERVER_MODE = os.getenv("SERVER_MODE", "flask").lower()
+METRICS_INTERVAL = float(os.getenv("METRICS_INTERVAL", "2"))  # seconds between background samples
+METRICS_HISTORY = int(os.getenv("METRICS_HISTORY", "900"))     # samples kept (30 min at 2 s)
 
 app = Flask(__name__)
+sock = Sock(app) if Sock else None
 START_TIME = time.time()
 
 # Secrets / config for LLM + TTS
@@ -40,58 +57,121 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 AZURE_SPEECH_KEY = os.getenv("AZURE_SPEECH_KEY")
 AZURE_SPEECH_REGION = os.getenv("AZURE_SPEECH_REGION")
 AZURE_SPEECH_VOICE = os.getenv("AZURE_SPEECH_VOICE", "en-US-JennyNeural")
+# Speech backend ("azure" or "fake") and player ("aplay" or "sleep")
+TTS_BACKEND = os.getenv("TTS_BACKEND", "azure")
+TTS_PLAYER = os.getenv("TTS_PLAYER", "aplay")
+# On-disk cache of synthesized sentences (TTS_CACHE_DIR), shared with app.py; 0 disables
+TTS_CACHE_MB = float(os.getenv("TTS_CACHE_MB", "64"))
+TTS_PREWARM = prewarm_phrases()  # TTS_PREWARM_PHRASES, "|"-separated; synthesized into the cache at boot
+# /ask reply cache; similarity > 0 (e.g. 0.85) also reuses near-duplicate prompts
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "600"))
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0"))
+# Recent /ask turns per session, and the estimated-token budget for everything sent to the LLM
+CONVERSATION_TURNS = int(os.getenv("CONVERSATION_TURNS", "8"))
+CONVERSATION_TTL = float(os.getenv("CONVERSATION_TTL", "1800"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))
+
+# Shared Groq client: deadlines, retries, concurrency cap and optional hedging
+llm = LLMGateway(
+    GROQ_API_KEY,
+    base_url=os.getenv("GROQ_BASE_URL") or None,
+    connect_timeout=float(os.getenv("LLM_CONNECT_TIMEOUT", "3")),
+    read_timeout=float(os.getenv("LLM_READ_TIMEOUT", "20")),
+    max_retries=int(os.getenv("LLM_MAX_RETRIES", "2")),
+    max_in_flight=int(os.getenv("LLM_MAX_IN_FLIGHT", "4")),
+    hedge=os.getenv("LLM_HEDGE", "0").lower() in ("1", "true", "yes"),
+    temperature=0.3,
+    top_p=0.9,
+    max_tokens=200,
+)
 
 # ---- Robot HTTP helper ----
+# Pooled keep-alive link; commands are queued and sent by one background thread
+robot_link = RobotLink(ROBOT_BASE, timeout=2, queue_size=ROBOT_QUEUE_SIZE, dns_ttl=ROBOT_DNS_TTL,
+                       coalesce=ROBOT_COALESCE, deadman=ROBOT_DEADMAN_MS / 1000.0)
+
+# Rolling latency/loss statistics from /status probes plus the link's own sends
+robot_health = RobotHealthMonitor(robot_link, interval=ROBOT_PROBE_INTERVAL,
+                                  max_interval=ROBOT_PROBE_MAX_INTERVAL)
+
 def send_robot_cmd(c: str) -> bool:
-    try:
-        r = requests.get(f"{ROBOT_BASE}/cmd", params={"c": c.strip().upper()}, timeout=2)
-        return r.ok
-    except Exception as e:
-        logging.warning(f"Robot cmd failed: {e}")
-        return False
+    return robot_link.send_cmd(c)
 
 def send_robot_speed(v: Union[int, str]) -> bool:
-    try:
-        r = requests.get(f"{ROBOT_BASE}/speed", params={"v": str(v)}, timeout=2)
-        return r.ok
-    except Exception as e:
-        logging.warning(f"Robot speed failed: {e}")
-        return False
+    return robot_link.send_speed(v)
 
 # ---- Camera Streaming Buffer ----
-class StreamingOutput(io.BytesIO):
-    def __init__(self):
-        super().__init__()
-        self.frame = None
-        self.condition = Condition()
-    def write(self, buf):
-        with self.condition:
-            self.frame = buf
-            self.condition.notify_all()
-
-output = StreamingOutput()
-picam2 = Picamera2()
-config = picam2.create_video_configuration(main={"size": CAM_RES, "format": "XRGB8888"})
-picam2.configure(config)
-encoder = JpegEncoder()
-picam2.start_recording(encoder, FileOutput(output))
-
-def frame_generator():
-    while True:
-        with output.condition:
-            output.condition.wait()
-            frame = output.frame
-        if frame:
-            yield (b'--frame\r\nContent-Type: image/jpeg\r\nContent-Length: ' +
-                   str(len(frame)).encode() + b'\r\n\r\n' + frame + b'\r\n')
+# One broadcaster per quality profile (see camera.PROFILES); each profile's
+# encoder only runs while someone is subscribed to it. The camera is opened on first use.
+camera = CameraManager(backend_factory(CAMERA_BACKEND, PROFILES), PROFILES, grace=CAMERA_IDLE_GRACE)
+
+def frame_generator(profile: str = DEFAULT_PROFILE):
+    if profile == "auto":
+        yield from camera.adaptive_frames()
+        return
+    with camera.subscribe(profile) as sub:
+        for chunk in sub:
+            yield chunk
 
 @app.route("/")
 def index():
-    return render_template("index.html", SPEED_DEFAULT=SPEED_DEFAULT)
+    return render_template("index.html", SPEED_DEFAULT=SPEED_DEFAULT, DEADMAN_MS=ROBOT_DEADMAN_MS,
+                           CONTROL_WS=sock is not None)
 
 @app.route("/stream.mjpg")
 def stream():
-    return Response(frame_generator(), mimetype='multipart/x-mixed-replace; boundary=frame')
+    # ?profile=low|medium|high|auto
+    profile = request.args.get("profile", DEFAULT_PROFILE).lower()
+    if profile != "auto" and profile not in PROFILES:
+        return jsonify(error=f"Unknown profile '{profile}'", profiles=list(PROFILES) + ["auto"]), 400
+    try:
+        camera.backend
+    except Exception as e:
+        logging.warning(f"Camera unavailable: {e}")
+        return jsonify(error="camera_unavailable", detail=str(e)), 503
+    return Response(frame_generator(profile), mimetype='multipart/x-mixed-replace; boundary=frame')
+
+@app.route("/snapshot.jpg")
+def snapshot():
+    """
+    Latest JPEG from the stream as-is (no re-encode). ETag/Last-Modified follow
+    the frame sequence number so repeated polls get a 304, and
+    ?wait_newer=<seq> long-polls until a frame after <seq> exists. A frame
+    younger than SNAPSHOT_MAX_AGE is served without waking the encoder.
+    """
+    profile = request.args.get("profile", DEFAULT_PROFILE).lower()
+    if profile not in PROFILES:
+        return jsonify(error=f"Unknown profile '{profile}'", profiles=list(PROFILES)), 400
+    wait_newer = request.args.get("wait_newer", type=int)
+    out = camera.output(profile)
+    seq, frame, ts = out.latest()
+    # Only age decides: a matching ETag on an old frame must still wake the camera
+    cached = frame is not None and wait_newer is None and time.time() - ts <= SNAPSHOT_MAX_AGE
+    if not cached:
+        try:
+            # Holding a reference keeps the encoder warm for the grace period between polls
+            camera.acquire(profile)
+        except Exception as e:
+            logging.warning(f"Camera unavailable: {e}")
+            return jsonify(error="camera_unavailable", detail=str(e)), 503
+        try:
+            if wait_newer is not None and seq <= wait_newer:
+                out.wait_newer(wait_newer, SNAPSHOT_MAX_WAIT)
+            elif frame is None or time.time() - ts > SNAPSHOT_MAX_AGE:
+                out.wait_newer(seq, SNAPSHOT_MAX_WAIT)
+            seq, frame, ts = out.latest()
+        finally:
+            camera.release(profile)
+    if frame is None:
+        return jsonify(error="no_frame"), 503
+
+    resp = Response(frame, mimetype="image/jpeg")
+    resp.set_etag(f"{profile}-{seq}")
+    resp.last_modified = datetime.fromtimestamp(ts, timezone.utc)
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Frame-Seq"] = str(seq)
+    return resp.make_conditional(request)
 
 @app.route("/cmd", methods=["POST"])
 def cmd():
@@ -107,6 +187,12 @@ def speed():
     ok = send_robot_speed(v)
     return jsonify(status="ok" if ok else "robot_error")
 
+# ---- Persistent control channel (kept alongside /cmd and /speed) ----
+if sock is not None:
+    @sock.route("/ws")
+    def control_ws(ws):
+        control_channel.serve(ws, robot_link)
+
 # ---- Helpers for Stats ----
 def _format_duration(seconds: int) -> str:
     h = seconds // 3600
@@ -114,35 +200,36 @@ def _format_duration(seconds: int) -> str:
     s = seconds % 60
     return f"{h:02d}:{m:02d}:{s:02d}"
 
-def _read_cpu_temp() -> Union[float, None]:
-    # Prefer sysfs (CPU) then vcgencmd
-    try:
-        with open("/sys/class/thermal/thermal_zone0/temp", "r") as f:
-            t = int(f.read().strip())
-            return round(t / 1000.0, 1)
-    except Exception:
-        pass
-    # vcgencmd 
+_VCGENCMD_OK = None  # unknown until the first call; False stops further forks
+
+def _read_vcgencmd_temp() -> Union[float, None]:
+    global _VCGENCMD_OK
+    if _VCGENCMD_OK is False:
+        return None
     try:
         out = subprocess.check_output(["vcgencmd", "measure_temp"], text=True)
+        _VCGENCMD_OK = True
         m = re.search(r"temp=([\d\.]+)'C", out)
         if m:
             return float(m.group(1))
+    except FileNotFoundError:
+        _VCGENCMD_OK = False
     except Exception:
         pass
     return None
 
-def _read_gpu_temp() -> Union[float, None]:
-    # vcgencmd for GPU temp if available
+def _read_temps():
+    """(cpu, gpu) temperatures with at most one vcgencmd fork."""
+    cpu_t = None
+    # Prefer sysfs (CPU) then vcgencmd
     try:
-        out = subprocess.check_output(["vcgencmd", "measure_temp"], text=True)
-        m = re.search(r"temp=([\d\.]+)'C", out)
-        if m:
-            return float(m.group(1))
+        with open("/sys/class/thermal/thermal_zone0/temp", "r") as f:
+            cpu_t = round(int(f.read().strip()) / 1000.0, 1)
     except Exception:
         pass
-    # Fallback: if not available, reuse CPU temp
-    return _read_cpu_temp()
+    gpu_t = _read_vcgencmd_temp()
+    # Each falls back to the other when only one source exists
+    return (cpu_t if cpu_t is not None else gpu_t), (gpu_t if gpu_t is not None else cpu_t)
 
 def _get_system_metrics():
     cpu_percent = None
@@ -150,7 +237,8 @@ def _get_system_metrics():
     mem_percent = None
     if psutil:
         try:
-            cpu_percent = psutil.cpu_percent(interval=0.1)
+            # Non-blocking: utilisation since the previous sampler tick
+            cpu_percent = psutil.cpu_percent(interval=None)
             disk_percent = psutil.disk_usage("/").percent
             mem_percent = psutil.virtual_memory().percent
         except Exception:
@@ -164,13 +252,13 @@ def _get_system_metrics():
             cpu_percent = min(100.0, max(0.0, (load1 / cores) * 100.0))
         except Exception:
             pass
-        # Disk usage via 'df /'
+        # Disk usage via statvfs (same figure as 'df /', without the fork)
         try:
-            out = subprocess.check_output(["df", "/"], text=True).strip().splitlines()
-            if len(out) >= 2:
-                parts = out[1].split()
-                if len(parts) >= 5 and parts[4].endswith('%'):
-                    disk_percent = float(parts[4].rstrip('%'))
+            st = os.statvfs("/")
+            used = (st.f_blocks - st.f_bfree) * st.f_frsize
+            avail = st.f_bavail * st.f_frsize
+            if used + avail:
+                disk_percent = round(100.0 * used / (used + avail), 1)
         except Exception:
             pass
         # Memory via /proc/meminfo
@@ -192,54 +280,88 @@ def _get_system_metrics():
         "memory": {"percent": mem_percent},
     }
 
-def _check_robot_connectivity():
-    t0 = time.time()
-    try:
-        # Lightweight probe to base URL
-        r = requests.get(ROBOT_BASE, timeout=0.7)
-        rt_ms = int((time.time() - t0) * 1000)
-        status = "online" if r.ok else "offline"
-        return {
-            "robot_status": status,
-            "stats": {"avg_response_time": rt_ms},
-            "last_checked": int(time.time()),
-        }
-    except Exception as e:
-        return {
-            "robot_status": "offline",
-            "stats": {"avg_response_time": None},
-            "last_checked": int(time.time()),
-        }
-
-# ---- Stats Endpoints ----
-@app.route("/temperature", methods=["GET"])
-def temperature():
-    cpu_t = _read_cpu_temp()
-    gpu_t = _read_gpu_temp()
-    return jsonify({
+def _collect_metrics() -> dict:
+    """One flat sample for the background sampler."""
+    robot_health.start()
+    system = _get_system_metrics()
+    cpu_t, gpu_t = _read_temps()
+    robot = robot_health.snapshot()
+    return {
+        "cpu": system["cpu"]["percent"],
+        "memory": system["memory"]["percent"],
+        "disk": system["disk"]["percent"],
         "cpu_temp": cpu_t,
         "gpu_temp": gpu_t,
-        "timestamp": int(time.time()),
-    })
+        "robot_status": robot["robot_status"],
+        "robot_ms": robot["stats"]["ewma_ms"],
+        "robot_checked": robot["last_checked"],
+    }
 
-@app.route("/uptime", methods=["GET"])
-def uptime():
+# Endpoints below serve the latest sample from memory instead of measuring inline
+metrics = MetricsSampler(_collect_metrics, interval=METRICS_INTERVAL, size=METRICS_HISTORY)
+
+# ---- Stats Endpoints ----
+# Payloads are built here so the Flask and ASGI servers report the same thing
+def _temperature_payload() -> dict:
+    sample = metrics.latest()
+    return {
+        "cpu_temp": sample.get("cpu_temp"),
+        "gpu_temp": sample.get("gpu_temp"),
+        "timestamp": int(sample.get("ts", time.time())),
+    }
+
+def _uptime_payload() -> dict:
     secs = int(time.time() - START_TIME)
-    return jsonify({
+    return {
         "app_uptime": {
             "seconds": secs,
             "formatted": _format_duration(secs),
             "start_time": datetime.fromtimestamp(START_TIME).isoformat(),
         }
-    })
+    }
+
+def _performance_payload() -> dict:
+    sample = metrics.latest()
+    robot_health.start()
+    return {
+        "robot_connectivity": robot_health.snapshot(),
+        "robot_link": robot_link.stats(),
+        "camera": camera.stats(),
+        "context_cache": index_stats(),
+        "context_triggers": context_classifier.stats(),
+        "tts": tts.stats(),
+        "response_cache": response_cache.stats(),
+        "conversation": dict(conversation.stats(), token_budget=CONTEXT_TOKEN_BUDGET),
+        "llm": llm.stats(),
+        "ask": {mode: {k: v.summary() for k, v in parts.items()} for mode, parts in ask_latency.items()},
+        "system": {
+            "cpu": {"percent": sample.get("cpu")},
+            "disk": {"percent": sample.get("disk")},
+            "memory": {"percent": sample.get("memory")},
+        },
+    }
+
+@app.route("/temperature", methods=["GET"])
+def temperature():
+    return jsonify(_temperature_payload())
+
+@app.route("/uptime", methods=["GET"])
+def uptime():
+    return jsonify(_uptime_payload())
 
 @app.route("/performance", methods=["GET"])
 def performance():
-    robot = _check_robot_connectivity()
-    system = _get_system_metrics()
+    return jsonify(_performance_payload())
+
+@app.route("/metrics/history", methods=["GET"])
+def metrics_history():
+    """Sampled time series for charting; ?since=<unix seconds> returns only newer samples."""
+    since = request.args.get("since", 0.0, type=float)
+    samples = metrics.history(since)
     return jsonify({
-        "robot_connectivity": robot,
-        "system": system,
+        "interval": metrics.interval,
+        "count": len(samples),
+        "samples": samples,
     })
 
 # ---- LLM Answer + TTS ----
@@ -250,175 +372,104 @@ SYSTEM_PROMPT = """You are Mizuna, a friendly robot assistant. Your responses sh
 
 Always maintain a cheerful, helpful attitude. Only reference previous conversations when specifically relevant to the user's question."""
 
-def _generate_groq_response(prompt: str) -> str:
-    if Groq is None or not GROQ_API_KEY:
+# Repeated prompts are answered from memory; see response_cache.ResponseCache
+response_cache = ResponseCache(max_entries=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL,
+                               similarity=RESPONSE_CACHE_SIMILARITY)
+
+# Time to first token / first audio / full reply for each /ask mode
+ask_latency = {
+    mode: {"ttft": LatencyStats(), "first_audio": LatencyStats(), "total": LatencyStats()}
+    for mode in ("blocking", "streaming")
+}
+
+# Short-term history so follow-ups reach the model with the turns they refer to
+conversation = ConversationBuffer(max_turns=CONVERSATION_TURNS, idle_ttl=CONVERSATION_TTL)
+
+def _build_messages(prompt: str, session: str = "default") -> list:
+    if not llm.available:
         raise RuntimeError("Groq client not available or GROQ_API_KEY missing")
 
-    # Expanded keywords for context detection
-    memory_keywords = [
-        "remember", "previous", "before", "earlier", "past", "recall", 
-        "discussed", "talked about", "mentioned", "conversation", "history",
-        "last time", "you said", "we talked", "you told me", "back then",
-        "when we", "our chat", "our discussion", "what was", "what did"
-    ]
-    
-    personalized_keywords = [
-        "my", "i am", "i'm", "about me", "tell me about myself", 
-        "what do you know about", "who am i", "my project", "my work",
-        "my idea", "my plan", "my goal", "my robot", "my device",
-        "i mentioned", "i told you", "i said", "i was working",
-        "remind me", "help me with", "continue with", "follow up"
-    ]
-    
-    knowledge_seeking_keywords = [
-        "what is", "who is", "explain", "define", "how does", "why does",
-        "tell me about", "what are", "how to", "what's the difference",
-        "help me understand", "can you explain", "what was that about",
-        "details about", "more information", "elaborate on", "describe"
-    ]
-    
-    project_related_keywords = [
-        "project", "build", "building", "robot", "device", "machine",
-        "electronic", "funding", "development", "prototype", "design",
-        "technology", "engineering", "code", "programming", "software",
-        "hardware", "circuit", "component", "sensor", "motor", "battery"
-    ]
-    
-    task_continuation_keywords = [
-        "continue", "next step", "what's next", "proceed", "move forward",
-        "keep going", "carry on", "follow through", "complete", "finish",
-        "resume", "pick up where", "go back to", "return to", "status"
-    ]
-    
-    advice_seeking_keywords = [
-        "should i", "what would you", "recommend", "suggest", "advice",
-        "opinion", "think about", "feedback", "guidance", "help me decide",
-        "best approach", "how would you", "what's your take", "thoughts on"
-    ]
-    
-    problem_solving_keywords = [
-        "problem", "issue", "error", "trouble", "stuck", "difficult",
-        "challenge", "obstacle", "bug", "fix", "solve", "troubleshoot",
-        "not working", "failed", "broken", "wrong", "help"
-    ]
-    
-    comparison_keywords = [
-        "better", "worse", "compare", "comparison", "versus", "vs",
-        "difference between", "similar to", "like", "unlike", "instead",
-        "alternative", "option", "choice", "prefer", "recommend"
-    ]
-    
-    prompt_lower = prompt.lower()
-    
-    # Determine if context should be loaded - more comprehensive detection
-    should_use_context = (
-        # Direct memory/conversation references
-        any(keyword in prompt_lower for keyword in memory_keywords) or
-        
-        # Personal/user-specific questions
-        any(keyword in prompt_lower for keyword in personalized_keywords) or
-        
-        # Knowledge-seeking questions that might benefit from context
-        (any(keyword in prompt_lower for keyword in knowledge_seeking_keywords) and len(prompt.split()) > 2) or
-        
-        # Project or technical discussions
-        any(keyword in prompt_lower for keyword in project_related_keywords) or
-        
-        # Task continuation requests
-        any(keyword in prompt_lower for keyword in task_continuation_keywords) or
-        
-        # Advice seeking that might relate to past discussions
-        any(keyword in prompt_lower for keyword in advice_seeking_keywords) or
-        
-        # Problem-solving that might reference past issues
-        any(keyword in prompt_lower for keyword in problem_solving_keywords) or
-        
-        # Comparison questions that might relate to past topics
-        any(keyword in prompt_lower for keyword in comparison_keywords) or
-        
-        # Questions about specific topics that might have been discussed
-        (("about" in prompt_lower or "regarding" in prompt_lower) and len(prompt.split()) > 3) or
-        
-        # Follow-up questions (short questions that might need context)
-        (len(prompt.split()) <= 5 and any(word in prompt_lower for word in ["this", "that", "it", "they", "them"]))
-    )
-
-    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
-    
+    # Single-pass keyword matcher shared with app.py
+    context_triggers = context_classifier.classify(prompt)
+    should_use_context = bool(context_triggers)
+    if should_use_context:
+        logging.info(f"Memory context triggered by: {', '.join(context_triggers)}")
+
+    memories = []
     # Only add context from MongoDB if conditions are met
     if should_use_context:
         try:
-            from pymongo import MongoClient
-            import os
-
-            MONGODB_URI = os.getenv("MONGODB_URI")
-            DB_NAME = os.getenv("MONGODB_DB", "mizuna_companion")
-            COLLECTION_NAME = os.getenv("MONGODB_COLLECTION", "mizuna_ai")
-
-            client = MongoClient(MONGODB_URI, serverSelectionTimeoutMS=5000)
-            coll = client[DB_NAME][COLLECTION_NAME]
-            docs = list(coll.find({}, {"_id": 0, "title": 1, "overview": 1, "content": 1}).sort("local_time", 1).limit(5))
-            
-            if docs:
-                context_parts = []
-                for doc in docs:
-                    title = doc.get("title", "")
-                    overview = doc.get("overview", "")
-                    content = doc.get("content", "")
-                    
-                    if title and overview:
-                        memory_entry = f"Previously discussed: {title}. {overview}"
-                        if content and len(content) < 300:
-                            memory_entry += f" Additional context: {content}"
-                        context_parts.append(memory_entry)
-                
-                if context_parts:
-                    memory_context = "Your conversation memory (use only if relevant to the current question):\n" + "\n".join(context_parts)
-                    messages.append({"role": "system", "content": memory_context})
-                    
+            # Memories ranked by relevance to the prompt; the index syncs incrementally
+            memories = memory_entries(relevant_docs(prompt))
         except Exception as e:
             logging.warning(f"MongoDB context loading failed: {e}")
 
-    # Add the current user prompt
-    messages.append({"role": "user", "content": prompt})
-
-    client = Groq(api_key=GROQ_API_KEY)
-    chat_completion = client.chat.completions.create(
-        messages=messages,
-        model="openai/gpt-oss-20b",
-        temperature=0.3,
-        top_p=0.9,
-        max_tokens=200,
-    )
-    return chat_completion.choices[0].message.content
-
-def _speak_text_async(text: str) -> bool:
-    if speechsdk is None or not (AZURE_SPEECH_KEY and AZURE_SPEECH_REGION):
+    # Recent turns and memories, trimmed to the token budget
+    return pack_messages(SYSTEM_PROMPT, prompt, conversation.history(session), memories,
+                         budget=CONTEXT_TOKEN_BUDGET, memory_header=MEMORY_HEADER)
+
+def _memory_context(messages: list):
+    # The injected memories (the system message after the fixed prompt), if any.
+    # History is left out: it changes on every /ask and would make every key unique.
+    if len(messages) > 2 and messages[1]["role"] == "system":
+        return messages[1]["content"]
+    return None
+
+def _cacheable(prompt: str) -> bool:
+    # Follow-ups depend on the earlier turns, so their replies are neither served nor stored;
+    # everything else is keyed on prompt + memories even when history went along
+    return not context_classifier.refers_to_history(prompt)
+
+def _session_id(data: dict, headers) -> str:
+    """{"session": ...} or X-Session-Id; clients that send neither share one conversation."""
+    return str(data.get("session") or headers.get("X-Session-Id") or "default")
+
+def _prepare_ask(prompt: str, use_cache: bool = True, session: str = "default"):
+    """(messages, memory context, cache hit or None) for one /ask."""
+    messages = _build_messages(prompt, session)
+    context = _memory_context(messages)
+    if not use_cache or not _cacheable(prompt):
+        response_cache.note_bypass()
+        return messages, context, None
+    return messages, context, response_cache.get(prompt, context)
+
+def _generate_groq_response(prompt: str, use_cache: bool = True, session: str = "default"):
+    """Reply text, and "exact"/"similar" when it came from the response cache (else None)."""
+    messages, context, cached = _prepare_ask(prompt, use_cache, session)
+    if cached:
+        conversation.add_turn(session, prompt, cached[0])
+        return cached
+    t0 = time.perf_counter()
+    reply = llm.complete(messages).choices[0].message.content
+    if _cacheable(prompt):
+        response_cache.put(prompt, context, reply, (time.perf_counter() - t0) * 1000)
+    conversation.add_turn(session, prompt, reply)
+    return reply, None
+
+def _tts_available() -> bool:
+    if TTS_BACKEND == "azure":
+        return bool(AZURE_SPEECH_KEY and AZURE_SPEECH_REGION) and bool(speechsdk)
+    return True
+
+# One warm synthesizer and playback queue for every reply
+tts = worker_from_env(TTS_BACKEND, TTS_PLAYER, AZURE_SPEECH_KEY, AZURE_SPEECH_REGION, AZURE_SPEECH_VOICE,
+                      cache_mb=TTS_CACHE_MB)
+
+def _first_audio_recorder(mode: str, t0: float):
+    return lambda t: ask_latency[mode]["first_audio"].record((t - t0) * 1000)
+
+def _speak_text_async(text: str, t0: float) -> bool:
+    if not _tts_available():
         return False
     try:
-        import threading
-
-        def _runner():
-            try:
-                speech_config = speechsdk.SpeechConfig(
-                    subscription=AZURE_SPEECH_KEY, region=AZURE_SPEECH_REGION
-                )
-                speech_config.speech_synthesis_voice_name = AZURE_SPEECH_VOICE
-                synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config)
-                res = synthesizer.speak_text_async(text).get()
-                if res.reason == speechsdk.ResultReason.Canceled:
-                    logging.warning("TTS canceled: %s", getattr(res, "cancellation_details", None))
-            except Exception as e:
-                logging.exception("TTS error: %s", e)
-
-        threading.Thread(target=_runner, daemon=True).start()
+        # A new reply replaces whatever is still being spoken
+        tts.say(text, interrupt=True, on_first_audio=_first_audio_recorder("blocking", t0))
         return True
     except Exception as e:
-        logging.exception("Failed starting TTS thread: %s", e)
+        logging.exception("Failed queueing TTS: %s", e)
         return False
 
-@app.route("/ask", methods=["POST"])
-def ask():
+def _read_prompt():
     # Accept JSON, form, query, or raw body for robustness
     prompt = ""
     data = None
@@ -438,48 +489,191 @@ def ask():
             if raw:
                 obj = json.loads(raw)
                 if isinstance(obj, dict):
+                    data = obj
                     prompt = (obj.get("text") or obj.get("question") or "").strip()
         except Exception:
             pass
+    return prompt, data if isinstance(data, dict) else {}
+
+def _cache_allowed(data: dict, args, headers) -> bool:
+    """{"cache": false}, ?cache=0 or Cache-Control: no-cache skip the response cache."""
+    flag = data.get("cache", args.get("cache", True))
+    if isinstance(flag, str):
+        flag = flag.lower() not in ("0", "false", "no")
+    return bool(flag) and "no-cache" not in headers.get("Cache-Control", "")
+
+def _wants_stream(data: dict, args, headers) -> bool:
+    flag = data.get("stream", args.get("stream"))
+    if isinstance(flag, str):
+        flag = flag.lower() in ("1", "true", "yes")
+    return bool(flag) or "text/event-stream" in headers.get("Accept", "")
+
+def _sse(event: str, payload: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+class _AskStream:
+    """
+    One streamed /ask, shared by the Flask and ASGI servers: turns reply
+    deltas into SSE events, feeds speech and records the timings.
+    """
+
+    def __init__(self, prompt: str, context, cached, t0: float, session: str = "default",
+                 cacheable: bool = True):
+        self.prompt = prompt
+        self.session = session
+        self.context = context
+        self.cached = cached
+        self.cacheable = cacheable
+        self.t0 = t0
+        self.stats = ask_latency["streaming"]
+        self.parts = []
+        self.ttft_ms = None
+        self.speech = None
+        if _tts_available():
+            self.speech = tts.stream(interrupt=True, on_first_audio=_first_audio_recorder("streaming", t0))
+
+    def delta(self, text: str) -> str:
+        if self.ttft_ms is None:
+            self.ttft_ms = (time.perf_counter() - self.t0) * 1000
+            self.stats["ttft"].record(self.ttft_ms)
+        self.parts.append(text)
+        if self.speech:
+            self.speech.feed(text)
+        return _sse("delta", {"text": text})
+
+    def error(self, exc: Exception) -> str:
+        if isinstance(exc, GatewayBusy):
+            logging.warning(f"LLM busy: {exc}")
+            return _sse("error", {"error": "LLM_busy", "detail": str(exc)})
+        logging.exception("LLM stream error: %s", exc)
+        return _sse("error", {"error": "LLM_unavailable", "detail": str(exc)})
+
+    def finish_speech(self):
+        if self.speech:
+            self.speech.finish()
+
+    def done(self) -> str:
+        total_ms = (time.perf_counter() - self.t0) * 1000
+        self.stats["total"].record(total_ms)
+        reply = "".join(self.parts)
+        if not self.cached and self.cacheable:
+            response_cache.put(self.prompt, self.context, reply, total_ms)
+        conversation.add_turn(self.session, self.prompt, reply)
+        return _sse("done", {
+            "status": "ok",
+            "reply": reply,
+            "cached": self.cached[1] if self.cached else None,
+            "voice": {"spoken": self.speech is not None},
+            "timing": {"ttft_ms": None if self.ttft_ms is None else round(self.ttft_ms, 1),
+                       "total_ms": round(total_ms, 1)},
+        })
+
+def _ask_stream(prompt: str, use_cache: bool = True, session: str = "default") -> Response:
+    """
+    Server-sent events: one `delta` event per text chunk, then `done` with the
+    full reply and timings (or `error`). Speech starts at the first sentence.
+    """
+    t0 = time.perf_counter()
+    messages, context, cached = _prepare_ask(prompt, use_cache, session)
+
+    def generate():
+        turn = _AskStream(prompt, context, cached, t0, session, _cacheable(prompt))
+        # A cached reply goes out as a single chunk
+        deltas = [cached[0]] if cached else llm.stream(messages)
+        try:
+            for delta in deltas:
+                yield turn.delta(delta)
+        except Exception as e:
+            yield turn.error(e)
+            return
+        finally:
+            turn.finish_speech()
+        yield turn.done()
+
+    return Response(generate(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/ask", methods=["POST"])
+def ask():
+    """
+    Answers a prompt with Groq and speaks the reply. Blocking JSON by default;
+    send {"stream": true}, ?stream=1 or Accept: text/event-stream for SSE.
+    {"session": id} (or X-Session-Id) keeps separate conversation histories.
+    """
+    prompt, data = _read_prompt()
     if not prompt:
         logging.info("/ask received empty prompt. Headers=%s", dict(request.headers))
         return jsonify(error="Missing 'text' or 'question' in request"), 400
+
+    use_cache = _cache_allowed(data, request.args, request.headers)
+    session = _session_id(data, request.headers)
+    if _wants_stream(data, request.args, request.headers):
+        try:
+            return _ask_stream(prompt, use_cache, session)
+        except Exception as e:
+            logging.exception("LLM error: %s", e)
+            return jsonify(error="LLM_unavailable", detail=str(e)), 500
+
+    t0 = time.perf_counter()
     try:
-        reply = _generate_groq_response(prompt)
+        reply, cached = _generate_groq_response(prompt, use_cache, session)
+    except GatewayBusy as e:
+        logging.warning(f"LLM busy: {e}")
+        return jsonify(error="LLM_busy", detail=str(e)), 503
     except Exception as e:
         logging.exception("LLM error: %s", e)
         return jsonify(error="LLM_unavailable", detail=str(e)), 500
+    # The blocking path has no tokens before the whole reply
+    llm_ms = (time.perf_counter() - t0) * 1000
+    ask_latency["blocking"]["ttft"].record(llm_ms)
+    ask_latency["blocking"]["total"].record(llm_ms)
+
+    spoken = _speak_text_async(reply, t0)
+    return jsonify(status="ok", reply=reply, cached=cached, voice={"spoken": bool(spoken)})
 
-    spoken = _speak_text_async(reply)
-    return jsonify(status="ok", reply=reply, voice={"spoken": bool(spoken)})
+@app.route("/speech/stop", methods=["POST"])
+def speech_stop():
+    """Stops the reply being spoken and drops any queued ones."""
+    tts.interrupt()
+    return jsonify(status="ok", tts=tts.stats())
 
 @app.route("/clear_context", methods=["POST"])
 def clear_context():
     """
-    Deletes all documents from the MongoDB context collection.
+    Deletes all documents from the MongoDB context collection and forgets
+    the recent conversation turns.
     """
+    turns = conversation.clear()
     try:
-        from pymongo import MongoClient
-        MONGODB_URI = os.getenv("MONGODB_URI")
-        DB_NAME = os.getenv("MONGODB_DB", "mizuna_companion")
-        COLLECTION_NAME = os.getenv("MONGODB_COLLECTION", "mizuna_ai")
-
-        client = MongoClient(MONGODB_URI, serverSelectionTimeoutMS=5000)
-        coll = client[DB_NAME][COLLECTION_NAME]
-        result = coll.delete_many({})
-        return jsonify(status="ok", deleted_count=result.deleted_count)
+        deleted = clear_memories()
+        return jsonify(status="ok", deleted_count=deleted, cleared_turns=turns)
     except Exception as e:
         logging.exception("Failed to clear context: %s", e)
         return jsonify(status="error", detail=str(e)), 500
 
 # ---- Start ----
+def _run_asgi() -> bool:
+    """Serve from asgi_server.py; False (Flask fallback) when starlette/uvicorn are missing."""
+    try:
+        import asgi_server
+    except ImportError as e:
+        logging.warning(f"ASGI server unavailable ({e}); falling back to Flask")
+        return False
+    # Hand over this module so both servers share one camera, robot link, LLM client...
+    asgi_server.run(sys.modules[__name__], host="0.0.0.0", port=PORT)
+    return True
+
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
+    metrics.start()
+    robot_health.start()
+    if TTS_PREWARM and _tts_available():
+        tts.prewarm(TTS_PREWARM)
     try:
-        app.run(host="0.0.0.0", port=PORT, threaded=True)
+        if SERVER_MODE != "asgi" or not _run_asgi():
+            app.run(host="0.0.0.0", port=PORT, threaded=True)
     finally:
         try:
-            picam2.stop_recording()
-            picam2.close()
+            camera.close()
         except:
             pass
@@ -0,0 +1,135 @@
+import re, time, hashlib, threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+_PUNCT_RE = re.compile(r"[^\w\s']+")
+
+
+def normalize_prompt(text: str) -> str:
+    """Case, punctuation and spacing do not change the answer: "How are you?!" == "how are you"."""
+    return " ".join(_PUNCT_RE.sub(" ", (text or "").lower()).split())
+
+
+def context_hash(context: Optional[str]) -> str:
+    # Empty string when no memory was injected, so both cases never collide
+    return hashlib.sha1(context.encode("utf-8")).hexdigest() if context else ""
+
+
+def _trigrams(text: str) -> frozenset:
+    padded = f"  {text} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class _Entry:
+    __slots__ = ("reply", "created", "cost_ms", "grams", "ctx")
+
+    def __init__(self, reply, created, cost_ms, grams, ctx):
+        self.reply = reply
+        self.created = created
+        self.cost_ms = cost_ms
+        self.grams = grams
+        self.ctx = ctx
+
+
+class ResponseCache:
+    """
+    LLM replies keyed by normalised prompt plus a hash of the memory context
+    that was injected, so a reply is only reused when the model saw the same
+    inputs. Entries expire after `ttl` seconds and the least recently used
+    are evicted beyond `max_entries`.
+
+    With `similarity` > 0, a miss also tries near-duplicates: the closest
+    cached prompt with the same context whose character-trigram Jaccard
+    similarity reaches the threshold ("how are you doing" ~ "how are you doing today").
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 600.0, similarity: float = 0.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+        self._entries = OrderedDict()   # (prompt, ctx) -> _Entry
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.expired = 0
+        self.evictions = 0
+        self.saved_ms = 0.0
+
+    def get(self, prompt: str, context: Optional[str] = None) -> Optional[Tuple[str, str]]:
+        """(reply, "exact" | "similar") for a usable cached reply, else None."""
+        norm = normalize_prompt(prompt)
+        ctx = context_hash(context)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get((norm, ctx))
+            if entry is not None and now - entry.created > self.ttl:
+                del self._entries[(norm, ctx)]
+                self.expired += 1
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end((norm, ctx))
+                self.exact_hits += 1
+                self.saved_ms += entry.cost_ms
+                return entry.reply, "exact"
+            if self.similarity > 0 and norm:
+                key = self._closest(norm, ctx, now)
+                if key is not None:
+                    entry = self._entries[key]
+                    self._entries.move_to_end(key)
+                    self.similar_hits += 1
+                    self.saved_ms += entry.cost_ms
+                    return entry.reply, "similar"
+            self.misses += 1
+            return None
+
+    def _closest(self, norm: str, ctx: str, now: float):
+        # A linear scan is fine at a few hundred entries and keeps no extra index
+        grams = _trigrams(norm)
+        best, best_score = None, self.similarity
+        for key, entry in self._entries.items():
+            if entry.ctx != ctx or now - entry.created > self.ttl:
+                continue
+            union = len(grams | entry.grams)
+            score = len(grams & entry.grams) / union if union else 0.0
+            if score >= best_score:
+                best, best_score = key, score
+        return best
+
+    def put(self, prompt: str, context: Optional[str], reply: str, cost_ms: float = 0.0):
+        if not reply:
+            return
+        norm = normalize_prompt(prompt)
+        ctx = context_hash(context)
+        with self._lock:
+            self._entries[(norm, ctx)] = _Entry(reply, time.monotonic(), cost_ms, _trigrams(norm), ctx)
+            self._entries.move_to_end((norm, ctx))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def note_bypass(self):
+        with self._lock:
+            self.bypassed += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.exact_hits + self.similar_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "exact_hits": self.exact_hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "hit_ratio": round(hits / lookups, 3) if lookups else None,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                # Sum of the LLM time the hits would otherwise have cost
+                "saved_ms_total": round(self.saved_ms, 1),
+            }
@@ -0,0 +1,343 @@
+import socket, time, logging, threading
+from collections import deque
+from typing import Optional, Union
+from urllib.parse import urlsplit
+from metrics import LatencyStats
+
+
+class _AddressCache:
+    """Caches the resolved address of the robot host so mDNS runs once per TTL."""
+
+    def __init__(self, host: str, port: int, ttl: float = 60.0):
+        self.host = host
+        self.port = port
+        self.ttl = ttl
+        self._addr = None
+        self._expires = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> str:
+        with self._lock:
+            now = time.monotonic()
+            if self._addr is None or now >= self._expires:
+                try:
+                    info = socket.getaddrinfo(self.host, self.port, socket.AF_INET, socket.SOCK_STREAM)
+                    self._addr = info[0][4][0]
+                except Exception as e:
+                    # Fall back to the hostname and let the HTTP stack resolve it
+                    logging.warning(f"Robot address lookup failed: {e}")
+                    self._addr = self.host
+                self._expires = now + self.ttl
+            return self._addr
+
+    def invalidate(self):
+        with self._lock:
+            self._expires = 0.0
+
+
+class RobotLink:
+    """
+    Keep-alive HTTP link to the ESP8266 motor controller.
+
+    Commands are put on a bounded queue and sent by a single worker thread
+    over a pooled session, so callers never block on the robot.
+
+    With coalesce=True only the newest pending motion and speed are kept,
+    and a stop jumps ahead of everything else. If deadman is set (seconds),
+    the worker sends a stop on its own when no command arrived for that long
+    while the robot is moving.
+    """
+
+    def __init__(self, base_url: str, timeout: float = 2.0, queue_size: int = 32, dns_ttl: float = 60.0,
+                 coalesce: bool = False, deadman: float = 0.0):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme or "http"
+        self.host = parts.hostname or "mizuna.local"
+        self.port = parts.port or (443 if self.scheme == "https" else 80)
+        self.timeout = timeout
+        self.addresses = _AddressCache(self.host, self.port, ttl=dns_ttl)
+
+        self._session = None
+        self.observer = None  # optional callable(latency_s or None) fed by every send
+
+        self.queue_size = queue_size
+        self.coalesce = coalesce
+        self.deadman = deadman
+        self._pending = deque()  # [kind, path, params]
+        self._cond = threading.Condition()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._last_submit = time.monotonic()
+        self._moving = None  # last motion the robot acknowledged, None when stopped or stopping
+        self._stopping = None  # motion an in-flight stop is ending, restored if the stop fails
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.deadman_stops = 0
+
+    @property
+    def session(self):
+        # Built on first use so importing the server doesn't pay for requests
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=0)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            # Requests go to the cached IP, so keep the original Host header
+            default_port = self.port == (443 if self.scheme == "https" else 80)
+            session.headers.update({
+                "Host": self.host if default_port else f"{self.host}:{self.port}",
+                "Connection": "keep-alive",
+            })
+            self._session = session
+        return self._session
+
+    def _url(self, path: str) -> str:
+        # TLS needs the real hostname for certificate checks, so only plain HTTP uses the cache
+        host = self.addresses.get() if self.scheme == "http" else self.host
+        return f"{self.scheme}://{host}:{self.port}{path}"
+
+    def request(self, path: str, params: Optional[dict] = None, timeout: Optional[float] = None):
+        """Synchronous GET against the robot, reusing the pooled connection."""
+        import requests
+        try:
+            return self.session.get(self._url(path), params=params, timeout=timeout or self.timeout)
+        except requests.ConnectionError:
+            # Robot may have a new address (DHCP renew, reboot); resolve again next time
+            self.addresses.invalidate()
+            raise
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="robot-link", daemon=True)
+                self._thread.start()
+
+    @classmethod
+    def _kind(cls, path: str, params: dict) -> str:
+        if path == "/speed":
+            return "speed"
+        if path == "/cmd":
+            return "stop" if params.get("c") == "S" else "motion"
+        return "other"
+
+    def submit(self, path: str, params: dict) -> bool:
+        """Queue a request for the sender thread. Returns False if it was dropped."""
+        self._ensure_worker()
+        kind = self._kind(path, params)
+        with self._cond:
+            self._last_submit = time.monotonic()
+            if self.coalesce and kind != "other":
+                if kind == "stop":
+                    # Stop supersedes every pending motion and goes to the front
+                    stale = [item for item in self._pending if item[0] in ("motion", "stop")]
+                    for item in stale:
+                        self._pending.remove(item)
+                    self.coalesced += len(stale)
+                    self._pending.appendleft(["stop", path, params])
+                    self._cond.notify()
+                    return True
+                for item in self._pending:
+                    if item[0] == kind:
+                        # Latest wins: overwrite the pending entry in place
+                        item[1], item[2] = path, params
+                        self.coalesced += 1
+                        return True
+                if (kind == "motion" and params.get("c") == self._moving
+                        and not any(item[0] == "stop" for item in self._pending)):
+                    # Same motion the robot is already doing and no stop queued or in flight;
+                    # only the deadman timer needed a refresh
+                    self.coalesced += 1
+                    return True
+            if len(self._pending) >= self.queue_size:
+                self.dropped += 1
+                logging.warning(f"Robot link queue full, dropping {path} {params}")
+                return False
+            self._pending.append([kind, path, params])
+            self._cond.notify()
+            return True
+
+    def _next(self):
+        """Block until there is something to send; injects a stop when the deadman expires."""
+        with self._cond:
+            while not self._pending:
+                if self.deadman > 0 and self._moving is not None:
+                    remaining = self._last_submit + self.deadman - time.monotonic()
+                    if remaining <= 0:
+                        self.deadman_stops += 1
+                        logging.warning(f"Robot deadman expired, stopping (was {self._moving})")
+                        # Re-arm so an unreachable robot is retried once per period, not in a tight loop
+                        self._last_submit = time.monotonic()
+                        return self._begin_stop(["stop", "/cmd", {"c": "S"}])
+                    self._cond.wait(remaining)
+                else:
+                    self._cond.wait()
+            item = self._pending.popleft()
+            return self._begin_stop(item) if item[0] == "stop" else item
+
+    def _begin_stop(self, item):
+        # From here on the robot counts as stopping, so a repeat of the old motion is sent again
+        self._stopping = self._moving
+        self._moving = None
+        return item
+
+    def _stop_failed(self):
+        with self._cond:
+            # The robot may still be doing the old motion; keep the deadman armed for it
+            if self._moving is None:
+                self._moving = self._stopping
+
+    def _run(self):
+        while True:
+            kind, path, params = self._next()
+            t0 = time.monotonic()
+            try:
+                r = self.request(path, params)
+                if self.observer:
+                    self.observer(time.monotonic() - t0 if r.ok else None)
+                if r.ok:
+                    self.sent += 1
+                    if kind == "motion":
+                        with self._cond:
+                            self._moving = params.get("c")
+                else:
+                    self.failed += 1
+                    if kind == "stop":
+                        self._stop_failed()
+                    logging.warning(f"Robot {path} returned {r.status_code}")
+            except Exception as e:
+                self.failed += 1
+                if kind == "stop":
+                    self._stop_failed()
+                if self.observer:
+                    self.observer(None)
+                logging.warning(f"Robot {path} failed: {e}")
+
+    def send_cmd(self, c: str) -> bool:
+        return self.submit("/cmd", {"c": c.strip().upper()})
+
+    def send_speed(self, v: Union[int, str]) -> bool:
+        return self.submit("/speed", {"v": str(v)})
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._pending),
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "deadman_stops": self.deadman_stops,
+            "coalesce": self.coalesce,
+            "deadman_ms": int(self.deadman * 1000),
+        }
+
+
+class RobotHealthMonitor:
+    """
+    Continuous robot health check with rolling latency statistics.
+
+    Probes the ESP8266's small /status endpoint every `interval` seconds
+    while online and backs off exponentially up to `max_interval` while
+    offline, to spare Wi-Fi airtime. Command round trips reported by the
+    link count as samples too, and a probe is skipped when one is recent.
+    """
+
+    # Histogram bucket upper bounds in ms; the last bucket is open-ended
+    BUCKETS_MS = (2, 5, 10, 20, 35, 50, 75, 100, 150, 250, 400, 700, 1000, 2000)
+
+    def __init__(self, link: RobotLink, path: str = "/status", interval: float = 2.0,
+                 max_interval: float = 30.0, timeout: float = 0.7, window: int = 200,
+                 alpha: float = 0.2, offline_after: int = 2):
+        self.link = link
+        self.path = path
+        self.interval = interval
+        self.max_interval = max_interval
+        self.timeout = timeout
+        self.alpha = alpha
+        self.offline_after = offline_after
+        self.state = "unknown"
+        self.ewma_ms = None
+        self.last_checked = None
+        self.probes = 0
+        # ms of successful samples; histogram over the same window as loss_rate
+        self.latency = LatencyStats(window, self.BUCKETS_MS, cumulative=False)
+        self._outcomes = deque(maxlen=window)    # True/False per attempt
+        self._fail_streak = 0
+        self.transitions = deque(maxlen=20)
+        self._last_sample = 0.0
+        self._lock = threading.Lock()
+        self._thread = None
+        link.observer = self.record
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="robot-health", daemon=True)
+                self._thread.start()
+
+    def record(self, latency: Optional[float]):
+        """Feed one attempt: latency in seconds, or None when it failed."""
+        with self._lock:
+            self._last_sample = time.monotonic()
+            self.last_checked = int(time.time())
+            self._outcomes.append(latency is not None)
+            if latency is not None:
+                ms = latency * 1000.0
+                self.latency.record(ms)
+                self.ewma_ms = ms if self.ewma_ms is None else self.alpha * ms + (1 - self.alpha) * self.ewma_ms
+                self._fail_streak = 0
+                new_state = "online"
+            else:
+                self._fail_streak += 1
+                new_state = "offline" if self._fail_streak >= self.offline_after or self.state != "online" else self.state
+            if new_state != self.state:
+                self.transitions.append({"ts": int(time.time()), "state": new_state})
+                logging.info(f"Robot is now {new_state}")
+                self.state = new_state
+
+    def probe(self):
+        t0 = time.monotonic()
+        try:
+            r = self.link.request(self.path, timeout=self.timeout)
+            self.record(time.monotonic() - t0 if r.ok else None)
+        except Exception:
+            self.record(None)
+        self.probes += 1
+
+    def next_delay(self) -> float:
+        if self.state == "online":
+            return self.interval
+        # 2, 4, 8 ... seconds up to max_interval while the robot is away
+        return min(self.max_interval, self.interval * (2 ** min(self._fail_streak, 10)))
+
+    def _run(self):
+        while True:
+            if time.monotonic() - self._last_sample >= self.interval:
+                self.probe()
+            time.sleep(self.next_delay())
+
+    def stats(self) -> dict:
+        with self._lock:
+            outcomes = list(self._outcomes)
+            ewma = self.ewma_ms
+        return {
+            "avg_response_time": None if ewma is None else int(round(ewma)),
+            "ewma_ms": None if ewma is None else round(ewma, 1),
+            **self.latency.summary(),
+            "loss_rate": round(outcomes.count(False) / len(outcomes), 3) if outcomes else None,
+            "samples": len(outcomes),
+        }
+
+    def snapshot(self) -> dict:
+        return {
+            "robot_status": "online" if self.state == "online" else "offline",
+            "stats": self.stats(),
+            "last_checked": self.last_checked,
+            "next_probe_s": round(self.next_delay(), 1),
+            "transitions": list(self.transitions),
+        }
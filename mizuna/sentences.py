@@ -0,0 +1,54 @@
+import re
+from typing import List
+
+# Sentence end: terminal punctuation (optionally closed by a quote or bracket)
+# followed by whitespace, or a line break
+_BOUNDARY_RE = re.compile(r"""[.!?…]+["')\]]*\s+|\n+""")
+_ABBREVIATIONS = frozenset("mr mrs ms dr prof st vs etc e.g i.e approx no".split())
+
+
+class SentenceSplitter:
+    """
+    Turns a stream of text deltas into whole sentences as soon as each one
+    ends, so speech can start before the full reply has arrived.
+
+    A long run without punctuation is cut at the last comma or space after
+    `max_chars`, which keeps the first audio from waiting on run-on text.
+    """
+
+    def __init__(self, min_chars: int = 6, max_chars: int = 160):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self._buf = ""
+
+    def feed(self, delta: str) -> List[str]:
+        self._buf += delta or ""
+        out = []
+        start = 0
+        for m in _BOUNDARY_RE.finditer(self._buf):
+            candidate = self._buf[start:m.end()].strip()
+            if len(candidate) < self.min_chars or self._ends_with_abbreviation(candidate):
+                continue
+            out.append(candidate)
+            start = m.end()
+        self._buf = self._buf[start:]
+        if len(self._buf) > self.max_chars:
+            cut = max(self._buf.rfind(", ", 0, self.max_chars), self._buf.rfind(" ", 0, self.max_chars))
+            if cut > 0:
+                out.append(self._buf[:cut + 1].strip())
+                self._buf = self._buf[cut + 1:]
+        return out
+
+    def flush(self) -> List[str]:
+        rest, self._buf = self._buf.strip(), ""
+        return [rest] if rest else []
+
+    @staticmethod
+    def _ends_with_abbreviation(text: str) -> bool:
+        words = text.rstrip(".!?…\"')] ").rsplit(None, 1)
+        return bool(words) and text.rstrip().endswith(".") and words[-1].lower() in _ABBREVIATIONS
+
+
+def split_sentences(text: str) -> List[str]:
+    splitter = SentenceSplitter()
+    return splitter.feed(text) + splitter.flush()
@@ -0,0 +1,213 @@
+import io, time, asyncio, itertools, threading
+from typing import Optional, Tuple
+
+
+def build_chunk(frame: bytes) -> bytes:
+    """multipart/x-mixed-replace part for one JPEG, built once per frame."""
+    return b"".join((
+        b"--frame\r\nContent-Type: image/jpeg\r\nContent-Length: ",
+        str(len(frame)).encode(),
+        b"\r\n\r\n",
+        frame,
+        b"\r\n",
+    ))
+
+
+class Subscriber:
+    """
+    One viewer's mailbox. It only ever holds the newest chunk, so a slow
+    client skips straight to the latest frame instead of building a backlog.
+
+    Given an event loop, the encoder thread wakes that loop directly and the
+    viewer reads with `aget()` / `async for`, so no thread waits per viewer.
+    """
+
+    def __init__(self, broadcaster: "FrameBroadcaster", sub_id: int,
+                 loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.broadcaster = broadcaster
+        self.id = sub_id
+        self.created = time.monotonic()
+        self.delivered = 0
+        self.skipped = 0
+        self._chunk = None
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._loop = loop
+        self._async_ready = asyncio.Event() if loop is not None else None
+        self._closed = False
+
+    def _wake_loop(self):
+        try:
+            self._loop.call_soon_threadsafe(self._async_ready.set)
+        except RuntimeError:
+            # Loop already closed; the viewer is gone
+            pass
+
+    def offer(self, chunk: bytes):
+        with self._lock:
+            pending = self._chunk is not None
+            if pending:
+                self.skipped += 1
+            self._chunk = chunk
+        if self._loop is None:
+            self._ready.set()
+        elif not pending:
+            # A pending chunk means a wake-up is already on its way
+            self._wake_loop()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[bytes]:
+        """Wait for the next chunk; None on timeout or once closed."""
+        if not self._ready.wait(timeout):
+            return None
+        with self._lock:
+            self._ready.clear()
+            chunk, self._chunk = self._chunk, None
+        if chunk is not None:
+            self.delivered += 1
+        return chunk
+
+    async def aget(self, timeout: Optional[float] = None) -> Optional[bytes]:
+        """get() for a subscriber created with an event loop."""
+        try:
+            await asyncio.wait_for(self._async_ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self._async_ready.clear()
+        with self._lock:
+            chunk, self._chunk = self._chunk, None
+        if chunk is not None:
+            self.delivered += 1
+        return chunk
+
+    def close(self):
+        self._closed = True
+        if self._loop is None:
+            self._ready.set()
+        else:
+            self._wake_loop()
+        self.broadcaster.unsubscribe(self)
+
+    def __iter__(self):
+        while not self._closed:
+            chunk = self.get(timeout=5.0)
+            if chunk is not None:
+                yield chunk
+
+    async def __aiter__(self):
+        while not self._closed:
+            chunk = await self.aget(timeout=5.0)
+            if chunk is not None:
+                yield chunk
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def stats(self) -> dict:
+        age = max(1e-6, time.monotonic() - self.created)
+        return {
+            "delivered": self.delivered,
+            "skipped": self.skipped,
+            "fps": round(self.delivered / age, 1),
+        }
+
+
+class FrameBroadcaster(io.BufferedIOBase):
+    """
+    Encoder output that fans each JPEG out to every subscriber.
+
+    The multipart chunk is built once in write() and the same immutable
+    bytes object is handed to every subscriber in the registry. With
+    max_fps set, frames arriving faster than that are dropped unseen.
+    """
+
+    def __init__(self, max_fps: Optional[float] = None):
+        super().__init__()
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.rate_dropped = 0
+        self._last_accept = 0.0
+        self.frame = None
+        self.chunk = None
+        self.seq = 0
+        self.timestamp = 0.0
+        self._subscribers = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        # Only snapshot long-polls wait here; stream viewers use their own mailboxes
+        self._new_frame = threading.Condition(self._lock)
+
+    def writable(self):
+        return True
+
+    def close(self):
+        # picamera2's FileOutput closes its file when recording stops; the
+        # broadcaster outlives encoder restarts, so stay open.
+        pass
+
+    def write(self, buf) -> int:
+        if self.min_interval:
+            now = time.monotonic()
+            # 10% slack so a camera running at exactly the cap isn't halved by jitter
+            if now - self._last_accept < self.min_interval * 0.9:
+                self.rate_dropped += 1
+                return len(buf)
+            self._last_accept = now
+        frame = bytes(buf)
+        chunk = build_chunk(frame)
+        with self._lock:
+            self.frame = frame
+            self.chunk = chunk
+            self.seq += 1
+            self.timestamp = time.time()
+            subscribers = tuple(self._subscribers.values())
+            self._new_frame.notify_all()
+        for sub in subscribers:
+            sub.offer(chunk)
+        return len(frame)
+
+    def latest(self) -> Tuple[int, Optional[bytes], float]:
+        """(seq, jpeg, timestamp) of the most recent frame."""
+        with self._lock:
+            return self.seq, self.frame, self.timestamp
+
+    def wait_newer(self, seq: int, timeout: float) -> bool:
+        """Block until a frame newer than `seq` arrives; False on timeout."""
+        with self._new_frame:
+            return self._new_frame.wait_for(lambda: self.seq > seq, timeout)
+
+    async def await_newer(self, seq: int, timeout: float) -> bool:
+        """wait_newer() for asyncio callers, without parking a thread."""
+        deadline = time.monotonic() + timeout
+        with self.subscribe(asyncio.get_running_loop()) as sub:
+            while self.seq <= seq:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                await sub.aget(remaining)
+        return True
+
+    def subscribe(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> Subscriber:
+        with self._lock:
+            sub = Subscriber(self, next(self._ids), loop)
+            self._subscribers[sub.id] = sub
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        with self._lock:
+            self._subscribers.pop(sub.id, None)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def stats(self) -> dict:
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+        return {
+            "frames": self.seq,
+            "rate_dropped": self.rate_dropped,
+            "subscribers": len(subscribers),
+            "clients": {str(s.id): s.stats() for s in subscribers},
+        }
@@ -0,0 +1,454 @@
+import io, os, time, wave, heapq, logging, threading, subprocess
+from typing import Callable, List, Optional
+
+from audio_cache import AudioCache
+from metrics import LatencyStats
+from sentences import SentenceSplitter, split_sentences
+
+HIGH, NORMAL, LOW = 0, 1, 2
+
+
+def prewarm_phrases(spec: Optional[str] = None) -> List[str]:
+    """
+    Fixed phrases worth having in the audio cache from boot, from `spec` or
+    TTS_PREWARM_PHRASES ("|"-separated). Empty unless configured, since the
+    apps only speak generated replies.
+    """
+    if spec is None:
+        spec = os.getenv("TTS_PREWARM_PHRASES", "")
+    return [p.strip() for p in spec.split("|") if p.strip()]
+
+
+# ---- Backends ----
+# A backend turns one sentence into a WAV clip; a player plays clips and can
+# be stopped midway. Both are swappable so tests run without Azure or audio.
+
+class AzureBackend:
+    """Keeps one warm Azure synthesizer and renders sentences to WAV in memory."""
+
+    FORMAT = "riff-24khz-16bit-mono-pcm"
+
+    def __init__(self, key: str, region: str, voice: str):
+        import azure.cognitiveservices.speech as speechsdk
+        self._sdk = speechsdk
+        config = speechsdk.SpeechConfig(subscription=key, region=region)
+        config.speech_synthesis_voice_name = voice
+        config.set_speech_synthesis_output_format(speechsdk.SpeechSynthesisOutputFormat.Riff24Khz16BitMonoPcm)
+        # audio_config=None keeps the audio in the result instead of playing it
+        self._synthesizer = speechsdk.SpeechSynthesizer(speech_config=config, audio_config=None)
+        # Opening the connection up front saves the TLS handshake on the first reply
+        try:
+            speechsdk.Connection.from_speech_synthesizer(self._synthesizer).open(True)
+        except Exception as e:
+            logging.info(f"TTS pre-connect skipped: {e}")
+
+    def synthesize(self, text: str) -> bytes:
+        result = self._synthesizer.speak_text_async(text).get()
+        if result.reason == self._sdk.ResultReason.Canceled:
+            raise RuntimeError(f"TTS canceled: {getattr(result, 'cancellation_details', None)}")
+        return result.audio_data
+
+
+class FakeBackend:
+    """Silent WAV clips whose length follows the text, after a simulated delay."""
+
+    FORMAT = "fake-8khz-16bit-mono-pcm"
+
+    def __init__(self, latency: float = 0.05, chars_per_second: float = 15.0, rate: int = 8000):
+        self.latency = latency
+        self.chars_per_second = chars_per_second
+        self.rate = rate
+        self.calls = []
+
+    def synthesize(self, text: str) -> bytes:
+        self.calls.append(text)
+        time.sleep(self.latency)
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(self.rate)
+            w.writeframes(b"\0\0" * int(self.rate * len(text) / self.chars_per_second))
+        return buf.getvalue()
+
+
+def wav_duration(audio: bytes) -> float:
+    try:
+        with wave.open(io.BytesIO(audio)) as w:
+            return w.getnframes() / float(w.getframerate())
+    except Exception:
+        return 0.0
+
+
+class AplayPlayer:
+    """Plays WAV clips through ALSA `aplay`; stop() kills the current clip."""
+
+    def __init__(self, command=("aplay", "-q", "-")):
+        self.command = list(command)
+        self._proc = None
+        self._lock = threading.Lock()
+
+    def play(self, audio: bytes):
+        with self._lock:
+            self._proc = subprocess.Popen(self.command, stdin=subprocess.PIPE,
+                                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            proc = self._proc
+        try:
+            proc.communicate(audio)
+        except (BrokenPipeError, OSError):
+            pass
+        finally:
+            with self._lock:
+                self._proc = None
+
+    def stop(self):
+        with self._lock:
+            if self._proc is not None and self._proc.poll() is None:
+                self._proc.terminate()
+
+
+class SleepPlayer:
+    """Stand-in player that just waits for the clip's duration."""
+
+    def __init__(self):
+        self._stop = threading.Event()
+        self.played = 0
+
+    def play(self, audio: bytes):
+        self._stop.clear()
+        self._stop.wait(wav_duration(audio))
+        self.played += 1
+
+    def stop(self):
+        self._stop.set()
+
+
+BACKENDS = {
+    "azure": AzureBackend,
+    "fake": FakeBackend,
+}
+
+PLAYERS = {
+    "aplay": AplayPlayer,
+    "sleep": SleepPlayer,
+}
+
+
+# ---- Utterances ----
+
+class Utterance:
+    """
+    One reply to speak, as an ordered list of sentences. Sentences can keep
+    arriving (add) until finish(); cancel() drops whatever has not played.
+    """
+
+    def __init__(self, priority: int = NORMAL, on_first_audio: Optional[Callable[[float], None]] = None):
+        self.priority = priority
+        self.on_first_audio = on_first_audio
+        self.created = time.perf_counter()
+        self.first_audio = None
+        self.cancelled = False
+        self.done = threading.Event()
+        self._sentences = []
+        self._finished = False
+        self._splitter = SentenceSplitter()
+        self._cond = threading.Condition()
+
+    def add(self, sentence: str):
+        with self._cond:
+            if sentence and not self._finished:
+                self._sentences.append(sentence)
+                self._cond.notify_all()
+
+    def feed(self, delta: str):
+        """Adds streamed text; whole sentences are queued as soon as they end."""
+        for sentence in self._splitter.feed(delta):
+            self.add(sentence)
+
+    def finish(self):
+        for sentence in self._splitter.flush():
+            self.add(sentence)
+        with self._cond:
+            self._finished = True
+            self._cond.notify_all()
+
+    def cancel(self):
+        with self._cond:
+            self.cancelled = True
+            self._finished = True
+            self._cond.notify_all()
+
+    def next_sentence(self, index: int) -> Optional[str]:
+        """Blocks until sentence `index` exists; None once the utterance is over."""
+        with self._cond:
+            while index >= len(self._sentences) and not self._finished:
+                self._cond.wait()
+            if self.cancelled or index >= len(self._sentences):
+                return None
+            return self._sentences[index]
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self.done.wait(timeout)
+
+
+# ---- Worker ----
+
+class TTSWorker:
+    """
+    Single text-to-speech pipeline: utterances are taken from a priority queue
+    (lower number first, FIFO within a priority), synthesized sentence by
+    sentence, and handed to a playback thread through a one-slot buffer, so
+    sentence N+1 is synthesized while sentence N plays.
+
+    With a `cache`, sentences already spoken in this voice and format are
+    played from disk, and the backend is not even created until a miss.
+    """
+
+    def __init__(self, backend_factory: Callable, player=None, prefetch: int = 1,
+                 cache: Optional[AudioCache] = None, voice: str = "", fmt: str = ""):
+        self._backend_factory = backend_factory
+        self._backend = None
+        self._backend_retry_at = 0.0
+        self._synth_lock = threading.Lock()
+        self.cache = cache
+        self.voice = voice
+        self.fmt = fmt
+        self.player = player or AplayPlayer()
+        self.prefetch = prefetch
+        self._heap = []
+        self._seq = 0
+        self._current = None          # utterance being synthesized
+        self._playing = None          # utterance whose clip is playing
+        self._cond = threading.Condition()
+        self._clips = []              # (utterance, audio or None for "done")
+        self._clips_cond = threading.Condition()
+        self._threads = None
+        self.spoken = 0
+        self.sentences = 0
+        self.cancelled = 0
+        self.interrupts = 0
+        self.errors = 0
+        self.synth_latency = LatencyStats()
+        self.first_audio_latency = LatencyStats()
+
+    def start(self):
+        with self._cond:
+            if self._threads is None:
+                self._threads = [
+                    threading.Thread(target=self._synth_loop, name="tts-synth", daemon=True),
+                    threading.Thread(target=self._play_loop, name="tts-play", daemon=True),
+                ]
+                for t in self._threads:
+                    t.start()
+
+    # Queueing
+
+    def stream(self, priority: int = NORMAL, interrupt: bool = False, on_first_audio=None) -> Utterance:
+        """Queues an open utterance to be filled with feed()/add() and closed with finish()."""
+        utt = Utterance(priority, on_first_audio)
+        if interrupt:
+            self.interrupt()
+        self.start()
+        with self._cond:
+            heapq.heappush(self._heap, (priority, self._seq, utt))
+            self._seq += 1
+            self._cond.notify_all()
+        return utt
+
+    def say(self, text: str, priority: int = NORMAL, interrupt: bool = False, on_first_audio=None) -> Utterance:
+        utt = self.stream(priority, interrupt, on_first_audio)
+        utt.feed(text)
+        utt.finish()
+        return utt
+
+    def interrupt(self):
+        """Stops what is playing now and drops everything queued."""
+        with self._cond:
+            queued = [utt for _, _, utt in self._heap]
+            self._heap.clear()
+            active = [self._current, self._playing]
+        for utt in queued + active:
+            if utt is not None and not utt.done.is_set():
+                self._cancel(utt)
+        self.interrupts += 1
+        self.player.stop()
+
+    def cancel(self, utt: Utterance):
+        """Cancels one utterance; stops playback if it is the one speaking."""
+        self._cancel(utt)
+        if self._playing is utt:
+            self.player.stop()
+
+    def _cancel(self, utt: Utterance):
+        if not utt.cancelled:
+            utt.cancel()
+            self.cancelled += 1
+        with self._clips_cond:
+            # Drop its pending audio but keep the end marker for the player
+            self._clips = [(u, a) for u, a in self._clips if u is not utt or a is None]
+            self._clips_cond.notify_all()
+        if self._current is not utt:
+            # Never reached the synth loop, so nobody else will mark it done
+            with self._cond:
+                queued = any(u is utt for _, _, u in self._heap)
+                if queued:
+                    self._heap = [item for item in self._heap if item[2] is not utt]
+                    heapq.heapify(self._heap)
+            utt.done.set()
+
+    # Threads
+
+    def _backend_or_none(self):
+        if self._backend is None and time.monotonic() >= self._backend_retry_at:
+            try:
+                self._backend = self._backend_factory()
+            except Exception as e:
+                self.errors += 1
+                self._backend_retry_at = time.monotonic() + 30.0
+                logging.exception("TTS backend unavailable: %s", e)
+        return self._backend
+
+    def _synthesize(self, sentence: str, lookup: bool = True) -> Optional[bytes]:
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(self.voice, self.fmt, sentence)
+            audio = self.cache.get(key) if lookup else None
+            if audio is not None:
+                return audio
+        with self._synth_lock:
+            backend = self._backend_or_none()
+            if backend is None:
+                return None
+            t0 = time.perf_counter()
+            audio = backend.synthesize(sentence)
+            self.synth_latency.record((time.perf_counter() - t0) * 1000)
+        if key is not None:
+            self.cache.put(key, audio)
+        return audio
+
+    def prewarm(self, phrases) -> threading.Thread:
+        """Synthesizes any phrases missing from the cache, in the background."""
+        def run():
+            for phrase in phrases:
+                for sentence in split_sentences(phrase):
+                    if self.cache.contains(self.cache.key(self.voice, self.fmt, sentence)):
+                        continue
+                    try:
+                        self._synthesize(sentence, lookup=False)
+                    except Exception as e:
+                        logging.warning(f"TTS prewarm failed for {sentence!r}: {e}")
+
+        thread = threading.Thread(target=run, name="tts-prewarm", daemon=True)
+        if self.cache is not None:
+            thread.start()
+        return thread
+
+    def _push_clip(self, utt: Utterance, audio: Optional[bytes]):
+        with self._clips_cond:
+            # One-slot hand-off: at most `prefetch` clips wait for the player
+            while len(self._clips) >= self.prefetch and not utt.cancelled:
+                self._clips_cond.wait(0.1)
+            if utt.cancelled and audio is not None:
+                return
+            self._clips.append((utt, audio))
+            self._clips_cond.notify_all()
+
+    def _synth_loop(self):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                _, _, utt = heapq.heappop(self._heap)
+                self._current = utt
+            index = 0
+            while True:
+                sentence = utt.next_sentence(index)
+                if sentence is None:
+                    break
+                index += 1
+                try:
+                    audio = self._synthesize(sentence)
+                except Exception as e:
+                    self.errors += 1
+                    logging.warning(f"TTS synthesis failed: {e}")
+                    continue
+                if audio is not None:
+                    self._push_clip(utt, audio)
+            # Marker so the player knows the utterance is complete
+            self._push_clip(utt, None)
+
+    def _play_loop(self):
+        while True:
+            with self._clips_cond:
+                while not self._clips:
+                    self._clips_cond.wait()
+                utt, audio = self._clips.pop(0)
+                self._clips_cond.notify_all()
+            if audio is None:
+                if not utt.cancelled:
+                    self.spoken += 1
+                with self._cond:
+                    if self._current is utt:
+                        self._current = None
+                utt.done.set()
+                continue
+            if utt.cancelled:
+                continue
+            self._playing = utt
+            if utt.first_audio is None:
+                utt.first_audio = time.perf_counter()
+                self.first_audio_latency.record((utt.first_audio - utt.created) * 1000)
+                if utt.on_first_audio:
+                    try:
+                        utt.on_first_audio(utt.first_audio)
+                    except Exception as e:
+                        logging.warning(f"TTS first-audio callback failed: {e}")
+            try:
+                self.player.play(audio)
+                self.sentences += 1
+            except Exception as e:
+                self.errors += 1
+                logging.warning(f"TTS playback failed: {e}")
+            finally:
+                self._playing = None
+
+    def stats(self) -> dict:
+        with self._cond:
+            depth = len(self._heap)
+            speaking = self._playing is not None
+        return {
+            "queue_depth": depth,
+            "speaking": speaking,
+            "spoken": self.spoken,
+            "sentences": self.sentences,
+            "cancelled": self.cancelled,
+            "interrupts": self.interrupts,
+            "errors": self.errors,
+            "synth": self.synth_latency.summary(),
+            "first_audio": self.first_audio_latency.summary(),
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
+
+
+def worker_from_env(kind: str, player: str = "aplay", key: str = None, region: str = None,
+                    voice: str = "en-US-JennyNeural", cache_dir: Optional[str] = None,
+                    cache_mb: float = 64) -> TTSWorker:
+    """
+    Builds a worker for the named backend; the backend is created on the first
+    cache miss. `cache_dir` defaults to TTS_CACHE_DIR or ~/.cache/mizuna/tts,
+    and cache_mb=0 turns the audio cache off.
+    """
+    if kind not in BACKENDS:
+        raise ValueError(f"Unknown TTS backend '{kind}', expected one of {list(BACKENDS)}")
+    if player not in PLAYERS:
+        raise ValueError(f"Unknown TTS player '{player}', expected one of {list(PLAYERS)}")
+    if kind == "azure":
+        factory = lambda: AzureBackend(key, region, voice)
+    else:
+        factory = BACKENDS[kind]
+        voice = kind
+    cache = None
+    if cache_mb > 0:
+        cache_dir = cache_dir or os.getenv("TTS_CACHE_DIR") or os.path.expanduser("~/.cache/mizuna/tts")
+        cache = AudioCache(cache_dir, max_bytes=int(cache_mb * 1024 * 1024))
+    return TTSWorker(factory, PLAYERS[player](), cache=cache, voice=voice, fmt=BACKENDS[kind].FORMAT)